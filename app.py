@@ -1,21 +1,47 @@
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
-from routes.llm import ai_summary, chat, config as llm_config
-from routes.rss import feed, updater
+from routes.llm import ai_summary, chat, conversation, config as llm_config
+from routes.rss import feed, stats, updater
 from routes import config
 from fastapi.middleware.cors import CORSMiddleware
+from middleware.compression import CompressionMiddleware
 
 from routes.rss.article import article, state
-from services.rss.updater import RSSUpdater
+from services.rss.updater import RSSUpdater, add_new_articles_listener, remove_new_articles_listener
+from services.llm.presummary import PreSummarizer
+from services.llm.tagger import AutoTagger
+from services.database import get_db, initialize_database
+from services.config import get_config_value
+from services.scraper_pool import ScraperProcessPool
 import threading
 import services.playwright as pw_service
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # 启动 Playwright（只做一次）
-    pw, browser = await pw_service.startup_playwright()
-    app.state.playwright = pw
-    app.state.browser = browser
+    # Playwright 浏览器在第一次需要时才启动，空闲一段时间后自动关闭
+    playwright = pw_service.PlaywrightManager.from_config(next(get_db()))
+    app.state.playwright = playwright
+
+    # scraper_mode 为 process 时，浏览器抓取交给进程外的工作池，崩溃隔离且不占用 API 进程的 CPU
+    scraper = playwright
+    if get_config_value(next(get_db()), "scraper_mode", "inprocess") == "process":
+        scraper = ScraperProcessPool.from_config(next(get_db()))
+        scraper.start()
+    app.state.scraper = scraper
+
+    # 启动后台预摘要流水线（可选，由 config 控制）
+    presummarizer = PreSummarizer.from_config(next(get_db()), scraper)
+    app.state.presummarizer = presummarizer
+    if presummarizer:
+        presummarizer.start()
+        add_new_articles_listener(presummarizer.submit_threadsafe)
+
+    # 启动后台批量自动打标签（可选，由 config 控制）
+    tagger = AutoTagger.from_config(next(get_db()))
+    app.state.tagger = tagger
+    if tagger:
+        tagger.start()
+        add_new_articles_listener(tagger.notify_threadsafe)
 
     # 启动 RSSUpdater
     rss_updater = RSSUpdater()
@@ -28,8 +54,18 @@ async def lifespan(app: FastAPI):
 
         yield
     finally:
+        # 停止后台预摘要与自动打标签
+        if presummarizer:
+            remove_new_articles_listener(presummarizer.submit_threadsafe)
+            await presummarizer.stop()
+        if tagger:
+            remove_new_articles_listener(tagger.notify_threadsafe)
+            await tagger.stop()
+
         # 关闭资源
-        await pw_service.shutdown_playwright(app.state.playwright, app.state.browser)
+        if scraper is not playwright:
+            await scraper.shutdown()
+        await playwright.shutdown()
 
         # 停止 RSS 更新程序
         rss_updater.stop()
@@ -38,6 +74,9 @@ def create_app() -> FastAPI:
     """
     工厂函数，用于创建和配置 FastAPI 应用实例。
     """
+    # 建表、迁移与回填只在 API 进程启动时执行一次
+    initialize_database()
+
     app = FastAPI(lifespan=lifespan)
 
     # 配置 CORS 中间件
@@ -53,10 +92,17 @@ def create_app() -> FastAPI:
         allow_headers=["*"],            # 允许所有请求头
     )
 
+    # 响应压缩（gzip / brotli），LLM 流式输出不压缩
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=get_config_value(next(get_db()), "response_compression_min_bytes", 1024, int),
+    )
+
     # 将路由模块添加到应用中
     # llm
     app.include_router(llm_config.router)
     app.include_router(chat.router)
+    app.include_router(conversation.router)
     app.include_router(ai_summary.router)
 
     # rss    
@@ -64,6 +110,7 @@ def create_app() -> FastAPI:
     app.include_router(state.router)
     app.include_router(article.router)
     app.include_router(updater.router)
+    app.include_router(stats.router)
 
     # config
     app.include_router(config.router)
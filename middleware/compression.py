@@ -0,0 +1,140 @@
+import zlib
+from typing import Optional, Sequence
+
+# brotli 为可选依赖，未安装时只协商 gzip
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+class _GzipEncoder:
+    def __init__(self, level: int):
+        # wbits=31 输出带 gzip 头的流
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+class _BrotliEncoder:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    根据 Accept-Encoding 选择压缩算法：优先 br（需安装 brotli），其次 gzip；q=0 表示拒绝。
+    """
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name] = q
+    wildcard = accepted.get("*", 0.0)
+    if brotli is not None and accepted.get("br", wildcard) > 0:
+        return "br"
+    if accepted.get("gzip", wildcard) > 0:
+        return "gzip"
+    return None
+
+class CompressionMiddleware:
+    """
+    ASGI 响应压缩中间件，按 Accept-Encoding 协商 br / gzip。
+    一次性返回的小于 minimum_size 字节的响应不压缩；流式响应边生成边压缩，内存占用不随响应大小增长。
+    excluded_paths 前缀下的请求（LLM 流式输出）与 excluded_media_types（SSE、已压缩的文件）不压缩，
+    避免缓冲打断逐字输出或重复压缩。
+    """
+    def __init__(
+        self,
+        app,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        excluded_paths: Sequence[str] = ("/llm",),
+        excluded_media_types: Sequence[str] = ("text/event-stream", "application/gzip"),
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.excluded_paths = tuple(excluded_paths)
+        self.excluded_media_types = tuple(excluded_media_types)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.excluded_paths):
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        encoding = negotiate_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        encoder = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, encoder, passthrough
+            if message["type"] == "http.response.start":
+                # 等到第一个 body 消息再决定是否压缩
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if encoder is None:
+                response_headers = list(start_message.get("headers", []))
+                lookup = {k.lower(): v for k, v in response_headers}
+                media_type = lookup.get(b"content-type", b"").decode("latin-1")
+                if (
+                    b"content-encoding" in lookup
+                    or media_type.startswith(self.excluded_media_types)
+                    or (not more_body and len(body) < self.minimum_size)
+                ):
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                encoder = _BrotliEncoder(self.brotli_quality) if encoding == "br" else _GzipEncoder(self.gzip_level)
+                response_headers = [(k, v) for k, v in response_headers if k.lower() != b"content-length"]
+                response_headers.append((b"content-encoding", encoding.encode("latin-1")))
+                vary = lookup.get(b"vary")
+                if vary is None:
+                    response_headers.append((b"vary", b"Accept-Encoding"))
+                elif b"accept-encoding" not in vary.lower():
+                    response_headers = [(k, v + b", Accept-Encoding" if k.lower() == b"vary" else v) for k, v in response_headers]
+                if not more_body:
+                    # 一次性响应：整体压缩并给出准确的 Content-Length
+                    compressed = encoder.compress(body) + encoder.finish()
+                    response_headers.append((b"content-length", str(len(compressed)).encode("latin-1")))
+                    await send({**start_message, "headers": response_headers})
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+                await send({**start_message, "headers": response_headers})
+
+            chunk = encoder.compress(body)
+            if not more_body:
+                chunk += encoder.finish()
+            if chunk or not more_body:
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
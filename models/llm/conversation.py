@@ -0,0 +1,35 @@
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field
+
+class ConversationCreate(BaseModel):
+    """
+    Pydantic 模型，用于创建服务端会话。
+    """
+    title: Optional[str] = Field(None, description="会话标题，例如文章标题")
+    model: Optional[str] = Field(None, description="会话默认使用的模型，为空时使用当前 LLM 配置中的模型")
+
+class Conversation(BaseModel):
+    """
+    Pydantic 模型，用于表示服务端保存的会话。
+    """
+    id: int = Field(..., description="会话 ID，请求 /llm/stream_chat 时通过 conversation_id 传入")
+    title: Optional[str] = Field(None, description="会话标题")
+    model: Optional[str] = Field(None, description="会话默认使用的模型")
+    summary: str = Field("", description="较早轮次压缩后的滚动摘要")
+    created_at: str = Field(..., description="创建时间")
+    updated_at: str = Field(..., description="最后一次对话的时间")
+
+class ConversationMessage(BaseModel):
+    """
+    Pydantic 模型，用于表示会话中的一条消息。
+    """
+    id: int = Field(..., description="消息 ID，自增")
+    role: Literal["system", "user", "assistant"] = Field(..., description="消息角色")
+    content: str = Field(..., description="消息内容")
+    created_at: str = Field(..., description="创建时间")
+
+class ConversationDetail(Conversation):
+    """
+    Pydantic 模型，用于返回会话及其完整消息记录。
+    """
+    messages: List[ConversationMessage] = Field(default_factory=list, description="按时间顺序排列的全部消息")
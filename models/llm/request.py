@@ -1,9 +1,21 @@
 # 定义请求体模型
-from typing import Dict, List
+from typing import Dict, List, Literal, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class ChatRequest(BaseModel):
-    model: str
-    messages: List[Dict[str, str]]
\ No newline at end of file
+    model: Optional[str] = Field(None, description="要使用的模型名称，为空时使用当前 LLM 配置中的模型")
+    messages: List[Dict[str, str]] = Field(
+        ...,
+        description="聊天消息列表；指定 conversation_id 时只需包含本轮的新消息，历史由服务端补全"
+    )
+    conversation_id: Optional[int] = Field(None, description="服务端会话 ID，见 /llm/conversations")
+    stream_format: Literal["base64", "text"] = Field(
+        "base64",
+        description="SSE 数据格式：base64 为 Base64 编码的 chunk；text 为按 SSE 规范转义的 UTF-8 文本（多行拆分为多个 data 行）"
+    )
+    cache: bool = Field(
+        False,
+        description="是否使用响应缓存：相同的模型与消息直接回放已缓存的响应（仅适用于确定性的请求，不用于服务端会话）"
+    )
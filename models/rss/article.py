@@ -38,4 +38,28 @@ class ArticleResponse(BaseModel):
     is_read: bool = Field(False, description="用户是否已读该文章")
     tags: Optional[list[str]] = Field(default_factory=list, description="对文章的分类或标签")
     ai_summary: Optional[str] = Field(None, description="AI生成的文章总结内容")
-    updated_at: datetime = Field(default_factory=datetime.utcnow, description="状态最后更新时间")
\ No newline at end of file
+    updated_at: datetime = Field(default_factory=datetime.utcnow, description="状态最后更新时间")
+
+class BulkArticleFilter(BaseModel):
+    """
+    Pydantic模型，用于批量操作时选择文章，各条件之间为 AND 关系。
+    """
+    article_ids: Optional[list[int]] = Field(None, description="文章ID列表")
+    feed_id: Optional[int] = Field(None, description="只选择该 RSS Feed 的文章")
+    before: Optional[datetime] = Field(None, description="只选择发布时间早于该时间的文章")
+    query: Optional[str] = Field(None, description="标题中包含的关键字")
+    tag: Optional[str] = Field(None, description="只选择带有该标签的文章")
+    all: bool = Field(False, description="未提供任何条件时必须为 true，表示作用于全部文章")
+
+class BulkReadRequest(BulkArticleFilter):
+    """
+    Pydantic模型，用于批量标记已读/未读。
+    """
+    is_read: bool = Field(True, description="标记为已读（true）或未读（false）")
+
+class BulkTagRequest(BulkArticleFilter):
+    """
+    Pydantic模型，用于批量添加或移除标签。
+    """
+    add: list[str] = Field(default_factory=list, description="要添加的标签")
+    remove: list[str] = Field(default_factory=list, description="要移除的标签")
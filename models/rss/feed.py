@@ -1,7 +1,22 @@
+from datetime import datetime
+from typing import Literal, Optional
+
 from pydantic import BaseModel, HttpUrl
 
 class Feed(BaseModel):
     id: int | None = None
     name: str
     url: HttpUrl
-    is_active: bool = True
\ No newline at end of file
+    is_active: bool = True
+
+class OPMLImportResult(BaseModel):
+    name: str
+    url: str
+    status: Literal["imported", "exists", "invalid"]
+    detail: Optional[str] = None
+
+class FeedCounters(BaseModel):
+    feed_id: int
+    total: int = 0
+    unread: int = 0
+    newest_pub_date: Optional[datetime] = None
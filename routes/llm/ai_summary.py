@@ -1,150 +1,365 @@
 from fastapi import APIRouter, HTTPException, Request, Depends
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from collections import defaultdict
 import asyncio
-from services.llm.chat import OpenAIStreamClient
-import services.playwright as pw_service
+import time
+from services.llm.router import LLMClient, create_llm_client
+from services.fetcher import fetch_article_text
 from services.rss.article.state import save_ai_summary, get_ai_summary
+from services.llm.summary import build_continuation_messages, prepare_summary_messages
+from services.llm.content import reduce_content
+from services.llm.summary_cache import find_cached_summary, save_cached_summary
+from services.llm.summary_session import (
+    SESSION_STALE_SECONDS,
+    append_chunks,
+    attempts_exhausted,
+    claim_session,
+    cleanup_expired_sessions,
+    get_session,
+    is_owned_elsewhere,
+    read_chunks,
+    record_session_failure,
+    set_session_status,
+    touch_session,
+)
+from services.llm.broadcaster import create_broadcaster
+from services.llm.admission import AdmissionTicket, acquire_llm_slot
 from services.database import get_db
-from typing import Dict, Any, Set
+from services.config import get_config_value
+from typing import AsyncIterator, Dict, Any
 
 router = APIRouter(prefix="/llm")
 
 class AISummaryRequest(BaseModel):
     article_id: int
     url: str
+    offset: int = 0       # 断点续传：跳过前 offset 个 chunk
+    byte_offset: int = 0  # 断点续传：跳过前 byte_offset 个字节（UTF-8）
 
-# sessions 保存每个 article_id 的流状态
+# chunk 批量落库的间隔与数量阈值，以及 owner 心跳间隔
+FLUSH_INTERVAL = 0.5
+FLUSH_CHUNKS = 16
+HEARTBEAT_INTERVAL = 10
+# 其他 worker 上的订阅者轮询 chunk 日志的间隔，以及刷新订阅心跳的间隔
+REMOTE_POLL_INTERVAL = 0.3
+WATCHER_HEARTBEAT_INTERVAL = 5
+# 过期会话清理的最小间隔
+CLEANUP_INTERVAL = 600
+_last_cleanup = 0.0
+
+# sessions 保存本 worker 正在生成的每个 article_id 的流状态（持久化状态见 ai_summary_sessions 表）
 # sessions[article_id] = {
-#   "buffer": [chunk,...],            # 已生成的所有 chunk（按顺序）
-#   "subscribers": set(Queue,...),    # 当前连接的消费者队列
+#   "broadcaster": StreamBroadcaster, # 共享 chunk 日志（含续写前已落库的部分）与订阅者
+#   "persisted": int,                 # 日志中已写入 ai_summary_chunks 的数量
 #   "producer_task": Task | None,     # 用于生成的后台任务
-#   "lock": asyncio.Lock(),           # 启动 producer 的互斥锁
+#   "idle_handle": TimerHandle,       # 无订阅者时的延迟取消定时器
 # }
-sessions: Dict[int, Dict[str, Any]] = defaultdict(lambda: {
-    "buffer": [],
-    "subscribers": set(),
-    "producer_task": None,
-    "lock": asyncio.Lock()
-})
+sessions: Dict[int, Dict[str, Any]] = {}
+# 启动 producer 的互斥锁
+_start_locks: Dict[int, asyncio.Lock] = {}
 
-async def start_producer_if_needed(article_id: int, messages, db):
+def maybe_cleanup_sessions(db) -> None:
     """
-    确保对该 article_id 只有一个 producer 在跑。
-    producer 会对 OpenAIStreamClient 发起流式请求，把 chunk 追加到 buffer 并广播给所有 subscribers。
-    生成结束后保存到 DB，并把结束信号发送给 subscribers，然后清理 session（因为结果已保存到 DB）。
+    按 TTL 清理过期的持久化会话，最多每 CLEANUP_INTERVAL 秒执行一次。
     """
-    session = sessions[article_id]
-    async with session["lock"]:
-        if session["producer_task"] and not session["producer_task"].done():
-            # 已有 producer 在跑
+    global _last_cleanup
+    now = time.monotonic()
+    if now - _last_cleanup < CLEANUP_INTERVAL:
+        return
+    _last_cleanup = now
+    ttl = get_config_value(db, "ai_summary_session_ttl_seconds", 86400.0, float)
+    removed = cleanup_expired_sessions(db, ttl)
+    if removed:
+        print(f"已清理 {removed} 个过期的摘要会话。")
+
+def cancel_idle_timer(session: Dict[str, Any]) -> None:
+    """
+    有新的订阅者接入时取消待执行的空闲取消。
+    """
+    if session["idle_handle"]:
+        session["idle_handle"].cancel()
+        session["idle_handle"] = None
+
+def schedule_idle_cancel(article_id: int, db) -> None:
+    """
+    所有订阅者断开后，在宽限期结束时取消仍在运行的 producer（除非配置为后台完成）。
+    其他 worker 上仍有订阅者时（watcher 心跳未过期）推迟取消。
+    已生成的 chunk 已持久化，下一个订阅者接入时从中断处续写。
+    """
+    session = sessions.get(article_id)
+    if not session or session["broadcaster"].subscriber_count:
+        return
+    if get_config_value(db, "ai_summary_finish_in_background", False, bool):
+        return
+    grace = get_config_value(db, "ai_summary_idle_grace_seconds", 15.0, float)
+
+    def cancel_if_idle():
+        if sessions.get(article_id) is not session:
+            return
+        session["idle_handle"] = None
+        task = session["producer_task"]
+        if session["broadcaster"].subscriber_count or not task or task.done():
+            return
+        durable = get_session(db, article_id)
+        if durable and durable["watcher_heartbeat_at"] >= time.time() - grace:
+            schedule_idle_cancel(article_id, db)
             return
+        print(f"摘要订阅者已全部断开，取消生成 (article_id: {article_id})，保留 {len(session['broadcaster'].log)} 个 chunk。")
+        task.cancel()
+
+    cancel_idle_timer(session)
+    session["idle_handle"] = asyncio.get_running_loop().call_later(grace, cancel_if_idle)
+
+async def start_producer_if_needed(article_id: int, messages, db, client: LLMClient, cache_keys: list[str], ticket: AdmissionTicket, resume: bool = False) -> bool:
+    """
+    确保对该 article_id 全局只有一个 producer 在跑（跨 worker 通过 ai_summary_sessions 认领）。
+    producer 会对 LLM 客户端发起流式请求，把 chunk 发布到广播器并批量写入持久化 chunk 日志。
+    生成结束后保存到 DB 及摘要缓存，关闭广播器通知订阅者结束，然后清理本地 session。
+    resume 为 True 时从已持久化的 chunk 之后续写。
+    ticket 为准入名额：启动 producer 时由其在结束后归还，否则在此立即归还。
+    返回 False 表示会话已被其他 worker 认领，调用方应改为跟随其 chunk 日志。
+    """
+    lock = _start_locks.setdefault(article_id, asyncio.Lock())
+    async with lock:
+        session = sessions.get(article_id)
+        if session and session["producer_task"] and not session["producer_task"].done():
+            # 已有 producer 在跑
+            ticket.release()
+            return True
+        max_attempts = get_config_value(db, "ai_summary_max_attempts", 3, int)
+        if not claim_session(db, article_id, messages, cache_keys, max_attempts):
+            ticket.release()
+            return False
+
+        previous = read_chunks(db, article_id) if resume else []
+        # 最后一个订阅者离开时：宽限期后取消生成
+        broadcaster = create_broadcaster(db, initial=previous, on_idle=lambda: schedule_idle_cancel(article_id, db))
+        session = {
+            "broadcaster": broadcaster,
+            "persisted": len(previous),
+            "producer_task": None,
+            "idle_handle": None,
+        }
+        sessions[article_id] = session
+        request_messages = build_continuation_messages(messages, "".join(previous))
+
+        def flush():
+            pending = broadcaster.log[session["persisted"]:]
+            append_chunks(db, article_id, session["persisted"], pending)
+            session["persisted"] += len(pending)
+
+        async def heartbeat():
+            while True:
+                await asyncio.sleep(HEARTBEAT_INTERVAL)
+                touch_session(db, article_id)
 
         async def producer():
-            client = OpenAIStreamClient()
+            # 记录实际提供服务的模型（LLMRouter 可能切换 provider），缓存按该模型写入
+            served: dict = {}
+            stream = client.stream_chat_completion(request_messages, served=served)
+            heartbeat_task = asyncio.create_task(heartbeat())
+            last_flush = time.monotonic()
+            error = None
             try:
-                async for chunk in client.stream_chat_completion(messages):
-                    # 保存历史 chunk
-                    session["buffer"].append(chunk)
-                    # 广播到所有当前 subscribers（非阻塞）
-                    to_remove = []
-                    for q in session["subscribers"]:
-                        try:
-                            q.put_nowait(chunk)
-                        except asyncio.QueueFull:
-                            # 订阅者太慢，忽略或考虑记录（这里直接忽略）
-                            pass
-                        except Exception:
-                            to_remove.append(q)
-                    # 移除已失效的 subscriber
-                    for q in to_remove:
-                        session["subscribers"].discard(q)
+                async for chunk in stream:
+                    # 追加到共享日志并唤醒订阅者（非阻塞，慢订阅者按策略处理）
+                    broadcaster.publish(chunk)
+                    # 批量追加到持久化 chunk 日志
+                    if len(broadcaster.log) - session["persisted"] >= FLUSH_CHUNKS or time.monotonic() - last_flush >= FLUSH_INTERVAL:
+                        flush()
+                        last_flush = time.monotonic()
 
                 # 生成完成 -> 把整段摘要拼起来并保存到 DB
-                full_text = "".join(session["buffer"])
+                flush()
+                full_text = broadcaster.text()
+                save_ai_summary(db, article_id, full_text)
+                # 写入共享缓存，重复文章（不同 GUID）直接复用
+                save_cached_summary(db, cache_keys, full_text, served["model"])
+                set_session_status(db, article_id, "done")
+            except asyncio.CancelledError:
+                # 无订阅者超过宽限期被取消：关闭上游流，已生成部分落库以便续写
+                await stream.aclose()
+                flush()
+                set_session_status(db, article_id, "paused")
+            except Exception as e:
+                # 若发生异常，已生成部分落库，标记失败并累加失败次数（未达上限时下次请求从中断处重试）
+                error = e
+                print(f"AI 摘要生成失败 (article_id: {article_id}): {e}")
                 try:
-                    save_ai_summary(db, article_id, full_text)
+                    flush()
+                    record_session_failure(db, article_id, e)
                 except Exception as db_err:
-                    # 如果保存失败，保留 buffer 并把错误记录/广播（这里抛出，让外层捕获）
-                    raise
-
-            except Exception as e:
-                # 若发生异常，向所有订阅者发送 None（作为结束/失败信号），并清理
-                for q in list(session["subscribers"]):
-                    try:
-                        q.put_nowait(None)
-                    except Exception:
-                        pass
-                # 不删除 buffer（方便调试/重试），但移除 producer_task
-                session["producer_task"] = None
-                # 记录/抛出异常
-                raise
-            else:
-                # 正常结束：通知订阅者结束（None），然后清理 session（因为结果已持久化到 DB）
-                for q in list(session["subscribers"]):
-                    try:
-                        q.put_nowait(None)
-                    except Exception:
-                        pass
-                # 清理：删除 session（释放内存），让后续请求从 DB 读取
-                sessions.pop(article_id, None)
+                    print(f"保存摘要会话状态失败 (article_id: {article_id}): {db_err}")
+            finally:
+                heartbeat_task.cancel()
+                ticket.release(error)
+                # 通知订阅者结束，并删除本地 session（状态与 chunk 已持久化），避免失败会话堆积
+                broadcaster.close()
+                cancel_idle_timer(session)
+                if sessions.get(article_id) is session:
+                    sessions.pop(article_id, None)
+                    _start_locks.pop(article_id, None)
 
         # 启动 producer 后台任务（独立运行）
         session["producer_task"] = asyncio.create_task(producer())
+        return True
+
+async def skip_offsets(source: AsyncIterator[str], offset: int, byte_offset: int) -> AsyncIterator:
+    """
+    断点续传：跳过前 offset 个 chunk，再跳过 byte_offset 个字节。
+    """
+    index = 0
+    remaining = byte_offset
+    async for chunk in source:
+        index += 1
+        if index <= offset:
+            continue
+        if remaining:
+            data = chunk.encode("utf-8")
+            if len(data) <= remaining:
+                remaining -= len(data)
+                continue
+            yield data[remaining:]
+            remaining = 0
+            continue
+        yield chunk
+
+async def iterate(chunks: list[str]) -> AsyncIterator[str]:
+    for chunk in chunks:
+        yield chunk
+
+async def follow_remote(db, article_id: int) -> AsyncIterator[str]:
+    """
+    会话由其他 worker 生成：轮询其持久化 chunk 日志，直到生成结束或 owner 失效。
+    """
+    seq = 0
+    last_watch = 0.0
+    while True:
+        chunks = read_chunks(db, article_id, seq)
+        for chunk in chunks:
+            yield chunk
+        seq += len(chunks)
+        durable = get_session(db, article_id)
+        if not durable or durable["status"] != "running":
+            # 结束前再读一次，避免遗漏 owner 最后一批写入
+            for chunk in read_chunks(db, article_id, seq):
+                yield chunk
+            return
+        if durable["heartbeat_at"] < time.time() - SESSION_STALE_SECONDS:
+            # owner 已失效：结束本次流，客户端可携带 offset 重新请求，由当前 worker 接管续写
+            return
+        if time.monotonic() - last_watch >= WATCHER_HEARTBEAT_INTERVAL:
+            touch_session(db, article_id, watcher=True)
+            last_watch = time.monotonic()
+        await asyncio.sleep(REMOTE_POLL_INTERVAL)
+
+def subscribe_local(article_id: int, offset: int = 0) -> AsyncIterator[str]:
+    """
+    订阅本 worker 上正在运行的 producer：从共享日志的 offset 处读取已生成与后续的 chunk。
+    """
+    session = sessions[article_id]
+    cancel_idle_timer(session)
+    return session["broadcaster"].subscribe(offset)
+
+def stream_response(source: AsyncIterator[str], payload: AISummaryRequest, offset_applied: bool = False) -> StreamingResponse:
+    offset = 0 if offset_applied else payload.offset
+    return StreamingResponse(skip_offsets(source, offset, payload.byte_offset), media_type="text/plain")
+
+def stream_local(article_id: int, payload: AISummaryRequest) -> StreamingResponse:
+    return stream_response(subscribe_local(article_id, payload.offset), payload, offset_applied=True)
+
+def stream_stored_summary(db, article_id: int, summary: str, payload: AISummaryRequest) -> StreamingResponse:
+    """
+    摘要已生成完毕：带 chunk offset 续传时按保留的 chunk 日志定位，否则直接返回完整文本。
+    chunk 日志已过期清理时无法把 chunk offset 换算为文本位置，此时忽略 offset 与 byte_offset 返回完整摘要，
+    而不是对单个整段文本跳过 offset 个 chunk 得到空响应。
+    """
+    chunks = read_chunks(db, article_id) if payload.offset else []
+    if chunks:
+        return stream_response(iterate(chunks), payload)
+    byte_offset = 0 if payload.offset else payload.byte_offset
+    return StreamingResponse(skip_offsets(iterate([summary]), 0, byte_offset), media_type="text/plain")
 
 @router.post("/ai_summary/stream")
 async def ai_summary_stream(payload: AISummaryRequest, request: Request, db=Depends(get_db)):
     article_id = payload.article_id
+    maybe_cleanup_sessions(db)
+
     # 先检查 DB 是否已有最终结果（已生成并保存）
     existing = get_ai_summary(db, article_id)
     if existing:
-        # 如果已有直接返回完整文本（结束）
-        return StreamingResponse(iter([existing]), media_type="text/plain")
+        return stream_stored_summary(db, article_id, existing, payload)
 
-    # 确保 sessions 有 entry
-    session = sessions[article_id]
+    # 本 worker 已在生成：直接订阅
+    if article_id in sessions:
+        return stream_local(article_id, payload)
 
-    # 如果还没有 producer_task（即没人开始生成），我们需要抓取文章并开始 producer
-    if not session["producer_task"]:
-        # 抓取文章（可能耗时）
-        browser = getattr(request.app.state, "browser", None)
-        if not browser:
-            raise HTTPException(status_code=503, detail="Browser not available")
-        article_content = await pw_service.scrape_article(browser, payload.url)
-        messages = [
-            {"role": "system", "content": "你是一个专业的文章摘要助手。请用中文简明扼要地总结以下文章，提取核心观点和关键信息。尽可能总结成一段话，使用markdown格式（加粗、斜体等）标注重要内容。"},
-            {"role": "user", "content": article_content}
-        ]
-        # 启动 producer，它会把生成的 chunk 放到 session["buffer"] 并广播
-        await start_producer_if_needed(article_id, messages, db)
-    else:
-        # producer 已在跑，messages 不再需要重新发送，因为 producer 已经在 model 端
-        pass
-
-    # 建立一个 subscriber queue，把它加入 subscribers 集合
-    q: asyncio.Queue = asyncio.Queue()
-    session["subscribers"].add(q)
-
-    async def event_generator():
-        try:
-            # 1) 先把已有历史 buffer（已生成的 chunk）重放给新连接
-            for chunk in session["buffer"]:
-                yield chunk
+    # 其他 worker 正在生成：跟随其 chunk 日志，不重复发起生成
+    durable = get_session(db, article_id)
+    if is_owned_elsewhere(durable):
+        return stream_response(follow_remote(db, article_id), payload)
 
-            # 2) 然后等待 producer 的后续 chunk（producer 会把新 chunk put 到此 queue）
-            while True:
-                item = await q.get()
-                if item is None:
-                    # 生产端通知结束
-                    break
-                yield item
-        except asyncio.CancelledError:
-            # 客户端断开连接：把该 subscriber 从集合里移除并结束
-            session["subscribers"].discard(q)
+    # 连续失败次数已达上限：直接返回最后一次错误，不再重复请求上游（会话过期清理后可重新生成）
+    if attempts_exhausted(durable, get_config_value(db, "ai_summary_max_attempts", 3, int)):
+        raise HTTPException(
+            status_code=502,
+            detail=f"摘要生成已连续失败 {durable['attempts']} 次: {durable['last_error']}",
+        )
+
+    # 之前的生成被取消、失败或 owner 已失效：复用持久化的请求与 chunk 续写，无需重新抓取
+    if durable and durable["status"] != "done":
+        try:
+            client = create_llm_client()
+        except RuntimeError as e:
+            raise HTTPException(status_code=500, detail=f"无法初始化 LLM: {e}")
+        ticket = await acquire_llm_slot(db, client)
+        try:
+            started = await start_producer_if_needed(article_id, durable["messages"], db, client, durable["cache_keys"], ticket, resume=True)
+        except BaseException as e:
+            ticket.release(e)
             raise
-        finally:
-            # 清理 subscriber（防止泄露）
-            session["subscribers"].discard(q)
+        if not started:
+            return stream_response(follow_remote(db, article_id), payload)
+        return stream_local(article_id, payload)
+
+    # 还没有人开始生成，我们需要抓取文章并开始 producer
+    try:
+        client = create_llm_client()
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=f"无法初始化 LLM: {e}")
+
+    # 同一篇文章可能以不同 GUID 出现：先按规范化 URL 查共享缓存，命中则连抓取都省掉
+    cached, cache_keys = find_cached_summary(db, client.models, url=payload.url)
+    if cached:
+        save_ai_summary(db, article_id, cached)
+        return stream_response(iterate([cached]), payload)
+
+    # 抓取与生成都占用昂贵资源（Chromium 页面、上游 LLM 流），先获取并发名额
+    ticket = await acquire_llm_slot(db, client)
+    try:
+        # 抓取文章（可能耗时）
+        # 先尝试普通 HTTP 抓取，正文不可用时才使用浏览器；去掉导航、页脚、评论等样板内容，减少 prompt token
+        scraper = getattr(request.app.state, "scraper", None)
+        article_content = reduce_content(await fetch_article_text(scraper, payload.url))
+        # 再按正文内容哈希查一次（转载、RSSHub 与原站等 URL 不同的情况）
+        cached, cache_keys = find_cached_summary(db, client.models, url=payload.url, content=article_content)
+        if cached:
+            ticket.release()
+            save_ai_summary(db, article_id, cached)
+            return stream_response(iterate([cached]), payload)
+
+        # 超长文章在此完成 map 阶段，producer 只负责流式输出最终汇总
+        messages = await prepare_summary_messages(db, client, article_content)
+    except BaseException as e:
+        ticket.release(e)
+        raise
 
-    return StreamingResponse(event_generator(), media_type="text/plain")
+    # 启动 producer，它会把生成的 chunk 发布到广播器；若抓取期间已被其他 worker 认领则跟随之
+    try:
+        started = await start_producer_if_needed(article_id, messages, db, client, cache_keys, ticket)
+    except BaseException as e:
+        ticket.release(e)
+        raise
+    if not started:
+        return stream_response(follow_remote(db, article_id), payload)
+    return stream_local(article_id, payload)
@@ -1,11 +1,17 @@
 import os
-import base64
-from typing import AsyncGenerator
+import asyncio
+from typing import AsyncGenerator, Optional
 from fastapi import APIRouter, HTTPException, status, Depends
 from fastapi.responses import StreamingResponse
 
 from models.llm.request import ChatRequest
-from services.llm.chat import OpenAIStreamClient
+from services.llm.router import LLMClient, create_llm_client
+from services.llm.broadcaster import StreamBroadcaster, create_broadcaster
+from services.llm.sse import coalesce_chunks, format_sse_base64, format_sse_text
+from services.llm.admission import AdmissionTicket, acquire_llm_slot
+from services.llm.conversation import append_conversation_messages, build_conversation_messages, compact_conversation, get_conversation_service
+from services.llm.response_cache import get_cached_response, response_cache_enabled, response_cache_key, save_cached_response
+from services.config import get_config_value
 from services.llm.config import get_llm_config_service
 from services.database import get_db
 
@@ -15,52 +21,178 @@ router = APIRouter(
   tags=["LLM Client"],
 )
 
-async def generate_stream(client: OpenAIStreamClient, request: ChatRequest) -> AsyncGenerator[bytes, None]:
+async def produce(client: LLMClient, messages: list[dict], model: Optional[str], broadcaster: StreamBroadcaster, served: dict) -> None:
   """
-  异步生成器，用于从 OpenAIStreamClient 获取数据，并封装成 SSE 格式返回。
-  使用 Base64 编码来处理可能包含特殊字符的 chunk，以确保 SSE 格式的完整性。
+  后台生产者：把上游 chunk 发布到广播器，结束或出错时关闭广播器。
+  model 只作用于提供该模型的 provider，LLMRouter 故障切换或对冲到其他 provider 时使用其配置的模型；
+  实际使用的 provider 与模型写入 served。
   """
   try:
     async for chunk in client.stream_chat_completion(
-      request.model,
-      request.messages
+      messages,
+      model=model,
+      served=served
     ):
-      # 将 chunk 编码为 bytes
-      chunk_bytes = chunk.encode("utf-8")
-      # 使用 Base64 编码来处理 chunk 中的所有特殊字符
-      encoded_chunk = base64.b64encode(chunk_bytes).decode("utf-8")
-      # 将编码后的 chunk 封装成 SSE 格式
-      sse_chunk = f"data: {encoded_chunk}\n\n"
-      # 编码为 bytes 并返回
-      yield sse_chunk.encode("utf-8")
+      broadcaster.publish(chunk)
+  except Exception as e:
+    broadcaster.close(error=e)
+  else:
+    broadcaster.close()
+
+async def generate_stream(
+  client: LLMClient,
+  request: ChatRequest,
+  broadcaster: StreamBroadcaster,
+  ticket: AdmissionTicket,
+  flush_interval: float = 0.03,
+  flush_bytes: int = 512,
+  db=None,
+  cache: bool = False,
+  messages: Optional[list[dict]] = None,
+  model: Optional[str] = None,
+) -> AsyncGenerator[bytes, None]:
+  """
+  异步生成器，用于从 LLM 客户端获取数据，并封装成 SSE 格式返回。
+  上游读取与客户端写出通过广播器解耦，慢客户端按配置的策略处理，内存占用有上限。
+  相邻的 token 增量在 flush_interval 窗口内合并（超过 flush_bytes 立即发送），减少事件数与写次数。
+  stream_format 为 base64 时对 chunk 做 Base64 编码；为 text 时按 SSE 规范转义，UTF-8 文本原样传输。
+  结束时归还准入名额（上游 429 会反馈给准入控制器）。
+  cache 为 True 时，完整生成结束后按实际提供服务的模型把 chunk 写入响应缓存。
+  messages 为实际发送给模型的消息（服务端会话时包含摘要与历史），为空时使用 request.messages；
+  请求指定了 conversation_id 时，完整生成结束后把本轮消息与回复写入会话。
+  """
+  error = None
+  encode = format_sse_text if request.stream_format == "text" else format_sse_base64
+  model = model or request.model
+  served: dict = {}
+  producer_task = asyncio.create_task(produce(client, messages or request.messages, model, broadcaster, served))
+  try:
+    async for chunk in coalesce_chunks(broadcaster.subscribe(), flush_interval, flush_bytes):
+      yield encode(chunk)
+    # 只缓存完整结束的生成，出错或客户端提前断开的不缓存
+    if cache:
+      save_cached_response(db, response_cache_key(served["model"], request.messages), served["model"], list(broadcaster.log))
+    if request.conversation_id is not None:
+      append_conversation_messages(
+        db,
+        request.conversation_id,
+        request.messages + [{"role": "assistant", "content": broadcaster.text()}],
+        served["model"]
+      )
 
   except HTTPException:
     raise
   except Exception as e:
+    error = e
     print(f"生成流时发生未知错误: {e}")
     raise HTTPException(
       status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
       detail=f"服务器内部发生未知错误: {e}"
     )
+  finally:
+    # 客户端断开时停止上游生成
+    producer_task.cancel()
+    ticket.release(error)
+
+async def replay_cached(chunks: list[str]) -> AsyncGenerator[str, None]:
+  for chunk in chunks:
+    yield chunk
+
+async def generate_cached_stream(
+  request: ChatRequest,
+  chunks: list[str],
+  flush_interval: float = 0.03,
+  flush_bytes: int = 512,
+) -> AsyncGenerator[bytes, None]:
+  """
+  按与实时生成相同的合并与 SSE 编码回放缓存的 chunk。
+  """
+  encode = format_sse_text if request.stream_format == "text" else format_sse_base64
+  async for chunk in coalesce_chunks(replay_cached(chunks), flush_interval, flush_bytes):
+    yield encode(chunk)
 
 @router.post("/stream_chat", response_model=None)
 async def stream_chat(
   request: ChatRequest,
+  db=Depends(get_db),
 ) -> StreamingResponse:
   """
   接受一个聊天请求，并以流式方式返回 AI 响应。
   客户端可以通过 SSE (Server-Sent Events) 方式接收文本块。
-  响应数据使用 Base64 编码，客户端需要进行相应的解码。
+  默认响应数据使用 Base64 编码，客户端需要进行相应的解码；
+  stream_format 为 text 时直接发送 UTF-8 文本，多行内容拆分为多个 data 行。
+  指定 conversation_id 时只需发送本轮的新消息，服务端补全历史并在超过阈值时压缩较早的轮次。
+  cache 为 true 时相同的 (模型, 消息, 参数) 直接回放缓存的响应，不占用准入名额也不请求上游。
   """
   try:
-    client = OpenAIStreamClient()
+    client = create_llm_client()
   except RuntimeError as e:
     raise HTTPException(
       status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
       detail=f"无法初始化 LLM: {e}"
     )
-  
+
+  flush_interval = get_config_value(db, "llm_stream_flush_ms", 30, int) / 1000
+  flush_bytes = get_config_value(db, "llm_stream_flush_bytes", 512, int)
+  headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+  model = request.model
+  if request.conversation_id is not None:
+    conversation = get_conversation_service(db, request.conversation_id)
+    if not conversation:
+      raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="会话未找到"
+      )
+    model = model or conversation.model
+
+  cache = False
+  # 服务端会话的上下文每轮都不同，不使用响应缓存
+  if request.cache and request.conversation_id is None and response_cache_enabled(db):
+    cache = True
+    # 未指定模型时，任一 provider 的模型生成的缓存都可以回放
+    cached = None
+    for cache_model in [request.model] if request.model else client.models:
+      cached = get_cached_response(db, response_cache_key(cache_model, request.messages))
+      if cached is not None:
+        break
+    if cached is not None:
+      return StreamingResponse(
+        generate_cached_stream(request, cached, flush_interval, flush_bytes),
+        media_type="text/event-stream",
+        headers={**headers, "X-Cache": "HIT"}
+      )
+    headers["X-Cache"] = "MISS"
+
+  # 并发准入：超过上限时排队，队列满或等待超时返回 429 + Retry-After
+  ticket = await acquire_llm_slot(db, client, model)
+
+  messages = request.messages
+  if request.conversation_id is not None:
+    # 历史超过阈值时先把较早的轮次压缩为滚动摘要（复用本次的准入名额），失败时退回发送完整历史
+    try:
+      await compact_conversation(db, client, request.conversation_id)
+    except Exception as e:
+      print(f"压缩会话 {request.conversation_id} 失败: {e}")
+    try:
+      messages = build_conversation_messages(db, request.conversation_id, request.messages)
+    except HTTPException:
+      ticket.release()
+      raise
+
   return StreamingResponse(
-    generate_stream(client, request),
-    media_type="text/event-stream"
+    generate_stream(
+      client,
+      request,
+      create_broadcaster(db),
+      ticket,
+      flush_interval=flush_interval,
+      flush_bytes=flush_bytes,
+      db=db,
+      cache=cache,
+      messages=messages,
+      model=model,
+    ),
+    media_type="text/event-stream",
+    headers=headers
   )
\ No newline at end of file
@@ -0,0 +1,68 @@
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status
+import sqlite3
+
+from models.llm.conversation import Conversation, ConversationCreate, ConversationDetail
+from services.database import get_db
+from services.llm.conversation import create_conversation_service, delete_conversation_service, get_all_conversations_service, get_conversation_detail_service
+
+router = APIRouter(
+    prefix="/llm",
+    tags=["LLM Conversations"],
+)
+
+@router.post(
+    "/conversations",
+    response_model=Conversation,
+    status_code=status.HTTP_201_CREATED,
+    summary="创建一个服务端会话"
+)
+def create_conversation(conversation: ConversationCreate, db: sqlite3.Connection = Depends(get_db)):
+    """
+    创建一个服务端会话，之后的 /llm/stream_chat 请求只需携带 conversation_id 与本轮的新消息。
+    """
+    return create_conversation_service(db, conversation)
+
+@router.get(
+    "/conversations",
+    response_model=List[Conversation],
+    summary="获取所有会话"
+)
+def get_all_conversations(db: sqlite3.Connection = Depends(get_db)):
+    """
+    获取所有会话，最近活跃的在前。
+    """
+    return get_all_conversations_service(db)
+
+@router.get(
+    "/conversations/{conversation_id}",
+    response_model=ConversationDetail,
+    summary="根据 ID 获取会话及其消息"
+)
+def get_conversation(conversation_id: int, db: sqlite3.Connection = Depends(get_db)):
+    """
+    获取会话及其完整的消息记录。
+    """
+    conversation = get_conversation_detail_service(db, conversation_id)
+    if not conversation:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="会话未找到"
+        )
+    return conversation
+
+@router.delete(
+    "/conversations/{conversation_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="删除一个会话"
+)
+def delete_conversation(conversation_id: int, db: sqlite3.Connection = Depends(get_db)):
+    """
+    删除会话及其全部消息。
+    """
+    if not delete_conversation_service(db, conversation_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="会话未找到"
+        )
+    return
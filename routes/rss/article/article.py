@@ -1,33 +1,104 @@
+from datetime import datetime
+from typing import Literal, Optional
 from fastapi import APIRouter, Depends, HTTPException
 from sqlite3 import Connection
 from services.database import get_db
-from services.rss.article.article import get_articles
+from fastapi.responses import StreamingResponse
+from services.rss.article.article import ARTICLE_COLUMNS, get_article_records, iter_article_records
+from services.rss.article.export import gzip_stream, iter_csv_export, iter_export_records, iter_ndjson_export
+from services.serialization import FastJSONResponse, iter_json_array, iter_ndjson, to_columns
 
 router = APIRouter(
     prefix="/rss/article",
 )
 
+ArticleListFormat = Literal["objects", "columnar", "stream", "ndjson"]
+
+def articles_response(db: Connection, feed_id, limit: int, format: str, since: Optional[datetime] = None, until: Optional[datetime] = None):
+    """
+    把文章记录直接编码为 JSON。
+    format 为 columnar 时 articles 为 {字段: [值, ...]} 的按列形状，适合大页面；
+    stream 时以与 objects 相同的 JSON 结构边读游标边输出；ndjson 时每行输出一篇文章。
+    两种流式格式都在独立的只读连接上读取，不在响应输出期间占用全局连接。
+    """
+    if format == "stream":
+        return StreamingResponse(
+            iter_json_array(iter_article_records(feed_id, limit, since, until), prefix='{"detail":"获取成功","articles":'.encode("utf-8"), suffix=b"}"),
+            media_type="application/json",
+        )
+    if format == "ndjson":
+        return StreamingResponse(iter_ndjson(iter_article_records(feed_id, limit, since, until)), media_type="application/x-ndjson")
+    records = get_article_records(db, feed_id, limit, since, until)
+    if format == "columnar":
+        return FastJSONResponse({"detail": "获取成功", "count": len(records), "articles": to_columns(records, ARTICLE_COLUMNS)})
+    return FastJSONResponse({"detail": "获取成功", "articles": records})
+
 @router.get("/latest", summary="获取最新文章及其状态")
-async def fetch_latest_articles(limit: int = 50, db: Connection = Depends(get_db)):
+async def fetch_latest_articles(limit: int = 50, format: ArticleListFormat = "objects", db: Connection = Depends(get_db)):
     """
     获取最新的文章及其状态，按发布时间降序排序。
     """
     try:
-        articles = get_articles(db, None, limit)
-        return {"detail": "获取成功", "articles": articles}
+        return articles_response(db, None, limit, format)
     except HTTPException as e:
         raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取文章失败: {e}")
     
+@router.get("/range", summary="按发布时间范围获取文章")
+async def fetch_articles_in_range(
+    since: datetime,
+    until: Optional[datetime] = None,
+    feed_id: Optional[int] = None,
+    limit: int = 500,
+    format: ArticleListFormat = "objects",
+    db: Connection = Depends(get_db),
+):
+    """
+    获取发布时间在 [since, until) 范围内的文章及其状态，按发布时间降序排序，可按 feed_id 过滤。
+    不带时区的时间按 UTC 处理。
+    """
+    try:
+        return articles_response(db, feed_id, limit, format, since, until)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取文章失败: {e}")
+
+@router.get("/export", summary="流式导出文章归档")
+def export_articles(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    feed_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    unread_only: bool = False,
+    gzip: bool = False,
+):
+    """
+    以 NDJSON 或 CSV 流式导出文章及其状态、标签与摘要。
+    可按订阅源、发布时间范围 [since, until) 与未读状态过滤；gzip 为 true 时直接输出 .gz 文件。
+    数据在只读连接上按批读取，导出任意行数内存占用都保持不变。
+    """
+    records = iter_export_records(feed_id=feed_id, since=since, until=until, unread_only=unread_only)
+    if format == "csv":
+        chunks, media_type, filename = iter_csv_export(records), "text/csv; charset=utf-8", "articles.csv"
+    else:
+        chunks, media_type, filename = iter_ndjson_export(records), "application/x-ndjson", "articles.ndjson"
+    if gzip:
+        chunks, media_type, filename = gzip_stream(chunks), "application/gzip", filename + ".gz"
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
 @router.get("/{feed_id}", summary="获取指定feed_id的文章")
-async def fetch_articles_by_feed_id(feed_id: int, limit: int = 50, db: Connection = Depends(get_db)):
+async def fetch_articles_by_feed_id(feed_id: int, limit: int = 50, format: ArticleListFormat = "objects", db: Connection = Depends(get_db)):
     """
     获取指定feed_id的文章，按发布时间降序排序。
     """
     try:
-        articles = get_articles(db, feed_id, limit)
-        return {"detail": "获取成功", "articles": articles}
+        return articles_response(db, feed_id, limit, format)
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -1,10 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException
 from services.rss.article.state import (
+    bulk_mark_read,
+    bulk_update_tags,
     get_all_tags,
     get_today_update_count,
     mark_article_as_read,
 )
-from models.rss.article import ArticleState
+from models.rss.article import ArticleState, BulkReadRequest, BulkTagRequest
 from services.database import get_db
 import sqlite3
 from typing import List
@@ -19,7 +21,7 @@ router = APIRouter(
 @router.get("/today-update-count", response_model=int)
 def get_today_update_count_endpoint(db: sqlite3.Connection = Depends(get_db)):
     """
-    获取今日更新的文章状态数量。
+    获取今日（UTC）入库的文章数量。
     """
     return get_today_update_count(db)
 
@@ -41,4 +43,19 @@ def mark_article_as_read_endpoint(article_id: int, db: sqlite3.Connection = Depe
     try:
         return mark_article_as_read(db, article_id)
     except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/bulk/read", response_model=dict)
+def bulk_mark_read_endpoint(request: BulkReadRequest, db: sqlite3.Connection = Depends(get_db)):
+    """
+    批量标记已读或未读：可按文章ID列表、Feed、发布时间截止点、标题关键字或标签筛选，
+    在一条 UPDATE 语句中完成，返回实际更新的文章数。
+    """
+    return {"detail": "更新成功", "updated": bulk_mark_read(db, request)}
+
+@router.post("/bulk/tags", response_model=dict)
+def bulk_update_tags_endpoint(request: BulkTagRequest, db: sqlite3.Connection = Depends(get_db)):
+    """
+    批量添加或移除标签，筛选条件与批量标记已读相同，返回每个标签影响的文章数。
+    """
+    return {"detail": "更新成功", **bulk_update_tags(db, request)}
@@ -1,13 +1,24 @@
 import sqlite3
 from typing import List
 
-from fastapi import APIRouter, Depends, FastAPI, HTTPException, status
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import HttpUrl
 
-from models.rss.feed import Feed
+from models.rss.feed import Feed, FeedCounters, OPMLImportResult
+from services.config import get_config_value
 from services.database import get_db
-from services.rss.feed import create_feed, delete_feed, get_all_feeds, get_feed_by_id, update_feed
+from services.rss.feed import (
+    create_feed,
+    delete_feed,
+    get_all_feeds,
+    get_feed_by_id,
+    get_feed_counters,
+    reconcile_feed_counters,
+    update_feed,
+)
+from services.rss.opml import build_opml, import_opml
 
 
 # Create an APIRouter instance
@@ -23,6 +34,61 @@ def read_feeds(db: sqlite3.Connection = Depends(get_db)):
     """
     return get_all_feeds(db)
 
+@router.get("/opml")
+def export_opml(db: sqlite3.Connection = Depends(get_db)):
+    """
+    Export all RSS feeds as an OPML 2.0 document.
+    """
+    return Response(
+        content=build_opml(get_all_feeds(db)),
+        media_type="text/x-opml; charset=utf-8",
+        headers={"Content-Disposition": 'attachment; filename="feeds.opml"'},
+    )
+
+@router.post("/opml", response_model=List[OPMLImportResult])
+async def import_feeds_from_opml(
+    request: Request, validate: bool = True, db: sqlite3.Connection = Depends(get_db)
+):
+    """
+    Import feeds from an OPML document sent as the raw request body.
+    Feeds are validated concurrently with a bounded fetch pool and inserted in one
+    transaction; the response reports the outcome for every feed in the document.
+    """
+    data = await request.body()
+    return await run_in_threadpool(
+        import_opml,
+        db,
+        data,
+        validate=validate,
+        concurrency=get_config_value(db, "feed_import_concurrency", 16, int),
+        timeout=get_config_value(db, "feed_import_timeout_seconds", 10, int),
+    )
+
+@router.get("/counters", response_model=List[FeedCounters])
+def read_feed_counters(db: sqlite3.Connection = Depends(get_db)):
+    """
+    Retrieve total, unread and newest pub_date for every feed.
+    Counters are maintained by triggers, so this is a table read rather than an aggregate.
+    """
+    return get_feed_counters(db)
+
+@router.post("/counters/reconcile")
+def reconcile_counters(db: sqlite3.Connection = Depends(get_db)):
+    """
+    Recompute the feed counters from the articles table and fix any drift.
+    """
+    return {"detail": "Feed counters reconciled", "corrected": reconcile_feed_counters(db)}
+
+@router.get("/{feed_id}/counters", response_model=FeedCounters)
+def read_feed_counters_by_id(feed_id: int, db: sqlite3.Connection = Depends(get_db)):
+    """
+    Retrieve the counters of a single feed by its primary key.
+    """
+    counters = get_feed_counters(db, feed_id)
+    if not counters:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Feed not found")
+    return counters[0]
+
 @router.get("/{feed_id}", response_model=Feed)
 def read_feed_by_id(feed_id: int, db: sqlite3.Connection = Depends(get_db)):
     """
@@ -0,0 +1,35 @@
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, Depends, Query
+
+from services.database import get_db
+from services.rss.stats import get_stats_series
+from services.serialization import FastJSONResponse
+
+router = APIRouter(
+    prefix="/rss/stats",
+    tags=["stats"],
+)
+
+# 未指定 since 时默认查询的范围
+DEFAULT_STATS_RANGE = {"hour": timedelta(hours=48), "day": timedelta(days=30)}
+
+@router.get("/series", summary="获取按时间分桶的统计序列")
+def read_stats_series(
+    granularity: Literal["hour", "day"] = "day",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    feed_id: Optional[List[int]] = Query(None),
+    per_feed: bool = False,
+    db: sqlite3.Connection = Depends(get_db),
+):
+    """
+    获取 [since, until) 范围内每小时或每天的入库、已读与 AI 摘要数量（UTC 分桶）。
+    可用 feed_id 多次指定要统计的 Feed；per_feed 为 true 时另外返回每个 Feed 的序列。
+    数据来自触发器增量维护的汇总表，查询成本与文章总数无关。
+    """
+    until = until or datetime.now(timezone.utc)
+    since = since or until - DEFAULT_STATS_RANGE[granularity]
+    return FastJSONResponse(get_stats_series(db, granularity, since, until, feed_id, per_feed))
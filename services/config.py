@@ -68,4 +68,19 @@ def list_configs(db: Connection) -> List[Config]:
     cursor = db.cursor()
     cursor.execute("SELECT key, value FROM config")
     rows = cursor.fetchall()
-    return [Config(key=row["key"], value=row["value"]) for row in rows]
\ No newline at end of file
+    return [Config(key=row["key"], value=row["value"]) for row in rows]
+
+def get_config_value(db: Connection, key: str, default=None, cast=str):
+    """
+    Retrieve a config value converted by `cast`.
+    Falls back to `default` when the key is missing, empty or cannot be parsed.
+    """
+    config = get_config(db, key)
+    if config is None or config.value is None or config.value.strip() == "":
+        return default
+    try:
+        if cast is bool:
+            return config.value.strip().lower() in ("true", "1", "yes", "on")
+        return cast(config.value)
+    except (TypeError, ValueError):
+        return default
@@ -11,21 +11,108 @@ _connection = None  # 全局唯一的 SQLite 连接
 _connection_lock = Lock()  # 用于线程安全的锁
 
 
+SQL_DIR = "sql"
+# 数据库结构版本，记录在 PRAGMA user_version 中
+SCHEMA_VERSION = 2
+# 当前 UTC 时间（秒）
+_NOW_EPOCH_SQL = "CAST(strftime('%s', 'now') AS INTEGER)"
+
+
+def _epoch_sql(column: str, fallback: str) -> str:
+    # 把 ISO 文本时间转换为 UTC 秒；已是整数的保持不变，无法解析时使用 fallback
+    return f"COALESCE(CASE WHEN typeof({column}) = 'integer' THEN {column} ELSE CAST(strftime('%s', {column}) AS INTEGER) END, {fallback})"
+
+
+def _read_script(file_name: str) -> str:
+    with open(os.path.join(SQL_DIR, file_name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _migrate_to_epoch_timestamps(conn: sqlite3.Connection) -> None:
+    """
+    版本 1：articles 与 article_states 的时间列由格式不一的 ISO 文本改为 UTC 秒整数。
+    SQLite 不能修改列类型，因此在一个事务中重建表：旧表改名，执行当前的建表脚本，转换并复制数据后删除旧表。
+    旧表上的触发器随旧表删除，feed_counters 也一并删除，之后由各自的脚本重新创建并回填。
+    """
+    old_indexes = [
+        row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name IN ('articles', 'article_states') AND sql IS NOT NULL"
+        )
+    ]
+    now = _NOW_EPOCH_SQL
+    script = "\n".join([
+        # 改名时不改写其他表（如 article_tagging）中指向 articles 的外键
+        "PRAGMA legacy_alter_table = ON;",
+        "BEGIN;",
+        "ALTER TABLE articles RENAME TO articles_v0;",
+        "ALTER TABLE article_states RENAME TO article_states_v0;",
+        *(f'DROP INDEX IF EXISTS "{name}";' for name in old_indexes),
+        _read_script("articles.sql"),
+        _read_script("article_states.sql"),
+        f"""
+        INSERT INTO articles (id, feed_id, title, link, guid, pub_date, author, created_at)
+        SELECT id, feed_id, title, link, guid,
+               {_epoch_sql("pub_date", _epoch_sql("created_at", now))}, author, {_epoch_sql("created_at", now)}
+        FROM articles_v0;
+        INSERT INTO article_states (id, article_id, is_read, tags, ai_summary, updated_at)
+        SELECT id, article_id, is_read, tags, ai_summary, {_epoch_sql("updated_at", now)}
+        FROM article_states_v0;
+        """,
+        "DROP TABLE articles_v0;",
+        "DROP TABLE article_states_v0;",
+        "DROP TABLE IF EXISTS feed_counters;",
+        "COMMIT;",
+        "PRAGMA legacy_alter_table = OFF;",
+    ])
+    try:
+        conn.executescript(script)
+    except sqlite3.Error:
+        conn.rollback()
+        conn.execute("PRAGMA legacy_alter_table = OFF")
+        raise
+    # 重建表留下的空闲页归还给文件系统
+    conn.execute("VACUUM")
+    print("数据库已迁移到版本 1：文章时间改为 UTC 秒整数。")
+
+
+def migrate_database(conn: sqlite3.Connection) -> None:
+    """
+    按 PRAGMA user_version 执行尚未应用的结构迁移。全新的数据库直接标记为最新版本。
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        return
+    has_articles = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'articles'").fetchone()
+    if version < 1 and has_articles:
+        pub_date_type = next(row[2] for row in conn.execute("PRAGMA table_info(articles)") if row[1] == "pub_date")
+        if pub_date_type.upper() != "INTEGER":
+            _migrate_to_epoch_timestamps(conn)
+    if version < 2:
+        # 摘要会话记录连续失败次数，超过上限后不再自动续写
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(ai_summary_sessions)")}
+        if columns and "attempts" not in columns:
+            conn.execute("ALTER TABLE ai_summary_sessions ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+            conn.execute("ALTER TABLE ai_summary_sessions ADD COLUMN last_error TEXT")
+            conn.commit()
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+
 def initialize_database():
     """
-    在包初始化时检查并执行 SQL 脚本以设置数据库。
+    检查并执行 SQL 脚本以设置数据库。由应用入口（app.py）显式调用：
+    导入本模块不会访问数据库，抓取工作进程等子进程因此不会重复执行迁移与回填。
     """
     try:
         conn = sqlite3.connect(DATABASE_URL)
         conn.row_factory = sqlite3.Row
 
-        sql_dir = "sql"
-        for file_name in os.listdir(sql_dir):
+        # 先迁移已有表的结构，再执行脚本补齐新的表、索引与触发器
+        migrate_database(conn)
+
+        # 按文件名顺序执行，触发器所在的脚本依赖其排在前面的表
+        for file_name in sorted(os.listdir(SQL_DIR)):
             if file_name.endswith(".sql"):
-                file_path = os.path.join(sql_dir, file_name)
-                with open(file_path, "r", encoding="utf-8") as f:
-                    sql_script = f.read()
-                conn.executescript(sql_script)
+                conn.executescript(_read_script(file_name))
         conn.commit()
         print("SQL 脚本执行完成。")
     except FileNotFoundError:
@@ -49,6 +136,16 @@ def get_global_connection() -> sqlite3.Connection:
         return _connection
 
 
+def open_readonly_connection() -> sqlite3.Connection:
+    """
+    打开一个独立的只读连接，用于导出等长时间运行的查询，不与全局连接上的写事务互相影响。
+    调用方负责关闭。
+    """
+    conn = sqlite3.connect(f"file:{DATABASE_URL}?mode=ro", uri=True, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
 def get_db() -> Iterator[sqlite3.Connection]:
     """
     FastAPI 依赖项，提供全局唯一的 SQLite 连接。
@@ -58,7 +155,4 @@ def get_db() -> Iterator[sqlite3.Connection]:
         yield conn
     except sqlite3.Error as e:
         print(f"数据库连接失败: {e}")
-        raise HTTPException(status_code=500, detail="数据库连接失败")
-
-# 在模块加载时初始化数据库
-initialize_database()
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="数据库连接失败")
\ No newline at end of file
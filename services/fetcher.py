@@ -0,0 +1,197 @@
+import asyncio
+import re
+import time
+from html.parser import HTMLParser
+from typing import Optional
+from urllib.parse import urlsplit
+
+import requests
+from fastapi import HTTPException
+
+from services.config import get_config_value
+from services.database import get_db
+
+# 与 RSS 抓取一致的浏览器 UA，避免被简单的反爬规则拦截
+HTTP_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml;q=0.9,*/*;q=0.8',
+}
+# 正文判定阈值
+MIN_TEXT_CHARS = 400        # 正文最少字符数
+MIN_TEXT_DENSITY = 0.01     # 正文字符数 / HTML 字节数
+MAX_SCRIPT_RATIO = 0.6      # 内联脚本占 HTML 的比例超过此值且正文偏短时视为前端渲染页面
+# 需要 JavaScript 才能显示内容的提示
+_JS_REQUIRED_RE = re.compile(r"enable javascript|javascript is (disabled|required)|启用\s*javascript|开启\s*javascript", re.I)
+# 每个域名的抓取方式记忆多久（秒），过期后重新尝试 HTTP
+DOMAIN_MODE_TTL = 24 * 3600
+
+# 跳过其中文本的标签
+_SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "iframe", "nav", "header", "footer", "aside", "form", "dialog", "button", "select"}
+# 正文容器
+_MAIN_TAGS = {"article", "main"}
+# 块级标签，前后插入换行
+_BLOCK_TAGS = {"p", "div", "section", "br", "li", "ul", "ol", "h1", "h2", "h3", "h4", "h5", "h6", "tr", "blockquote", "pre", "table", "figure", "figcaption", "article", "main"}
+# 无结束标签的元素，不参与嵌套计数
+_VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+class _MainTextExtractor(HTMLParser):
+    """
+    基于 HTMLParser 的正文提取：跳过脚本、样式与导航等样板节点，
+    分别收集整个 body 与 article/main（含 role=main）容器中的文本。
+    """
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack: list[tuple[str, bool, bool]] = []  # (标签, 是否跳过, 是否正文容器)
+        self.skip_depth = 0
+        self.main_depth = 0
+        self.body: list[str] = []
+        self.main: list[str] = []
+        self.script_chars = 0
+        self.js_required = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _BLOCK_TAGS:
+            self._newline()
+        if tag in _VOID_TAGS:
+            return
+        attrs = dict(attrs)
+        skip = tag in _SKIP_TAGS or attrs.get("aria-hidden") == "true" or attrs.get("role") in ("navigation", "banner", "contentinfo", "complementary")
+        main = tag in _MAIN_TAGS or attrs.get("role") == "main"
+        self.stack.append((tag, skip, main))
+        self.skip_depth += skip
+        self.main_depth += main
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in _BLOCK_TAGS:
+            self._newline()
+
+    def handle_endtag(self, tag):
+        if tag in _VOID_TAGS:
+            return
+        # 容忍未闭合的标签：弹出到最近的同名标签为止
+        if not any(t == tag for t, _, _ in self.stack):
+            return
+        while self.stack:
+            t, skip, main = self.stack.pop()
+            self.skip_depth -= skip
+            self.main_depth -= main
+            if t == tag:
+                break
+        if tag in _BLOCK_TAGS:
+            self._newline()
+
+    def handle_data(self, data):
+        if self.stack and self.stack[-1][0] == "script":
+            self.script_chars += len(data)
+            return
+        if self.stack and self.stack[-1][0] == "noscript" and _JS_REQUIRED_RE.search(data):
+            self.js_required = True
+        if self.skip_depth:
+            return
+        self.body.append(data)
+        if self.main_depth:
+            self.main.append(data)
+
+    def _newline(self):
+        if not self.skip_depth:
+            self.body.append("\n")
+            if self.main_depth:
+                self.main.append("\n")
+
+def _clean(parts: list[str]) -> str:
+    lines = (re.sub(r"[ \t\r\f\v\xa0]+", " ", line).strip() for line in "".join(parts).split("\n"))
+    return "\n".join(line for line in lines if line)
+
+def extract_main_text(html: str) -> tuple[str, dict]:
+    """
+    从 HTML 中提取正文文本。article/main 容器的文本量达到 body 的 30% 时只取容器内文本。
+    同时返回用于判断结果是否可用的统计信息。
+    """
+    parser = _MainTextExtractor()
+    parser.feed(html)
+    parser.close()
+    body = _clean(parser.body)
+    main = _clean(parser.main)
+    text = main if main and len(main) >= len(body) * 0.3 else body
+    stats = {
+        "html_chars": len(html),
+        "text_chars": len(text),
+        "script_chars": parser.script_chars,
+        "js_required": parser.js_required or bool(_JS_REQUIRED_RE.search(text[:500])),
+    }
+    return text, stats
+
+def is_adequate(text: str, stats: dict) -> bool:
+    """
+    判断 HTTP 抓取的正文是否可用：长度、文本密度以及是否为只有脚本的前端渲染页面。
+    """
+    if stats["text_chars"] < MIN_TEXT_CHARS:
+        return False
+    if stats["js_required"] and stats["text_chars"] < MIN_TEXT_CHARS * 3:
+        return False
+    html_chars = max(1, stats["html_chars"])
+    if stats["text_chars"] / html_chars < MIN_TEXT_DENSITY:
+        return False
+    if stats["script_chars"] / html_chars > MAX_SCRIPT_RATIO and stats["text_chars"] < MIN_TEXT_CHARS * 3:
+        return False
+    return True
+
+def _http_get(url: str, timeout: float) -> Optional[str]:
+    # 同步请求，在线程中执行；非 HTML 响应返回 None
+    response = requests.get(url, headers=HTTP_HEADERS, timeout=timeout)
+    response.raise_for_status()
+    if "html" not in response.headers.get("Content-Type", "html").lower():
+        return None
+    # 未声明 charset 时 requests 默认 ISO-8859-1，改用内容探测
+    if "charset" not in response.headers.get("Content-Type", "").lower():
+        response.encoding = response.apparent_encoding
+    return response.text
+
+# 域名 -> (抓取方式 'http' / 'browser', 记录时间)
+_domain_modes: dict[str, tuple[str, float]] = {}
+
+def _domain(url: str) -> str:
+    return (urlsplit(url).hostname or "").lower()
+
+def get_domain_mode(url: str) -> Optional[str]:
+    """
+    返回之前为该域名记录的抓取方式，没有记录或已过期时返回 None。
+    """
+    entry = _domain_modes.get(_domain(url))
+    if entry is None or time.time() - entry[1] > DOMAIN_MODE_TTL:
+        return None
+    return entry[0]
+
+def remember_domain_mode(url: str, mode: str) -> None:
+    _domain_modes[_domain(url)] = (mode, time.time())
+
+async def fetch_article_text(scraper, url: str) -> str:
+    """
+    分级抓取文章正文：先用普通 HTTP 请求与 HTMLParser 提取正文，结果不可用时才使用 Playwright 浏览器。
+    每个域名的判定结果会被记住，已知需要浏览器的域名直接走浏览器。
+    scraper 为提供 scrape(url) 的浏览器抓取器：进程内的 PlaywrightManager 或进程外的 ScraperProcessPool；
+    scraper 为空且必须使用浏览器时抛出 503。
+    """
+    db = next(get_db())
+    http_first = get_config_value(db, "scrape_http_first", True, bool)
+    mode = get_domain_mode(url)
+
+    if http_first and mode != "browser":
+        try:
+            html = await asyncio.to_thread(_http_get, url, get_config_value(db, "scrape_http_timeout_seconds", 10, float))
+        except requests.RequestException as e:
+            # 网络错误不代表页面需要浏览器，不记录判定
+            print(f"HTTP 抓取失败，改用浏览器 ({url}): {e}")
+            html = None
+        else:
+            if html is not None:
+                text, stats = extract_main_text(html)
+                if is_adequate(text, stats):
+                    remember_domain_mode(url, "http")
+                    return text
+            remember_domain_mode(url, "browser")
+            print(f"HTTP 抓取结果不可用，改用浏览器 ({_domain(url)})")
+
+    if not scraper:
+        raise HTTPException(status_code=503, detail="Browser not available")
+    return await scraper.scrape(url)
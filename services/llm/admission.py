@@ -0,0 +1,229 @@
+import asyncio
+import time
+from collections import deque
+from typing import Optional
+
+from fastapi import HTTPException, status
+
+from services.config import get_config_value
+
+class AdmissionRejected(Exception):
+    """
+    等待队列已满或排队超时。retry_after 为建议的重试秒数。
+    """
+    def __init__(self, retry_after: int):
+        super().__init__(f"LLM 服务繁忙，请 {retry_after} 秒后重试")
+        self.retry_after = retry_after
+
+def is_rate_limit_error(error: Optional[BaseException]) -> bool:
+    """
+    判断异常是否为上游 429 限流（openai.RateLimitError 等带 status_code 的异常）。
+    """
+    return getattr(error, "status_code", None) == 429
+
+def upstream_retry_after(error: BaseException) -> Optional[float]:
+    """
+    读取上游 429 响应中的 Retry-After（秒）。
+    """
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+class AdmissionTicket:
+    """
+    一个已获得的并发名额，release 可重复调用。
+    controller 为空时不占用名额（后台任务使用 LLMRouter 时由其在选定 provider 时自行获取）。
+    """
+    def __init__(self, controller: Optional["AdmissionController"]):
+        self._controller = controller
+        self._started = time.monotonic()
+        self._released = False
+
+    @property
+    def released(self) -> bool:
+        return self._released
+
+    def release(self, error: Optional[BaseException] = None) -> None:
+        """
+        归还名额；error 为上游 429 时收缩并发上限。
+        """
+        if self._released:
+            return
+        self._released = True
+        if self._controller is None:
+            return
+        self._controller._release(time.monotonic() - self._started, error)
+
+class AdmissionController:
+    """
+    单个 llm_config 的准入控制器。
+    最多 max_in_flight 个请求同时访问上游，其余请求在有界队列中等待（超时即拒绝）。
+    上游返回 429 时并发上限减半并进入冷却，之后每次成功逐步恢复（AIMD）。
+    """
+    def __init__(self, max_in_flight: int = 4, max_queue: int = 16, queue_timeout: float = 30.0):
+        self.max_in_flight = max(1, max_in_flight)
+        self.limit = float(self.max_in_flight)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters: deque = deque()
+        self._cooldown_until = 0.0
+        self._avg_hold = 5.0  # 平均占用时长（秒）的指数滑动平均，用于估算 Retry-After
+
+    def configure(self, max_in_flight: int, max_queue: int, queue_timeout: float) -> None:
+        """
+        应用新的配置值（配置表修改后无需重启）。
+        """
+        # 调低时立即生效，调高时随成功请求逐步增长
+        self.max_in_flight = max(1, max_in_flight)
+        self.limit = min(self.limit, float(self.max_in_flight))
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+
+    def retry_after(self) -> int:
+        """
+        估算排到名额所需的秒数。
+        """
+        estimate = self._avg_hold * (len(self._waiters) + 1) / max(1, int(self.limit))
+        estimate = max(estimate, self._cooldown_until - time.monotonic())
+        return int(min(max(estimate, 1), 120))
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < int(self.limit) and time.monotonic() >= self._cooldown_until
+
+    def saturated(self) -> bool:
+        """
+        没有空闲名额且等待队列已满，新的 acquire 会被立即拒绝。
+        """
+        return not (self._has_capacity() and not self._waiters) and len(self._waiters) >= self.max_queue
+
+    def try_acquire(self) -> Optional[AdmissionTicket]:
+        """
+        有空闲名额且无人排队时立即获取，否则返回 None（不排队）。
+        """
+        if self._has_capacity() and not self._waiters:
+            self.in_flight += 1
+            return AdmissionTicket(self)
+        return None
+
+    async def acquire(self) -> AdmissionTicket:
+        """
+        获取名额；队列已满或等待超时抛出 AdmissionRejected。
+        """
+        ticket = self.try_acquire()
+        if ticket is not None:
+            return ticket
+        if len(self._waiters) >= self.max_queue:
+            raise AdmissionRejected(self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        # 冷却期结束时需要主动唤醒队首
+        if self._cooldown_until > time.monotonic():
+            asyncio.get_running_loop().call_later(self._cooldown_until - time.monotonic(), self._wake_waiters)
+        # 用 asyncio.wait 而不是 wait_for：超时不会取消 waiter，调用方被取消时也总能进入下面的归还逻辑
+        try:
+            await asyncio.wait((waiter,), timeout=self.queue_timeout)
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # 名额已由 _wake_waiters 转交，但调用方在交接后被取消：归还名额，否则它会永久丢失
+                self.in_flight -= 1
+                self._wake_waiters()
+            else:
+                waiter.cancel()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+        if not waiter.done():
+            waiter.cancel()
+            raise AdmissionRejected(self.retry_after())
+        return AdmissionTicket(self)
+
+    def _wake_waiters(self) -> None:
+        # 名额直接转交给队首等待者
+        while self._waiters and self._has_capacity():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def _release(self, held: float, error: Optional[BaseException]) -> None:
+        self.in_flight -= 1
+        self._avg_hold = self._avg_hold * 0.8 + held * 0.2
+        if is_rate_limit_error(error):
+            # 乘性减：并发上限减半并冷却
+            self.limit = max(1.0, self.limit / 2)
+            cooldown = upstream_retry_after(error) or 5.0
+            self._cooldown_until = max(self._cooldown_until, time.monotonic() + cooldown)
+            asyncio.get_running_loop().call_later(cooldown, self._wake_waiters)
+            print(f"上游 LLM 限流 (429)，并发上限降为 {int(self.limit)}，冷却 {cooldown:.0f} 秒。")
+        elif error is None:
+            # 加性增：逐步恢复到配置的上限
+            self.limit = min(float(self.max_in_flight), self.limit + 1 / self.limit)
+        self._wake_waiters()
+
+# 每个 llm_config 一个控制器
+_controllers: dict = {}
+
+def get_admission_controller(db, key) -> AdmissionController:
+    """
+    获取（必要时创建）指定 key 的准入控制器，并同步 config 表中的限制值。
+    """
+    settings = (
+        get_config_value(db, "llm_max_in_flight", 4, int),
+        get_config_value(db, "llm_max_queue", 16, int),
+        get_config_value(db, "llm_queue_timeout_seconds", 30.0, float),
+    )
+    controller = _controllers.get(key)
+    if controller is None:
+        controller = _controllers[key] = AdmissionController(*settings)
+    else:
+        controller.configure(*settings)
+    return controller
+
+def _routed_rejection(db, client) -> Optional[AdmissionRejected]:
+    """
+    后台任务使用 LLMRouter（带 clients 属性）时由其在选定 provider 时按各自的 llm_config 获取名额，
+    这里只在所有 provider 都无法排队时提前拒绝，不占用前台的排队位置。
+    """
+    controllers = [get_admission_controller(db, c.config_id) for c in client.clients]
+    if all(controller.saturated() for controller in controllers):
+        return AdmissionRejected(min(controller.retry_after() for controller in controllers))
+    return None
+
+async def acquire_llm_slot(db, client, model: Optional[str] = None) -> AdmissionTicket:
+    """
+    为请求获取 LLM 并发名额；失败时抛出 429 并附带 Retry-After。
+    LLMRouter 在此提前为 model 选定的 provider 占用名额（reserve），随后的流式请求直接使用，
+    因此排队被拒绝同样在返回流式响应之前以 429 返回。
+    """
+    try:
+        if hasattr(client, "clients"):
+            return await client.reserve(model)
+        return await get_admission_controller(db, client.config_id).acquire()
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+async def wait_for_llm_slot(db, client) -> AdmissionTicket:
+    """
+    供后台任务使用：与前台请求共用 llm_config 的并发名额，被拒绝时按 Retry-After 等待后重试，
+    不占用前台的排队位置。
+    """
+    while True:
+        try:
+            if hasattr(client, "clients"):
+                rejection = _routed_rejection(db, client)
+                if rejection:
+                    raise rejection
+                return AdmissionTicket(None)
+            return await get_admission_controller(db, client.config_id).acquire()
+        except AdmissionRejected as e:
+            await asyncio.sleep(e.retry_after)
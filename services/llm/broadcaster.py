@@ -0,0 +1,118 @@
+import asyncio
+from typing import AsyncIterator, Callable, Iterable, Optional
+
+from services.config import get_config_value
+
+# 慢消费者策略
+POLICY_COALESCE = "coalesce"      # 积压超过上限时把积压的 chunk 合并为一个发送
+POLICY_DROP = "drop"              # 积压超过上限时丢弃积压，只保留最新的 chunk
+POLICY_DISCONNECT = "disconnect"  # 积压超过上限时断开该订阅者
+POLICIES = (POLICY_COALESCE, POLICY_DROP, POLICY_DISCONNECT)
+
+class SlowConsumerError(Exception):
+    """
+    订阅者积压超过上限且策略为 disconnect 时抛出。
+    """
+
+class StreamBroadcaster:
+    """
+    单个 LLM 生成的扇出广播器。
+    chunk 只在共享日志中保存一份，每个订阅者仅持有读取位置（offset），
+    因此无论接入多少个慢客户端，每个生成占用的内存只取决于生成内容本身。
+    订阅者追上日志末尾之后，积压（日志长度 - offset）超过 max_lag 时按策略处理。
+    """
+    def __init__(self, max_lag: int = 256, policy: str = POLICY_COALESCE, initial: Iterable[str] = (), on_idle: Optional[Callable[[], None]] = None):
+        if policy not in POLICIES:
+            raise ValueError(f"未知的慢消费者策略: {policy}")
+        self.max_lag = max(1, max_lag)
+        self.policy = policy
+        self.log: list[str] = list(initial)
+        self.closed = False
+        self.error: Optional[BaseException] = None
+        self.on_idle = on_idle  # 最后一个订阅者离开时调用
+        self._subscribers = 0
+        self._wakeup = asyncio.Event()
+
+    @property
+    def subscriber_count(self) -> int:
+        return self._subscribers
+
+    def text(self) -> str:
+        """
+        返回目前为止生成的完整文本。
+        """
+        return "".join(self.log)
+
+    def _notify(self) -> None:
+        # 唤醒所有等待中的订阅者，并为下一轮等待换一个新的 Event
+        self._wakeup.set()
+        self._wakeup = asyncio.Event()
+
+    def publish(self, chunk: str) -> None:
+        """
+        追加一个 chunk 并唤醒订阅者，不会因慢消费者而阻塞。
+        """
+        if self.closed:
+            raise RuntimeError("广播器已关闭")
+        self.log.append(chunk)
+        self._notify()
+
+    def close(self, error: Optional[BaseException] = None) -> None:
+        """
+        结束广播；error 不为空时订阅者读完日志后会收到该异常。
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.error = error
+        self._notify()
+
+    async def subscribe(self, offset: int = 0) -> AsyncIterator[str]:
+        """
+        从 offset 开始读取共享日志，直到广播结束。
+        新接入或断点续传的订阅者先完整回放已有日志；追上日志末尾之后积压才按慢消费者策略处理，
+        回放中的历史 chunk 不算积压，不会被合并、丢弃或导致断开。
+        """
+        self._subscribers += 1
+        caught_up = False
+        try:
+            while True:
+                pending = len(self.log) - offset
+                if pending == 0:
+                    caught_up = True
+                if caught_up and pending > self.max_lag:
+                    if self.policy == POLICY_DISCONNECT:
+                        raise SlowConsumerError(f"订阅者积压 {pending} 个 chunk，超过上限 {self.max_lag}")
+                    if self.policy == POLICY_DROP:
+                        offset = len(self.log) - 1
+                    else:
+                        chunk = "".join(self.log[offset:])
+                        offset = len(self.log)
+                        yield chunk
+                        continue
+                if offset < len(self.log):
+                    chunk = self.log[offset]
+                    offset += 1
+                    yield chunk
+                    continue
+                if self.closed:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                await self._wakeup.wait()
+        finally:
+            self._subscribers -= 1
+            if self._subscribers == 0 and not self.closed and self.on_idle:
+                self.on_idle()
+
+def create_broadcaster(db, initial: Iterable[str] = (), on_idle: Optional[Callable[[], None]] = None) -> StreamBroadcaster:
+    """
+    按 config 表中的慢消费者策略与积压上限创建广播器。
+    """
+    policy = get_config_value(db, "llm_stream_slow_consumer_policy", POLICY_COALESCE)
+    return StreamBroadcaster(
+        max_lag=get_config_value(db, "llm_stream_max_lag_chunks", 256, int),
+        policy=policy if policy in POLICIES else POLICY_COALESCE,
+        initial=initial,
+        on_idle=on_idle,
+    )
@@ -1,4 +1,5 @@
 import asyncio
+from typing import Optional
 from openai import AsyncOpenAI
 
 from services.database import get_db
@@ -9,15 +10,18 @@ class OpenAIStreamClient:
     """
     封装OpenAI异步流式客户端。
     """
-    def __init__(self):
+    def __init__(self, config_id: Optional[int] = None):
         """
         初始化AsyncOpenAI客户端。
-        从数据库中读取配置并初始化。
+        从数据库中读取配置并初始化；未指定 config_id 时使用当前激活的 llm_config_id。
         """
         try:
             with next(get_db()) as db:
-                config_entry = get_config(db, "llm_config_id")
-                llm_config_id = config_entry.value if config_entry else None
+                if config_id is not None:
+                    llm_config_id = config_id
+                else:
+                    config_entry = get_config(db, "llm_config_id")
+                    llm_config_id = config_entry.value if config_entry else None
 
                 if not llm_config_id:
                     raise ValueError("LLM configuration ID not set. Please set LLM_CONFIG_ID environment variable.")
@@ -26,7 +30,9 @@ class OpenAIStreamClient:
                 if not config:
                     raise ValueError(f"LLM configuration with ID {llm_config_id} not found in the database.")
 
+                self.config_id = config.id  # 用于按 llm_config 做并发准入控制
                 self.model = config.model  # 从配置中读取模型名称
+                self.models = [config.model]  # 可能提供服务的模型，与 LLMRouter 接口一致
                 self.client = AsyncOpenAI(
                     base_url=str(config.base_url),
                     api_key=config.api_key
@@ -34,46 +40,61 @@ class OpenAIStreamClient:
         except Exception as e:
             raise RuntimeError(f"Failed to initialize OpenAI client: {e}")
 
-    async def stream_chat_completion(self, messages: list[dict]):
+    def _serve(self, model: Optional[str], served: Optional[dict]) -> str:
+        # 记录实际提供服务的 llm_config 与模型，供调用方写缓存等使用
+        model = model or self.model
+        if served is not None:
+            served.update(config_id=self.config_id, model=model)
+        return model
+
+    async def stream_chat_completion(self, messages: list[dict], model: Optional[str] = None, served: Optional[dict] = None):
         """
         发起流式聊天补全请求并逐块返回响应内容。
         此方法将直接返回模型生成的文本内容。
 
         Args:
             messages (list[dict]): 聊天消息列表。
+            model (Optional[str]): 指定模型名称，为空时使用配置中的模型。
+            served (Optional[dict]): 传入时写入实际使用的 config_id 与 model。
         """
         try:
             stream = await self.client.chat.completions.create(
-                model=self.model,  # 使用从配置中读取的模型名称
+                model=self._serve(model, served),  # 未指定时使用从配置中读取的模型名称
                 messages=messages,
                 stream=True
             )
 
-            async for chunk in stream:
-                # 检查是否存在内容块
-                if chunk.choices and chunk.choices[0].delta.content:
-                    # 直接返回内容字符串
-                    yield chunk.choices[0].delta.content
-                # 当 finish_reason 存在时，表示流已结束，循环将自然终止
-                
+            try:
+                async for chunk in stream:
+                    # 检查是否存在内容块
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        # 直接返回内容字符串
+                        yield chunk.choices[0].delta.content
+                    # 当 finish_reason 存在时，表示流已结束，循环将自然终止
+            finally:
+                # 调用方提前停止迭代（如取消生成）时立即关闭上游连接，不再为后续输出付费
+                await stream.close()
+
         except Exception as e:
             # 打印错误信息，并重新抛出异常，以便上层处理
             print(f"\n流式输出过程中发生错误: {e}")
             raise
 
-    async def chat_completion(self, messages: list[dict]) -> str:
+    async def chat_completion(self, messages: list[dict], model: Optional[str] = None, served: Optional[dict] = None) -> str:
         """
         发起非流式聊天补全请求并返回完整响应内容。
 
         Args:
             messages (list[dict]): 聊天消息列表。
+            model (Optional[str]): 指定模型名称，为空时使用配置中的模型。
+            served (Optional[dict]): 传入时写入实际使用的 config_id 与 model。
 
         Returns:
             str: 模型生成的完整文本内容。
         """
         try:
             response = await self.client.chat.completions.create(
-                model=self.model,  # 使用从配置中读取的模型名称
+                model=self._serve(model, served),  # 未指定时使用从配置中读取的模型名称
                 messages=messages,
                 stream=False
             )
@@ -0,0 +1,81 @@
+import re
+
+# 整行都是导航、页脚、Cookie 提示等样板时才删除；正文句子中出现“注册”“广告”等词不受影响
+_BOILERPLATE_LINE = re.compile(
+    r"^(?:"
+    r"首页|返回首页|返回顶部|回到顶部|上一篇|下一篇|上一页|下一页|更多|查看更多|展开全文|阅读全文|"
+    r"登录|注册|登录/注册|登录 \| 注册|登录后评论|登录后参与评论|立即登录|免费注册|订阅|立即订阅|"
+    r"分享|分享到|分享至|扫码分享|扫一扫|扫码关注|关注我们|微信扫一扫|"
+    r"广告|责任编辑\s*[:：]?\s*\S{0,10}|版权声明|隐私政策|用户协议|"
+    r"(?:copyright|©|\(c\))\s*(?:©\s*)?(?:19|20)\d{2}.{0,60}|[^。！？]{0,40}(?:all rights reserved|版权所有)\.?|"
+    r"home|menu|back to top|skip to (?:main )?content|sign in|log in|sign up|subscribe|subscribe now|"
+    r"share|share (?:on|this)(?: \w+)?|advertisement|privacy policy|terms of (?:use|service)|"
+    r"this (?:website|site) uses cookies.{0,120}|accept(?: all)? cookies|cookie (?:settings|policy)"
+    r")\s*[:：]?$",
+    re.IGNORECASE,
+)
+
+# 超过该长度的行重复出现才视为抓取重复（如导读段落被渲染两次）；短行重复通常是列表项或小标题
+_DUPLICATE_MIN_LEN = 40
+
+# 出现在正文后半部分时，之后的内容通常是评论区或相关推荐
+_TAIL_MARKERS = re.compile(
+    r"^(评论|全部评论|发表评论|网友评论|热门评论|相关阅读|相关文章|相关推荐|推荐阅读|猜你喜欢|"
+    r"comments?|leave a (comment|reply)|related (articles|posts|stories)|read more|you may also like)\s*[:：]?\s*(\(\d+\))?$",
+    re.IGNORECASE,
+)
+
+def reduce_content(text: str) -> str:
+    """
+    对抓取到的页面文本做内容精简：去掉空行、整行样板与重复的长段落，
+    并截断正文后半部分出现的评论区/相关推荐。短标题、重复的列表项等正文内容保持不变。
+    """
+    if not text:
+        return ""
+    lines = [re.sub(r"\s+", " ", line).strip() for line in text.splitlines()]
+    lines = [line for line in lines if line]
+    total_len = sum(len(line) for line in lines)
+
+    kept = []
+    seen = set()
+    consumed = 0
+    for line in lines:
+        consumed += len(line)
+        # 后半部分出现评论/推荐标记，直接截断
+        if consumed > total_len * 0.5 and _TAIL_MARKERS.match(line):
+            break
+        if _BOILERPLATE_LINE.match(line):
+            continue
+        if len(line) >= _DUPLICATE_MIN_LEN:
+            if line in seen:
+                continue
+            seen.add(line)
+        kept.append(line)
+    return "\n".join(kept)
+
+def split_by_tokens(text: str, max_tokens: int, count) -> list[str]:
+    """
+    按行把文本切分为每块不超过 max_tokens 的片段。
+    count 为计算 token 数的函数；超长的单行按字符硬切。
+    """
+    chunks = []
+    current: list[str] = []
+    current_tokens = 0
+    for line in text.splitlines():
+        line_tokens = count(line)
+        if line_tokens > max_tokens:
+            # 单行超长：按比例估算字符数硬切
+            step = max(1, int(len(line) * max_tokens / line_tokens))
+            pieces = [line[i:i + step] for i in range(0, len(line), step)]
+        else:
+            pieces = [line]
+        for piece in pieces:
+            piece_tokens = count(piece) if len(pieces) > 1 else line_tokens
+            if current and current_tokens + piece_tokens > max_tokens:
+                chunks.append("\n".join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += piece_tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
@@ -0,0 +1,179 @@
+import sqlite3
+from typing import List, Optional
+
+from fastapi import HTTPException, status
+
+from models.llm.conversation import Conversation, ConversationCreate, ConversationDetail, ConversationMessage
+from services.config import get_config_value
+from services.llm.tokens import context_window, count_tokens
+
+CONVERSATION_SUMMARY_PROMPT = (
+    "你负责压缩一段对话的历史记录。请把已有摘要与新增的对话合并为一份新的摘要，"
+    "保留用户的目标、讨论中的关键事实、结论、约定与尚未解决的问题，省略寒暄与重复内容。"
+    "直接输出摘要正文，不要添加任何说明。"
+)
+
+def create_conversation_service(db: sqlite3.Connection, conversation: ConversationCreate) -> Conversation:
+    """
+    创建一个新的服务端会话。
+    """
+    cursor = db.cursor()
+    try:
+        cursor.execute(
+            "INSERT INTO chat_conversations (title, model) VALUES (?, ?)",
+            (conversation.title, conversation.model)
+        )
+        db.commit()
+        return get_conversation_service(db, cursor.lastrowid)
+    except sqlite3.Error as e:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"创建会话失败: {e}")
+
+def get_conversation_service(db: sqlite3.Connection, conversation_id: int) -> Optional[Conversation]:
+    """
+    根据 ID 获取会话（不含消息）。
+    """
+    cursor = db.cursor()
+    cursor.execute(
+        "SELECT id, title, model, summary, created_at, updated_at FROM chat_conversations WHERE id = ?",
+        (conversation_id,)
+    )
+    row = cursor.fetchone()
+    return Conversation(**row) if row else None
+
+def get_all_conversations_service(db: sqlite3.Connection) -> List[Conversation]:
+    """
+    获取所有会话，最近活跃的在前。
+    """
+    cursor = db.cursor()
+    cursor.execute(
+        "SELECT id, title, model, summary, created_at, updated_at FROM chat_conversations ORDER BY updated_at DESC, id DESC"
+    )
+    return [Conversation(**row) for row in cursor.fetchall()]
+
+def get_conversation_detail_service(db: sqlite3.Connection, conversation_id: int) -> Optional[ConversationDetail]:
+    """
+    获取会话及其完整消息记录（包括已被压缩进摘要的消息）。
+    """
+    conversation = get_conversation_service(db, conversation_id)
+    if not conversation:
+        return None
+    cursor = db.cursor()
+    cursor.execute(
+        "SELECT id, role, content, created_at FROM chat_messages WHERE conversation_id = ? ORDER BY id",
+        (conversation_id,)
+    )
+    messages = [ConversationMessage(**row) for row in cursor.fetchall()]
+    return ConversationDetail(**conversation.model_dump(), messages=messages)
+
+def delete_conversation_service(db: sqlite3.Connection, conversation_id: int) -> bool:
+    """
+    删除会话及其全部消息。
+    """
+    cursor = db.cursor()
+    try:
+        cursor.execute("DELETE FROM chat_messages WHERE conversation_id = ?", (conversation_id,))
+        cursor.execute("DELETE FROM chat_conversations WHERE id = ?", (conversation_id,))
+        db.commit()
+        return cursor.rowcount > 0
+    except sqlite3.Error as e:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"删除会话失败: {e}")
+
+def append_conversation_messages(db: sqlite3.Connection, conversation_id: int, messages: list[dict], model: str = "") -> None:
+    """
+    在一个事务中追加一轮对话的消息，并记录每条消息的 token 数，之后计算上下文时无需重新计数。
+    """
+    rows = [
+        (conversation_id, m["role"], m["content"], count_tokens(m["content"], model))
+        for m in messages
+        if m.get("role") in ("system", "user", "assistant") and m.get("content")
+    ]
+    if not rows:
+        return
+    try:
+        db.executemany(
+            "INSERT INTO chat_messages (conversation_id, role, content, tokens) VALUES (?, ?, ?, ?)",
+            rows
+        )
+        db.execute("UPDATE chat_conversations SET updated_at = datetime('now') WHERE id = ?", (conversation_id,))
+        db.commit()
+    except sqlite3.Error as e:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"保存会话消息失败: {e}")
+
+def _load_context(db: sqlite3.Connection, conversation_id: int) -> tuple[str, list[sqlite3.Row]]:
+    # 返回滚动摘要以及尚未被摘要覆盖的消息
+    cursor = db.cursor()
+    cursor.execute("SELECT summary, summarized_until FROM chat_conversations WHERE id = ?", (conversation_id,))
+    row = cursor.fetchone()
+    if not row:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="会话未找到")
+    cursor.execute(
+        "SELECT id, role, content, tokens FROM chat_messages WHERE conversation_id = ? AND id > ? ORDER BY id",
+        (conversation_id, row["summarized_until"])
+    )
+    return row["summary"], cursor.fetchall()
+
+def build_conversation_messages(db: sqlite3.Connection, conversation_id: int, new_messages: list[dict]) -> list[dict]:
+    """
+    组装发送给模型的消息：滚动摘要 + 未压缩的近期消息 + 本轮新消息。
+    """
+    summary, recent = _load_context(db, conversation_id)
+    messages = []
+    if summary:
+        messages.append({"role": "system", "content": f"以下是此前对话的摘要：\n{summary}"})
+    messages.extend({"role": row["role"], "content": row["content"]} for row in recent)
+    messages.extend(new_messages)
+    return messages
+
+async def compact_conversation(db: sqlite3.Connection, client, conversation_id: int) -> bool:
+    """
+    未压缩的历史超过 chat_compact_threshold_tokens 时，把最近 chat_keep_recent_turns 轮之前的消息
+    与已有摘要合并为新的滚动摘要，使每轮请求的上下文大小保持稳定。
+    历史超过上下文预算（chat_max_context_tokens 与模型窗口一半中的较小者）时不论轮数，
+    继续从最早的未压缩消息开始压缩，直到剩余消息回到阈值以内，少数超长轮次也不会让上下文无限增长。
+    返回是否进行了压缩。
+    """
+    keep_turns = max(1, get_config_value(db, "chat_keep_recent_turns", 4, int))
+    budget = min(
+        get_config_value(db, "chat_max_context_tokens", 16000, int),
+        min(context_window(model) for model in client.models) // 2,
+    )
+    limit = min(get_config_value(db, "chat_compact_threshold_tokens", 6000, int), budget)
+    summary, recent = _load_context(db, conversation_id)
+    total = count_tokens(summary, client.models[0]) + sum(row["tokens"] for row in recent)
+    if total < limit:
+        return False
+
+    # 一轮从一条 user 消息开始；保留最后 keep_turns 轮，之前的全部压缩
+    turn_starts = [i for i, row in enumerate(recent) if row["role"] == "user"]
+    split = turn_starts[-keep_turns] if len(turn_starts) > keep_turns else 0
+    if total > budget:
+        remaining = sum(row["tokens"] for row in recent[split:])
+        while split < len(recent) and remaining > limit:
+            remaining -= recent[split]["tokens"]
+            split += 1
+    if split == 0:
+        return False
+    old = recent[:split]
+
+    transcript = "\n\n".join(f"{row['role']}: {row['content']}" for row in old)
+    new_summary = await client.chat_completion([
+        {"role": "system", "content": CONVERSATION_SUMMARY_PROMPT},
+        {"role": "user", "content": f"已有摘要：\n{summary or '（无）'}\n\n新增的对话：\n{transcript}"},
+    ])
+    if not new_summary:
+        return False
+
+    try:
+        db.execute(
+            "UPDATE chat_conversations SET summary = ?, summarized_until = ? WHERE id = ?",
+            (new_summary.strip(), old[-1]["id"], conversation_id)
+        )
+        db.commit()
+    except sqlite3.Error as e:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"保存会话摘要失败: {e}")
+    print(f"会话 {conversation_id} 已压缩 {len(old)} 条消息（约 {total} tokens）。")
+    return True
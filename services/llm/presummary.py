@@ -0,0 +1,155 @@
+import asyncio
+import itertools
+from typing import Iterable, Optional
+
+from services.config import get_config_value
+from services.database import get_db
+from services.fetcher import fetch_article_text
+from services.llm.admission import wait_for_llm_slot
+from services.llm.router import create_llm_client
+from services.llm.content import reduce_content
+from services.llm.summary import estimate_summary_cost, prepare_summary_messages
+from services.llm.summary_cache import find_cached_summary, save_cached_summary
+from services.llm.tokens import HourlyTokenBudget
+from services.rss.article.state import get_ai_summary, save_ai_summary
+
+class PreSummarizer:
+    """
+    后台预摘要流水线。
+    接收更新程序新插入的文章 ID，按优先级排队，以有限并发抓取并生成摘要，
+    结果通过 save_ai_summary 写入数据库，之后 /llm/ai_summary/stream 直接命中缓存分支。
+    """
+    def __init__(self, scraper, concurrency: int = 2, tokens_per_hour: int = 200000, priority_feed_ids: Iterable[int] = ()):
+        self.scraper = scraper  # 浏览器抓取器，仅在 HTTP 抓取不可用时使用
+        self.concurrency = max(1, concurrency)
+        self.budget = HourlyTokenBudget(tokens_per_hour)
+        self.priority_feed_ids = set(priority_feed_ids)
+        self.queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self._seq = itertools.count()  # 同优先级时保持先进先出
+        self._pending: set[int] = set()  # 已排队或处理中的文章，避免重复入队
+        self._workers: list[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @classmethod
+    def from_config(cls, db, scraper) -> Optional["PreSummarizer"]:
+        """
+        根据 config 表创建流水线；未启用时返回 None。
+        """
+        if not get_config_value(db, "ai_presummary_enabled", False, bool):
+            return None
+        priority_feeds = get_config_value(db, "ai_presummary_priority_feeds", "")
+        return cls(
+            scraper,
+            concurrency=get_config_value(db, "ai_presummary_concurrency", 2, int),
+            tokens_per_hour=get_config_value(db, "ai_presummary_token_budget", 200000, int),
+            priority_feed_ids=[int(i) for i in priority_feeds.split(",") if i.strip().isdigit()],
+        )
+
+    def start(self) -> None:
+        """
+        在当前事件循环中启动工作协程。
+        """
+        self._loop = asyncio.get_running_loop()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        print(f"后台预摘要已启动，并发 {self.concurrency}，每小时预算 {self.budget.limit} tokens。")
+
+    async def stop(self) -> None:
+        """
+        停止所有工作协程。
+        """
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit_threadsafe(self, article_ids: Iterable[int]) -> None:
+        """
+        供 RSS 更新线程调用：把新文章 ID 投递到事件循环中排队。
+        """
+        if self._loop and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self.submit, list(article_ids))
+
+    def submit(self, article_ids: Iterable[int]) -> None:
+        """
+        按优先级把文章加入队列：优先订阅源 > 未读 > 发布时间较新。
+        """
+        article_ids = [i for i in article_ids if i not in self._pending]
+        if not article_ids:
+            return
+        db = next(get_db())
+        placeholders = ", ".join("?" for _ in article_ids)
+        cursor = db.cursor()
+        cursor.execute(
+            f"""
+            SELECT a.id, a.feed_id, a.link, a.pub_date, s.is_read, s.ai_summary
+            FROM articles a
+            LEFT JOIN article_states s ON a.id = s.article_id
+            WHERE a.id IN ({placeholders})
+            """,
+            article_ids,
+        )
+        for row in cursor.fetchall():
+            if row["ai_summary"]:
+                continue
+            priority = (
+                0 if row["feed_id"] in self.priority_feed_ids else 1,
+                1 if row["is_read"] else 0,
+                -(row["pub_date"] or 0),
+            )
+            self._pending.add(row["id"])
+            self.queue.put_nowait((priority, next(self._seq), row["id"], row["link"]))
+
+    async def _worker(self) -> None:
+        while True:
+            _, _, article_id, url = await self.queue.get()
+            try:
+                await self._summarize(article_id, url)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"后台预摘要失败 (article_id: {article_id}): {e}")
+            finally:
+                self._pending.discard(article_id)
+                self.queue.task_done()
+
+    async def _summarize(self, article_id: int, url: str) -> None:
+        db = next(get_db())
+        # 用户可能已经在前台触发了摘要
+        if get_ai_summary(db, article_id):
+            return
+
+        client = create_llm_client()
+        # 重复文章直接复用共享缓存，不再消耗 token
+        cached, cache_keys = find_cached_summary(db, client.models, url=url)
+        if not cached:
+            ticket = await wait_for_llm_slot(db, client)
+            try:
+                article_content = reduce_content(await fetch_article_text(self.scraper, url))
+            finally:
+                ticket.release()
+            cached, cache_keys = find_cached_summary(db, client.models, url=url, content=article_content)
+        if cached:
+            save_ai_summary(db, article_id, cached)
+            return
+
+        cost = estimate_summary_cost(db, client.models, article_content)
+        if not self.budget.fits(cost):
+            print(f"后台预摘要跳过 (article_id: {article_id})：预计 {cost} tokens 超过每小时预算。")
+            return
+        await self.budget.reserve(cost)
+
+        ticket = await wait_for_llm_slot(db, client)
+        error = None
+        served: dict = {}
+        try:
+            messages = await prepare_summary_messages(db, client, article_content)
+            summary = await client.chat_completion(messages, served=served)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            ticket.release(error)
+        if summary:
+            save_cached_summary(db, cache_keys, summary, served["model"])
+            if not get_ai_summary(db, article_id):
+                save_ai_summary(db, article_id, summary)
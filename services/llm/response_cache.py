@@ -0,0 +1,104 @@
+import hashlib
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from fastapi import HTTPException
+
+from services.config import get_config_value
+
+class ResponseCache:
+    """
+    进程内的 LRU + TTL 响应缓存，值为流式输出的 chunk 列表。
+    """
+    def __init__(self, max_entries: int = 256, ttl: float = 3600):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, list[str]]] = OrderedDict()
+
+    def get(self, key: str) -> Optional[list[str]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        created_at, chunks = entry
+        if time.time() - created_at > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return chunks
+
+    def put(self, key: str, chunks: list[str], created_at: Optional[float] = None) -> None:
+        self._entries[key] = (created_at or time.time(), chunks)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+_memory_cache = ResponseCache()
+
+def response_cache_key(model: str, messages: list[dict], **params) -> str:
+    """
+    按模型、消息与请求参数计算缓存键；JSON 按键排序，保证相同请求得到相同的键。
+    """
+    payload = json.dumps(
+        {"model": model, "messages": messages, "params": params},
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def response_cache_enabled(db: sqlite3.Connection) -> bool:
+    return get_config_value(db, "llm_response_cache_enabled", True, bool)
+
+def _configure(db: sqlite3.Connection) -> ResponseCache:
+    # 配置可以在运行时修改，每次访问时同步容量与 TTL
+    _memory_cache.ttl = get_config_value(db, "llm_response_cache_ttl_seconds", 3600, int)
+    _memory_cache.max_entries = max(1, get_config_value(db, "llm_response_cache_max_entries", 256, int))
+    return _memory_cache
+
+def get_cached_response(db: sqlite3.Connection, key: str) -> Optional[list[str]]:
+    """
+    先查内存层，未命中且开启持久化时再查 SQLite，命中后回填内存层。
+    """
+    cache = _configure(db)
+    chunks = cache.get(key)
+    if chunks is not None or not get_config_value(db, "llm_response_cache_persist", False, bool):
+        return chunks
+    try:
+        cursor = db.cursor()
+        cursor.execute(
+            "SELECT chunks, created_at FROM llm_response_cache WHERE cache_key = ? AND created_at >= ?",
+            (key, time.time() - cache.ttl),
+        )
+        row = cursor.fetchone()
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"数据库错误: {e}")
+    if not row:
+        return None
+    chunks = json.loads(row["chunks"])
+    cache.put(key, chunks, row["created_at"])
+    return chunks
+
+def save_cached_response(db: sqlite3.Connection, key: str, model: str, chunks: list[str]) -> None:
+    """
+    保存一次完整生成的 chunk 列表；开启持久化时同时写入 SQLite 并清理过期记录。
+    """
+    if not chunks:
+        return
+    cache = _configure(db)
+    now = time.time()
+    cache.put(key, chunks, now)
+    if not get_config_value(db, "llm_response_cache_persist", False, bool):
+        return
+    try:
+        db.execute(
+            "INSERT OR REPLACE INTO llm_response_cache (cache_key, model, chunks, created_at) VALUES (?, ?, ?, ?)",
+            (key, model, json.dumps(chunks, ensure_ascii=False), now),
+        )
+        db.execute("DELETE FROM llm_response_cache WHERE created_at < ?", (now - cache.ttl,))
+        db.commit()
+    except sqlite3.Error as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"数据库错误: {e}")
@@ -0,0 +1,277 @@
+import asyncio
+import time
+from typing import Optional, Union
+
+from services.config import get_config_value
+from services.database import get_db
+from services.llm.admission import AdmissionTicket, get_admission_controller
+from services.llm.chat import OpenAIStreamClient
+
+# 出错后多久允许再次尝试不健康的 provider（半开）
+UNHEALTHY_RETRY_SECONDS = 30
+# 判定为不健康的错误率阈值
+UNHEALTHY_ERROR_RATE = 0.5
+
+class ProviderStats:
+    """
+    单个 provider 的首 token 延迟与错误率（指数滑动平均）。
+    """
+    def __init__(self):
+        self.ttft = 1.0
+        self.error_rate = 0.0
+        self.last_failure = 0.0
+
+    def record_success(self, ttft: Optional[float] = None) -> None:
+        if ttft is not None:
+            self.ttft = self.ttft * 0.7 + ttft * 0.3
+        self.error_rate *= 0.7
+
+    def record_failure(self) -> None:
+        self.error_rate = self.error_rate * 0.7 + 0.3
+        self.last_failure = time.monotonic()
+
+    def healthy(self) -> bool:
+        return self.error_rate < UNHEALTHY_ERROR_RATE or time.monotonic() - self.last_failure > UNHEALTHY_RETRY_SECONDS
+
+    def score(self) -> float:
+        # 首 token 延迟按错误率加权，越小越好
+        return self.ttft * (1 + 4 * self.error_rate)
+
+# 进程内共享的 provider 统计，按 llm_config.id 索引
+_stats: dict[int, ProviderStats] = {}
+
+def provider_stats(config_id: int) -> ProviderStats:
+    return _stats.setdefault(config_id, ProviderStats())
+
+class LLMRouter:
+    """
+    在多个 llm_config 之间路由的客户端，接口与 OpenAIStreamClient 一致。
+    按首 token 延迟与错误率优先选择最快的健康 provider，首字节之前失败时自动切换到下一个；
+    开启对冲时，若首选 provider 在 hedge_delay 内没有产出首 token，则同时请求下一个 provider，
+    采用先产出首 token 的一方并取消另一方。
+    每个 provider 按各自的 llm_config 做准入控制；实际提供服务的 provider 通过 served 参数告知调用方。
+    """
+    def __init__(self, clients: list[OpenAIStreamClient], hedge: bool = False, hedge_delay: float = 1.5):
+        if not clients:
+            raise RuntimeError("没有可用的 LLM provider")
+        self.clients = clients
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+        # 可能提供服务的模型（按配置顺序去重），用于缓存查找与 token 预算
+        self.models = list(dict.fromkeys(client.model for client in clients))
+        # reserve 提前占用的 (client, ticket)，由下一次流式请求接管
+        self._reserved: Optional[tuple] = None
+
+    def ordered_clients(self, model: Optional[str] = None) -> list[OpenAIStreamClient]:
+        """
+        配置的模型与 model 一致的 provider 在前，其次是健康的 provider，各组内按得分升序。
+        """
+        return sorted(
+            self.clients,
+            key=lambda c: (
+                model is not None and c.model != model,
+                not provider_stats(c.config_id).healthy(),
+                provider_stats(c.config_id).score(),
+            ),
+        )
+
+    def _model_override(self, model: Optional[str], first: bool) -> Optional[str]:
+        """
+        显式指定的模型只发给配置中提供该模型的 provider（它们本就使用该模型，无需覆盖）；
+        没有 provider 配置该模型时只用于首个请求，故障切换与对冲的目标改用各自配置的模型。
+        """
+        if model is None or not first or any(client.model == model for client in self.clients):
+            return None
+        return model
+
+    async def reserve(self, model: Optional[str] = None) -> AdmissionTicket:
+        """
+        在返回流式响应之前为本次请求占用一个 provider 的名额，队列满或等待超时在此抛出 AdmissionRejected，
+        而不是在响应开始之后才于流中途失败。
+        之后的流式请求首先使用该名额；返回的 ticket 由调用方在结束时归还（重复归还无副作用）。
+        """
+        self._reserved = await self._admit(self.ordered_clients(model), wait=True)
+        return self._reserved[1]
+
+    async def _admit(self, candidates: list[OpenAIStreamClient], wait: bool, borrow: bool = False):
+        """
+        从候选中取出首个有空闲名额的 provider 并占用其 llm_config 的名额，返回 (client, ticket)。
+        有 reserve 提前占用且尚未归还的名额时优先使用：borrow 为真时只借用（返回不占用名额的 ticket，
+        名额留给同一请求随后的流式生成），否则接管该名额。
+        都没有空闲名额时：wait 为真则在首个候选的队列中等待（队列满或超时抛出 AdmissionRejected），否则返回 None。
+        """
+        if self._reserved is not None:
+            client, ticket = self._reserved
+            if ticket.released or client not in candidates:
+                self._reserved = None
+            else:
+                candidates.remove(client)
+                if borrow:
+                    return client, AdmissionTicket(None)
+                self._reserved = None
+                return client, ticket
+        db = next(get_db())
+        for client in candidates:
+            ticket = get_admission_controller(db, client.config_id).try_acquire()
+            if ticket is not None:
+                candidates.remove(client)
+                return client, ticket
+        if not wait:
+            return None
+        client = candidates.pop(0)
+        return client, await get_admission_controller(db, client.config_id).acquire()
+
+    async def _discard(self, task: asyncio.Task, stream) -> None:
+        # 先取消正在等待首 token 的任务，再关闭其生成器（关闭上游连接）
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await stream.aclose()
+
+    async def stream_chat_completion(self, messages: list[dict], model: Optional[str] = None, served: Optional[dict] = None):
+        """
+        流式聊天补全，首字节之前支持故障切换与对冲。
+        served 传入时写入实际提供服务的 provider 的 config_id 与 model。
+        """
+        candidates = self.ordered_clients(model)
+        pending: dict = {}  # task -> (client, stream, started, ticket, client_served)
+        last_error: Optional[BaseException] = None
+        winner = None
+        first_launch = True
+
+        async def launch(wait: bool) -> bool:
+            nonlocal first_launch
+            admitted = await self._admit(candidates, wait)
+            if admitted is None:
+                return False
+            client, ticket = admitted
+            client_served: dict = {}
+            stream = client.stream_chat_completion(messages, model=self._model_override(model, first_launch), served=client_served)
+            first_launch = False
+            task = asyncio.ensure_future(stream.__anext__())
+            pending[task] = (client, stream, time.monotonic(), ticket, client_served)
+            return True
+
+        await launch(wait=True)
+        try:
+            while pending and winner is None:
+                # 只有一个请求在等首 token 且还有备选时，才需要对冲计时
+                timeout = self.hedge_delay if self.hedge and candidates and len(pending) == 1 else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    slow = next(iter(pending.values()))[0]
+                    # 备选 provider 都没有空闲名额时不对冲，下一个计时周期再试
+                    if await launch(wait=False):
+                        print(f"LLM provider {slow.config_id} 首 token 超过 {self.hedge_delay}s，发起对冲请求。")
+                    continue
+                for task in done:
+                    client, stream, started, ticket, client_served = pending.pop(task)
+                    stats = provider_stats(client.config_id)
+                    try:
+                        first = task.result()
+                    except StopAsyncIteration:
+                        first = None
+                    except Exception as e:
+                        stats.record_failure()
+                        ticket.release(e)
+                        last_error = e
+                        print(f"LLM provider {client.config_id} 首字节前失败，尝试下一个: {e}")
+                        await stream.aclose()
+                        continue
+                    if winner is None:
+                        stats.record_success(time.monotonic() - started)
+                        winner = (client, stream, first, ticket, client_served)
+                    else:
+                        ticket.release()
+                        await stream.aclose()
+                # 全部失败且没有进行中的请求时，切换到下一个 provider
+                if winner is None and not pending and candidates:
+                    await launch(wait=True)
+        except BaseException:
+            if winner is not None:
+                winner[3].release()
+                await winner[1].aclose()
+            raise
+        finally:
+            for task, (_, stream, _, ticket, _) in list(pending.items()):
+                ticket.release()
+                await self._discard(task, stream)
+            pending.clear()
+
+        if winner is None:
+            raise last_error or RuntimeError("所有 LLM provider 均不可用")
+
+        client, stream, first, ticket, client_served = winner
+        if served is not None:
+            served.update(client_served)
+        error = None
+        try:
+            if first is None:
+                return
+            yield first
+            async for chunk in stream:
+                yield chunk
+        except Exception as e:
+            error = e
+            provider_stats(client.config_id).record_failure()
+            raise
+        finally:
+            ticket.release(error)
+            await stream.aclose()
+
+    async def chat_completion(self, messages: list[dict], model: Optional[str] = None, served: Optional[dict] = None) -> str:
+        """
+        非流式聊天补全，按顺序故障切换。
+        served 传入时写入实际提供服务的 provider 的 config_id 与 model。
+        """
+        candidates = self.ordered_clients(model)
+        last_error: Optional[BaseException] = None
+        first = True
+        while candidates:
+            # 与流式生成属于同一请求（如会话压缩）时借用 reserve 的名额
+            client, ticket = await self._admit(candidates, wait=True, borrow=True)
+            override = self._model_override(model, first)
+            first = False
+            stats = provider_stats(client.config_id)
+            error = None
+            try:
+                result = await client.chat_completion(messages, model=override, served=served)
+            except Exception as e:
+                error = e
+                stats.record_failure()
+                last_error = e
+                print(f"LLM provider {client.config_id} 请求失败，尝试下一个: {e}")
+                continue
+            finally:
+                ticket.release(error)
+            # 非流式请求没有首 token 时间，只更新错误率
+            stats.record_success()
+            return result
+        raise last_error or RuntimeError("所有 LLM provider 均不可用")
+
+# 路由层对外暴露的客户端类型
+LLMClient = Union[OpenAIStreamClient, LLMRouter]
+
+def create_llm_client() -> LLMClient:
+    """
+    根据配置创建 LLM 客户端：
+    llm_config_ids 配置了多个 provider 时返回 LLMRouter，否则返回单个 OpenAIStreamClient。
+    初始化失败时抛出 RuntimeError。
+    """
+    db = next(get_db())
+    config_ids = [int(i) for i in get_config_value(db, "llm_config_ids", "").split(",") if i.strip().isdigit()]
+    if len(config_ids) <= 1:
+        return OpenAIStreamClient(config_ids[0] if config_ids else None)
+
+    clients = []
+    for config_id in config_ids:
+        try:
+            clients.append(OpenAIStreamClient(config_id))
+        except RuntimeError as e:
+            print(f"警告: 跳过无法初始化的 LLM provider {config_id}: {e}")
+    if not clients:
+        raise RuntimeError("llm_config_ids 中没有可用的 LLM 配置")
+    return LLMRouter(
+        clients,
+        hedge=get_config_value(db, "llm_hedge_enabled", False, bool),
+        hedge_delay=get_config_value(db, "llm_hedge_delay_ms", 1500, int) / 1000,
+    )
@@ -0,0 +1,68 @@
+import asyncio
+import base64
+from typing import AsyncIterator
+
+def format_sse_text(data: str) -> bytes:
+    """
+    按 SSE 规范封装文本：换行拆分为多个 data 行，客户端（EventSource）会用 \\n 重新拼接。
+    UTF-8 文本原样传输，不做额外编码。
+    """
+    lines = data.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return ("".join(f"data: {line}\n" for line in lines) + "\n").encode("utf-8")
+
+def format_sse_base64(data: str) -> bytes:
+    """
+    把 chunk 做 Base64 编码后封装为单个 SSE 事件（兼容旧客户端）。
+    """
+    encoded = base64.b64encode(data.encode("utf-8")).decode("ascii")
+    return f"data: {encoded}\n\n".encode("utf-8")
+
+async def coalesce_chunks(source: AsyncIterator[str], flush_interval: float = 0.03, max_bytes: int = 512) -> AsyncIterator[str]:
+    """
+    合并相邻的小 chunk：在 flush_interval 窗口内累积，超过 max_bytes 立即输出。
+    第一个 chunk 立即输出，不增加首字延迟。
+    """
+    loop = asyncio.get_running_loop()
+    iterator = source.__aiter__()
+    pending: list[str] = []
+    pending_bytes = 0
+    deadline = 0.0
+    first = True
+    next_chunk = None
+    try:
+        while True:
+            if next_chunk is None:
+                next_chunk = asyncio.ensure_future(iterator.__anext__())
+            timeout = max(0.0, deadline - loop.time()) if pending else None
+            done, _ = await asyncio.wait({next_chunk}, timeout=timeout)
+            if not done:
+                # 窗口到期，输出已累积的内容
+                yield "".join(pending)
+                pending, pending_bytes = [], 0
+                continue
+            task, next_chunk = next_chunk, None
+            try:
+                chunk = task.result()
+            except StopAsyncIteration:
+                break
+            except Exception:
+                # 先把已累积的内容发出去，再抛出上游错误
+                if pending:
+                    yield "".join(pending)
+                raise
+            if first:
+                first = False
+                yield chunk
+                continue
+            if not pending:
+                deadline = loop.time() + flush_interval
+            pending.append(chunk)
+            pending_bytes += len(chunk.encode("utf-8"))
+            if pending_bytes >= max_bytes:
+                yield "".join(pending)
+                pending, pending_bytes = [], 0
+        if pending:
+            yield "".join(pending)
+    finally:
+        if next_chunk is not None:
+            next_chunk.cancel()
@@ -0,0 +1,94 @@
+import asyncio
+import hashlib
+
+from services.config import get_config_value
+from services.llm.content import split_by_tokens
+from services.llm.tokens import context_window, count_tokens
+
+# 文章摘要相关的提示词与消息构建，供 /llm/ai_summary/stream 与后台预摘要共用
+SUMMARY_SYSTEM_PROMPT = "你是一个专业的文章摘要助手。请用中文简明扼要地总结以下文章，提取核心观点和关键信息。尽可能总结成一段话，使用markdown格式（加粗、斜体等）标注重要内容。"
+
+# 长文章 map-reduce：先分段提炼要点（map），再汇总成最终摘要（reduce）
+SUMMARY_MAP_PROMPT = "你是一个专业的文章摘要助手。以下是一篇长文章的其中一部分，请用中文提炼这一部分的核心观点、关键事实与数据，不要添加原文没有的内容，不超过 200 字。"
+SUMMARY_REDUCE_PREFIX = "以下是同一篇文章按顺序分段提炼出的要点，请据此总结全文："
+
+# 生成被中断后续写
+SUMMARY_CONTINUE_PROMPT = "请从上次中断的位置继续输出剩余的摘要内容，不要重复已输出的部分。"
+
+# 提示词版本：由所有发送给模型的提示词派生，修改任一提示词后旧的缓存摘要自动失效
+SUMMARY_PROMPT_VERSION = hashlib.sha256(
+    "\n".join([SUMMARY_SYSTEM_PROMPT, SUMMARY_MAP_PROMPT, SUMMARY_REDUCE_PREFIX, SUMMARY_CONTINUE_PROMPT]).encode("utf-8")
+).hexdigest()[:12]
+
+# 摘要输出的预估 token 数，用于预算控制
+SUMMARY_OUTPUT_TOKENS = 400
+SUMMARY_MAP_OUTPUT_TOKENS = 300
+
+def build_summary_messages(article_content: str) -> list[dict]:
+    """
+    根据抓取到的文章正文构建摘要请求的消息列表。
+    """
+    return [
+        {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+        {"role": "user", "content": article_content}
+    ]
+
+def build_continuation_messages(messages: list[dict], partial: str) -> list[dict]:
+    """
+    在已生成的部分摘要之后续写，用于恢复被取消的生成。
+    """
+    if not partial:
+        return messages
+    return messages + [
+        {"role": "assistant", "content": partial},
+        {"role": "user", "content": SUMMARY_CONTINUE_PROMPT}
+    ]
+
+def summary_input_budget(db, models: list[str]) -> int:
+    """
+    单次摘要请求允许的输入 token 数：配置值与各模型上下文窗口一半中的较小者。
+    models 为可能提供服务的模型（LLMRouter 可能切换到任一 provider），取最小窗口。
+    """
+    configured = get_config_value(db, "ai_summary_max_input_tokens", 6000, int)
+    return max(500, min(configured, min(context_window(model) for model in models) // 2))
+
+def estimate_summary_cost(db, models: list[str], article_content: str) -> int:
+    """
+    预估一次摘要（含 map 阶段）的总 token 消耗。
+    """
+    tokens = count_tokens(article_content, models[0])
+    budget = summary_input_budget(db, models)
+    if tokens <= budget:
+        return tokens + SUMMARY_OUTPUT_TOKENS
+    chunks = min(-(-tokens // budget), get_config_value(db, "ai_summary_max_chunks", 8, int))
+    return min(tokens, chunks * budget) + chunks * SUMMARY_MAP_OUTPUT_TOKENS * 2 + SUMMARY_OUTPUT_TOKENS
+
+async def prepare_summary_messages(db, client, article_content: str) -> list[dict]:
+    """
+    根据精简后的正文构建最终的摘要消息。
+    正文在 token 预算内时直接返回单次摘要消息；
+    超长时先并发对各分段做 map 提炼，再返回汇总（reduce）消息，由调用方流式生成最终输出。
+    """
+    budget = summary_input_budget(db, client.models)
+    model = client.models[0]
+    if count_tokens(article_content, model) <= budget:
+        return build_summary_messages(article_content)
+
+    chunks = split_by_tokens(article_content, budget, lambda text: count_tokens(text, model))
+    max_chunks = get_config_value(db, "ai_summary_max_chunks", 8, int)
+    if len(chunks) > max_chunks:
+        print(f"文章过长，共 {len(chunks)} 段，仅摘要前 {max_chunks} 段。")
+        chunks = chunks[:max_chunks]
+
+    semaphore = asyncio.Semaphore(get_config_value(db, "ai_summary_map_concurrency", 4, int))
+
+    async def summarize_chunk(index: int, chunk: str) -> str:
+        async with semaphore:
+            return await client.chat_completion([
+                {"role": "system", "content": SUMMARY_MAP_PROMPT},
+                {"role": "user", "content": f"（第 {index + 1}/{len(chunks)} 部分）\n{chunk}"}
+            ])
+
+    partials = await asyncio.gather(*(summarize_chunk(i, chunk) for i, chunk in enumerate(chunks)))
+    points = "\n\n".join(f"[第 {i + 1} 部分]\n{partial}" for i, partial in enumerate(partials) if partial)
+    return build_summary_messages(f"{SUMMARY_REDUCE_PREFIX}\n\n{points}")
@@ -0,0 +1,107 @@
+import hashlib
+import re
+import sqlite3
+import unicodedata
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from fastapi import HTTPException
+
+from services.llm.summary import SUMMARY_PROMPT_VERSION
+
+# 不影响文章内容的跟踪参数
+_TRACKING_PARAMS = {"fbclid", "gclid", "yclid", "mc_cid", "mc_eid", "spm", "ref", "ref_src", "from"}
+
+def canonicalize_url(url: str) -> str:
+    """
+    规范化文章链接：小写协议与主机、去掉默认端口、片段、跟踪参数和末尾斜杠，并对查询参数排序。
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if parts.port and not ((scheme == "http" and parts.port == 80) or (scheme == "https" and parts.port == 443)):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in _TRACKING_PARAMS
+    )
+    path = parts.path.rstrip("/") or "/"
+    # http 与 https 视为同一篇文章
+    return urlunsplit(("https" if scheme in ("http", "https") else scheme, host, path, urlencode(query), ""))
+
+def normalize_text(text: str) -> str:
+    """
+    规范化正文用于计算内容哈希：NFKC、大小写折叠并合并空白。
+    """
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return re.sub(r"\s+", " ", text).strip()
+
+def summary_cache_keys(url: Optional[str] = None, content: Optional[str] = None) -> list[str]:
+    """
+    生成摘要缓存键（规范化 URL 或正文哈希）。
+    缓存键与模型无关，可随摘要会话持久化；写入与查找时再与模型名、提示词版本一起哈希为行键。
+    """
+    keys = []
+    if url:
+        keys.append(f"url|{canonicalize_url(url)}")
+    if content:
+        normalized = normalize_text(content)
+        if normalized:
+            keys.append(f"content|{hashlib.sha256(normalized.encode('utf-8')).hexdigest()}")
+    return keys
+
+def _row_key(key: str, model: str) -> str:
+    # 模型名与提示词版本参与哈希，任一变化都会得到新的行键
+    return hashlib.sha256(f"{key}|{model}|{SUMMARY_PROMPT_VERSION}".encode("utf-8")).hexdigest()
+
+def get_cached_summary(db: sqlite3.Connection, keys: list[str], models: list[str]) -> Optional[sqlite3.Row]:
+    """
+    按任意一个缓存键与任意一个模型查找已生成的摘要，返回 (summary, model) 行。
+    """
+    row_keys = [_row_key(key, model) for model in models for key in keys]
+    if not row_keys:
+        return None
+    try:
+        cursor = db.cursor()
+        placeholders = ", ".join("?" for _ in row_keys)
+        cursor.execute(
+            f"SELECT summary, model FROM ai_summary_cache WHERE cache_key IN ({placeholders}) LIMIT 1",
+            row_keys,
+        )
+        return cursor.fetchone()
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"数据库错误: {e}")
+
+def save_cached_summary(db: sqlite3.Connection, keys: list[str], summary: str, model: str) -> None:
+    """
+    把摘要写入所有缓存键，使 URL 与内容两种途径都能命中。model 为实际生成摘要的模型。
+    """
+    if not keys or not summary:
+        return
+    try:
+        db.executemany(
+            """
+            INSERT OR REPLACE INTO ai_summary_cache (cache_key, summary, model, prompt_version)
+            VALUES (?, ?, ?, ?)
+            """,
+            [(_row_key(key, model), summary, model, SUMMARY_PROMPT_VERSION) for key in keys],
+        )
+        db.commit()
+    except sqlite3.Error as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"数据库错误: {e}")
+
+def find_cached_summary(db: sqlite3.Connection, models: list[str], url: Optional[str] = None, content: Optional[str] = None) -> tuple[Optional[str], list[str]]:
+    """
+    在 models 中任意模型生成的缓存里查找摘要，同时返回本次使用的缓存键，便于生成后回写。
+    命中时把摘要回填到其余缓存键（沿用生成它的模型），此后 URL 与内容两种途径都能直接命中。
+    """
+    keys = summary_cache_keys(url, content)
+    row = get_cached_summary(db, keys, models)
+    if row is None:
+        return None, keys
+    if len(keys) > 1:
+        save_cached_summary(db, keys, row["summary"], row["model"])
+    return row["summary"], keys
@@ -0,0 +1,183 @@
+import json
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from typing import Optional
+
+from fastapi import HTTPException
+
+# 当前 worker 的标识，用于区分同一数据库上的多个 uvicorn worker / 实例
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# owner 超过该时间没有心跳即视为已失效，其他 worker 可以接管
+SESSION_STALE_SECONDS = 30
+
+def claim_session(db: sqlite3.Connection, article_id: int, messages: list[dict], cache_keys: list[str], max_attempts: int = 3) -> bool:
+    """
+    尝试成为该文章摘要会话的 owner。
+    会话不存在、已暂停/完成、失败次数未达 max_attempts，或 owner 心跳过期时可被接管；
+    单条 UPSERT 语句保证跨进程原子性。重新生成已完成的会话时失败次数清零。
+    """
+    token = uuid.uuid4().hex
+    now = time.time()
+    try:
+        prior = db.execute("SELECT status FROM ai_summary_sessions WHERE article_id = ?", (article_id,)).fetchone()
+        db.execute(
+            """
+            INSERT INTO ai_summary_sessions (article_id, owner, claim_token, status, messages, cache_keys, heartbeat_at)
+            VALUES (?, ?, ?, 'running', ?, ?, ?)
+            ON CONFLICT(article_id) DO UPDATE SET
+                owner = excluded.owner,
+                claim_token = excluded.claim_token,
+                status = 'running',
+                messages = excluded.messages,
+                cache_keys = excluded.cache_keys,
+                heartbeat_at = excluded.heartbeat_at,
+                attempts = CASE WHEN ai_summary_sessions.status = 'done' THEN 0 ELSE ai_summary_sessions.attempts END
+            WHERE ai_summary_sessions.status IN ('paused', 'done')
+               OR (ai_summary_sessions.status = 'failed' AND ai_summary_sessions.attempts < ?)
+               OR (ai_summary_sessions.status = 'running' AND ai_summary_sessions.heartbeat_at < ?)
+            """,
+            (article_id, WORKER_ID, token, json.dumps(messages, ensure_ascii=False), json.dumps(cache_keys), now, max_attempts, now - SESSION_STALE_SECONDS),
+        )
+        db.commit()
+        row = db.execute("SELECT claim_token FROM ai_summary_sessions WHERE article_id = ?", (article_id,)).fetchone()
+        claimed = row is not None and row["claim_token"] == token
+        if claimed and prior and prior["status"] == "done":
+            # 已完成会话的 chunk 只用于断点续传，重新生成时从头开始
+            db.execute("DELETE FROM ai_summary_chunks WHERE article_id = ?", (article_id,))
+            db.commit()
+        return claimed
+    except sqlite3.Error as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"数据库错误: {e}")
+
+def get_session(db: sqlite3.Connection, article_id: int) -> Optional[dict]:
+    """
+    获取会话信息，messages 与 cache_keys 已解析为列表。
+    """
+    try:
+        row = db.execute(
+            """
+            SELECT article_id, owner, status, messages, cache_keys, heartbeat_at, watcher_heartbeat_at, attempts, last_error
+            FROM ai_summary_sessions WHERE article_id = ?
+            """,
+            (article_id,),
+        ).fetchone()
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"数据库错误: {e}")
+    if not row:
+        return None
+    session = dict(row)
+    session["messages"] = json.loads(session["messages"])
+    session["cache_keys"] = json.loads(session["cache_keys"])
+    return session
+
+def is_owned_elsewhere(session: Optional[dict]) -> bool:
+    """
+    会话是否正由另一个存活的 worker 生成。
+    """
+    return (
+        session is not None
+        and session["status"] == "running"
+        and session["owner"] != WORKER_ID
+        and session["heartbeat_at"] >= time.time() - SESSION_STALE_SECONDS
+    )
+
+def append_chunks(db: sqlite3.Connection, article_id: int, start_seq: int, chunks: list[str]) -> None:
+    """
+    追加一批 chunk（seq 从 start_seq 开始），并顺带刷新 owner 心跳。
+    """
+    if not chunks:
+        return
+    try:
+        db.executemany(
+            "INSERT OR IGNORE INTO ai_summary_chunks (article_id, seq, content) VALUES (?, ?, ?)",
+            [(article_id, start_seq + i, chunk) for i, chunk in enumerate(chunks)],
+        )
+        db.execute("UPDATE ai_summary_sessions SET heartbeat_at = ? WHERE article_id = ?", (time.time(), article_id))
+        db.commit()
+    except sqlite3.Error as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"数据库错误: {e}")
+
+def read_chunks(db: sqlite3.Connection, article_id: int, offset: int = 0) -> list[str]:
+    """
+    读取 seq >= offset 的 chunk。
+    """
+    try:
+        rows = db.execute(
+            "SELECT content FROM ai_summary_chunks WHERE article_id = ? AND seq >= ? ORDER BY seq",
+            (article_id, offset),
+        ).fetchall()
+        return [row["content"] for row in rows]
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"数据库错误: {e}")
+
+def touch_session(db: sqlite3.Connection, article_id: int, watcher: bool = False) -> None:
+    """
+    刷新心跳：owner 刷新 heartbeat_at，其他 worker 上的订阅者刷新 watcher_heartbeat_at。
+    """
+    column = "watcher_heartbeat_at" if watcher else "heartbeat_at"
+    try:
+        db.execute(f"UPDATE ai_summary_sessions SET {column} = ? WHERE article_id = ?", (time.time(), article_id))
+        db.commit()
+    except sqlite3.Error as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"数据库错误: {e}")
+
+def set_session_status(db: sqlite3.Connection, article_id: int, status: str) -> None:
+    """
+    更新会话状态（running / paused / done / failed）。
+    """
+    try:
+        db.execute(
+            "UPDATE ai_summary_sessions SET status = ?, heartbeat_at = ? WHERE article_id = ? AND owner = ?",
+            (status, time.time(), article_id, WORKER_ID),
+        )
+        db.commit()
+    except sqlite3.Error as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"数据库错误: {e}")
+
+def record_session_failure(db: sqlite3.Connection, article_id: int, error: BaseException) -> None:
+    """
+    标记会话失败，累加失败次数并记录错误信息。
+    """
+    try:
+        db.execute(
+            """
+            UPDATE ai_summary_sessions SET status = 'failed', attempts = attempts + 1, last_error = ?, heartbeat_at = ?
+            WHERE article_id = ? AND owner = ?
+            """,
+            (str(error), time.time(), article_id, WORKER_ID),
+        )
+        db.commit()
+    except sqlite3.Error as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"数据库错误: {e}")
+
+def attempts_exhausted(session: Optional[dict], max_attempts: int) -> bool:
+    """
+    会话是否已连续失败 max_attempts 次，不应再自动续写。
+    """
+    return session is not None and session["status"] == "failed" and session["attempts"] >= max_attempts
+
+def cleanup_expired_sessions(db: sqlite3.Connection, ttl_seconds: float) -> int:
+    """
+    删除最后心跳早于 TTL 的会话及其 chunk，返回删除的会话数。
+    """
+    cutoff = time.time() - ttl_seconds
+    try:
+        db.execute(
+            "DELETE FROM ai_summary_chunks WHERE article_id IN (SELECT article_id FROM ai_summary_sessions WHERE heartbeat_at < ?)",
+            (cutoff,),
+        )
+        cursor = db.execute("DELETE FROM ai_summary_sessions WHERE heartbeat_at < ?", (cutoff,))
+        db.commit()
+        return cursor.rowcount
+    except sqlite3.Error as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"数据库错误: {e}")
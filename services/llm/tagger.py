@@ -0,0 +1,234 @@
+import asyncio
+import json
+import re
+import sqlite3
+from typing import Iterable, Optional
+
+from services.config import get_config_value
+from services.database import get_db
+from services.llm.admission import wait_for_llm_slot
+from services.llm.router import create_llm_client
+from services.llm.tokens import HourlyTokenBudget, count_tokens
+from services.rss.article.state import get_all_tags
+
+TAGGING_SYSTEM_PROMPT = (
+    "你是 RSS 文章分类助手。用户会给出若干篇文章的 ID 与标题，请为每篇文章给出 1 到 {max_tags} 个简短的主题标签。"
+    "尽量复用已有标签，保持同一主题的标签写法一致；标签中不能包含逗号。"
+    "只输出一个 JSON 对象，键为文章 ID（字符串），值为标签数组，例如：{{\"12\": [\"人工智能\", \"开源\"]}}。"
+)
+# 每篇文章的输出 token 估计，用于预算
+TAGGING_OUTPUT_TOKENS_PER_ARTICLE = 24
+# 标签最大长度
+MAX_TAG_LENGTH = 32
+# 一篇文章最多尝试打标签的次数
+MAX_TAGGING_ATTEMPTS = 3
+# 提示词中附带的已有标签数量上限
+MAX_VOCABULARY_TAGS = 100
+# 没有新文章时重新扫描的间隔（秒）
+IDLE_SCAN_INTERVAL = 300
+
+def parse_tagging_response(text: str, article_ids: Iterable[int], max_tags: int) -> dict[int, list[str]]:
+    """
+    解析并校验模型返回的 JSON：只接受本批次的文章 ID，丢弃含逗号、过长或重复的标签。
+    无法解析时抛出 ValueError。
+    """
+    # 兼容模型用 ```json 代码块包裹输出
+    match = re.search(r"\{.*\}", text or "", re.S)
+    if not match:
+        raise ValueError("响应中没有 JSON 对象")
+    data = json.loads(match.group(0))
+    if not isinstance(data, dict):
+        raise ValueError("响应不是 JSON 对象")
+
+    wanted = set(article_ids)
+    result: dict[int, list[str]] = {}
+    for key, tags in data.items():
+        try:
+            article_id = int(key)
+        except (TypeError, ValueError):
+            continue
+        if article_id not in wanted or not isinstance(tags, list):
+            continue
+        seen = set()
+        cleaned = []
+        for tag in tags:
+            if not isinstance(tag, str):
+                continue
+            tag = tag.strip().strip("#").strip()
+            if not tag or "," in tag or "，" in tag or len(tag) > MAX_TAG_LENGTH:
+                continue
+            if tag.casefold() in seen:
+                continue
+            seen.add(tag.casefold())
+            cleaned.append(tag)
+        result[article_id] = cleaned[:max_tags]
+    return result
+
+class AutoTagger:
+    """
+    后台批量自动打标签。
+    把没有标签的文章按批（默认 20 个标题）放进同一个提示词，一次调用得到所有文章的结构化标签，
+    校验后在一个事务中写回 article_states.tags，单篇文章的成本由整批分摊。
+    处理进度记录在 article_tagging 表中，失败的文章最多重试 MAX_TAGGING_ATTEMPTS 次。
+    """
+    def __init__(self, batch_size: int = 20, concurrency: int = 1, tokens_per_hour: int = 50000, max_tags: int = 3):
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.max_tags = max(1, max_tags)
+        self.budget = HourlyTokenBudget(tokens_per_hour)
+        self._in_flight: set[int] = set()  # 正在处理的文章，避免多个工作协程领取同一批
+        self._vocabulary: Optional[set[str]] = None  # 已有标签：每次运行只从数据库加载一次，之后随写回的批次更新
+        self._wakeup = asyncio.Event()
+        self._workers: list[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @classmethod
+    def from_config(cls, db) -> Optional["AutoTagger"]:
+        """
+        根据 config 表创建自动打标签任务；未启用时返回 None。
+        """
+        if not get_config_value(db, "ai_tagging_enabled", False, bool):
+            return None
+        return cls(
+            batch_size=get_config_value(db, "ai_tagging_batch_size", 20, int),
+            concurrency=get_config_value(db, "ai_tagging_concurrency", 1, int),
+            tokens_per_hour=get_config_value(db, "ai_tagging_token_budget", 50000, int),
+            max_tags=get_config_value(db, "ai_tagging_max_tags", 3, int),
+        )
+
+    def start(self) -> None:
+        """
+        在当前事件循环中启动工作协程，启动时会先处理已有的未打标签文章。
+        """
+        self._loop = asyncio.get_running_loop()
+        self._vocabulary = None
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        print(f"后台自动打标签已启动，每批 {self.batch_size} 篇，并发 {self.concurrency}，每小时预算 {self.budget.limit} tokens。")
+
+    async def stop(self) -> None:
+        """
+        停止所有工作协程。
+        """
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def notify_threadsafe(self, article_ids: Iterable[int]) -> None:
+        """
+        供 RSS 更新线程调用：有新文章时唤醒工作协程。
+        """
+        if self._loop and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _claim_batch(self, db: sqlite3.Connection) -> list[sqlite3.Row]:
+        # 领取一批未打标签、未处理过（或失败次数未超限）的文章，新文章优先
+        cursor = db.cursor()
+        cursor.execute(
+            """
+            SELECT a.id, a.title
+            FROM articles a
+            JOIN article_states s ON a.id = s.article_id
+            LEFT JOIN article_tagging t ON a.id = t.article_id
+            WHERE (s.tags IS NULL OR s.tags = '')
+              AND (t.article_id IS NULL OR (t.status = 'failed' AND t.attempts < ?))
+            ORDER BY a.id DESC
+            LIMIT ?
+            """,
+            (MAX_TAGGING_ATTEMPTS, self.batch_size + len(self._in_flight)),
+        )
+        batch = [row for row in cursor.fetchall() if row["id"] not in self._in_flight][:self.batch_size]
+        self._in_flight.update(row["id"] for row in batch)
+        return batch
+
+    async def _worker(self) -> None:
+        while True:
+            db = next(get_db())
+            batch = self._claim_batch(db)
+            if not batch:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), IDLE_SCAN_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+            try:
+                await self._tag_batch(db, batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"后台自动打标签失败（{len(batch)} 篇）: {e}")
+                self._record(db, {row["id"]: None for row in batch})
+            finally:
+                self._in_flight.difference_update(row["id"] for row in batch)
+
+    def build_messages(self, db: sqlite3.Connection, batch: list[sqlite3.Row]) -> list[dict]:
+        """
+        构建一批文章的打标签提示词，附带已有标签以保持标签体系一致。
+        """
+        if self._vocabulary is None:
+            self._vocabulary = set(get_all_tags(db))
+        vocabulary = sorted(self._vocabulary)[:MAX_VOCABULARY_TAGS]
+        lines = [f"{row['id']}: {row['title']}" for row in batch]
+        user = "文章列表：\n" + "\n".join(lines)
+        if vocabulary:
+            user = f"已有标签：{', '.join(vocabulary)}\n\n" + user
+        return [
+            {"role": "system", "content": TAGGING_SYSTEM_PROMPT.format(max_tags=self.max_tags)},
+            {"role": "user", "content": user},
+        ]
+
+    async def _tag_batch(self, db: sqlite3.Connection, batch: list[sqlite3.Row]) -> None:
+        client = create_llm_client()
+        messages = self.build_messages(db, batch)
+        cost = sum(count_tokens(m["content"], client.models[0]) for m in messages) + TAGGING_OUTPUT_TOKENS_PER_ARTICLE * len(batch)
+        if not self.budget.fits(cost):
+            print(f"后台自动打标签跳过一批：预计 {cost} tokens 超过每小时预算。")
+            self._record(db, {row["id"]: None for row in batch})
+            return
+        await self.budget.reserve(cost)
+
+        ticket = await wait_for_llm_slot(db, client)
+        error = None
+        try:
+            response = await client.chat_completion(messages)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            ticket.release(error)
+
+        tags = parse_tagging_response(response, [row["id"] for row in batch], self.max_tags)
+        # 模型漏掉的文章记为失败，之后随其他批次重试
+        self._record(db, {row["id"]: tags.get(row["id"]) for row in batch})
+
+    def _record(self, db: sqlite3.Connection, results: dict[int, Optional[list[str]]]) -> None:
+        """
+        在一个事务中写回标签与处理状态。results 的值为 None 表示该文章本次失败。
+        只更新仍没有标签的文章，不覆盖期间手动设置的标签。
+        """
+        try:
+            for article_id, tags in results.items():
+                if tags:
+                    db.execute(
+                        "UPDATE article_states SET tags = ?, updated_at = CAST(strftime('%s', 'now') AS INTEGER) WHERE article_id = ? AND (tags IS NULL OR tags = '')",
+                        (",".join(tags), article_id),
+                    )
+                db.execute(
+                    """
+                    INSERT INTO article_tagging (article_id, status, attempts, updated_at)
+                    VALUES (?, ?, 1, datetime('now'))
+                    ON CONFLICT(article_id) DO UPDATE SET
+                        status = excluded.status,
+                        attempts = article_tagging.attempts + 1,
+                        updated_at = excluded.updated_at
+                    """,
+                    (article_id, "failed" if tags is None else ("done" if tags else "empty")),
+                )
+            db.commit()
+            if self._vocabulary is not None:
+                for tags in results.values():
+                    self._vocabulary.update(tags or [])
+        except sqlite3.Error as e:
+            db.rollback()
+            print(f"保存自动标签失败: {e}")
@@ -0,0 +1,109 @@
+import asyncio
+import time
+from collections import deque
+from functools import lru_cache
+
+try:
+    import tiktoken  # 可选依赖：安装后按模型精确计数
+except ImportError:
+    tiktoken = None
+
+# 常见模型的上下文窗口（按前缀匹配，越具体的前缀越靠前）
+MODEL_CONTEXT_WINDOWS = [
+    ("gpt-4.1", 1000000),
+    ("gpt-4o", 128000),
+    ("gpt-4-turbo", 128000),
+    ("gpt-4", 8192),
+    ("gpt-3.5", 16385),
+    ("o1", 200000),
+    ("o3", 200000),
+    ("o4", 200000),
+    ("claude", 200000),
+    ("gemini", 1000000),
+    ("deepseek", 64000),
+    ("qwen", 32000),
+    ("glm", 128000),
+    ("moonshot", 128000),
+]
+DEFAULT_CONTEXT_WINDOW = 8192
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗略估算文本的 token 数。
+    CJK 字符大致按 1 字 1 token 计算，其余字符按 4 字符 1 token 计算。
+    """
+    if not text:
+        return 0
+    cjk = sum(1 for ch in text if "　" <= ch <= "鿿" or "가" <= ch <= "힯" or "＀" <= ch <= "￯")
+    return cjk + (len(text) - cjk + 3) // 4
+
+@lru_cache(maxsize=32)
+def _encoding_for(model: str):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+def count_tokens(text: str, model: str = "") -> int:
+    """
+    计算文本的 token 数；未安装 tiktoken 时退化为 estimate_tokens。
+    """
+    if not text:
+        return 0
+    if tiktoken is None:
+        return estimate_tokens(text)
+    return len(_encoding_for(model).encode(text, disallowed_special=()))
+
+def context_window(model: str) -> int:
+    """
+    返回模型的上下文窗口大小，未知模型返回保守的默认值。
+    """
+    name = (model or "").lower().rsplit("/", 1)[-1]
+    for prefix, window in MODEL_CONTEXT_WINDOWS:
+        if name.startswith(prefix):
+            return window
+    return DEFAULT_CONTEXT_WINDOW
+
+class HourlyTokenBudget:
+    """
+    滑动窗口的每小时 token 预算。
+    reserve() 在预算不足时等待窗口内最早的消耗过期。
+    """
+    def __init__(self, tokens_per_hour: int, window: float = 3600.0):
+        self.limit = tokens_per_hour
+        self.window = window
+        self._spent: deque = deque()  # (时间戳, token 数)
+        self._lock = asyncio.Lock()
+
+    def _expire(self, now: float) -> None:
+        while self._spent and now - self._spent[0][0] >= self.window:
+            self._spent.popleft()
+
+    def used(self) -> int:
+        """
+        返回当前窗口内已消耗的 token 数。
+        """
+        self._expire(time.monotonic())
+        return sum(tokens for _, tokens in self._spent)
+
+    def fits(self, tokens: int) -> bool:
+        """
+        单次消耗是否可能被预算容纳（超过整个预算的请求永远无法执行）。
+        """
+        return tokens <= self.limit
+
+    async def reserve(self, tokens: int) -> None:
+        """
+        预留 tokens，预算不足时等待。
+        """
+        if not self.fits(tokens):
+            raise ValueError(f"单次消耗 {tokens} tokens 超过每小时预算 {self.limit}")
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._expire(now)
+                if self.used() + tokens <= self.limit:
+                    self._spent.append((now, tokens))
+                    return
+                # 等到窗口内最早的一笔消耗过期
+                await asyncio.sleep(max(self.window - (now - self._spent[0][0]), 0.1))
@@ -1,11 +1,70 @@
 # services/playwright.py
+import asyncio
+from contextlib import asynccontextmanager
 from playwright.async_api import async_playwright
-from typing import Tuple
+from typing import Optional, Tuple
+from urllib.parse import urlsplit
+
+from services.config import get_config_value
+from services.database import get_db
+
+# 正文提取：优先选取文本量足够大的 article/main 容器，并移除导航、页眉页脚、侧栏等样板节点
+_MAIN_CONTENT_JS = """
+() => {
+    const body = document.body;
+    if (!body) return "";
+    const bodyLength = (body.innerText || "").length;
+    let root = body;
+    let best = 0;
+    for (const el of document.querySelectorAll('article, main, [role="main"]')) {
+        const length = (el.innerText || "").length;
+        if (length > best) {
+            best = length;
+            root = el;
+        }
+    }
+    if (best < bodyLength * 0.3) root = body;
+    const boilerplate = 'script, style, noscript, template, iframe, svg, nav, header, footer, aside, form, dialog, '
+        + '[role="navigation"], [role="banner"], [role="contentinfo"], [role="complementary"], [aria-hidden="true"]';
+    for (const el of root.querySelectorAll(boilerplate)) el.remove();
+    return root.innerText || "";
+}
+"""
+
+# 快速抓取模式下拦截的资源类型：正文提取只需要文档、脚本、样式与数据请求
+_BLOCKED_RESOURCE_TYPES = {"image", "media", "font", "websocket", "eventsource", "manifest", "texttrack"}
+# 常见广告与跟踪域名（包括子域名）
+_TRACKER_DOMAINS = (
+    "doubleclick.net", "googlesyndication.com", "googleadservices.com", "google-analytics.com",
+    "googletagmanager.com", "googletagservices.com", "adservice.google.com", "facebook.net",
+    "scorecardresearch.com", "quantserve.com", "hotjar.com", "taboola.com", "outbrain.com",
+    "criteo.com", "criteo.net", "amazon-adsystem.com", "adnxs.com", "chartbeat.com", "chartbeat.net",
+    "segment.com", "segment.io", "mixpanel.com", "nr-data.net", "optimizely.com", "moatads.com",
+    "pubmatic.com", "rubiconproject.com", "casalemedia.com", "openx.net", "hm.baidu.com",
+    "cnzz.com", "umeng.com", "growingio.com",
+)
+# 正文长度轮询间隔（秒）；连续两次长度不变即视为加载完成
+_STABLE_POLL_INTERVAL = 0.3
+_TEXT_LENGTH_JS = "() => document.body ? document.body.innerText.length : 0"
+
+def _is_tracker(url: str) -> bool:
+    host = (urlsplit(url).hostname or "").lower()
+    return any(host == domain or host.endswith("." + domain) for domain in _TRACKER_DOMAINS)
+
+async def _block_route(route) -> None:
+    """
+    拦截图片、媒体、字体等非文档资源以及广告跟踪请求。
+    """
+    request = route.request
+    if request.resource_type in _BLOCKED_RESOURCE_TYPES or _is_tracker(request.url):
+        await route.abort()
+    else:
+        await route.continue_()
 
 async def startup_playwright() -> Tuple[object, object]:
     """
     启动 Playwright 并返回 (pw, browser)。
-    在 FastAPI 的 lifespan 中调用。
+    由 PlaywrightManager 在第一次需要浏览器时调用。
     """
     pw = await async_playwright().start()
     browser = await pw.chromium.launch(headless=True)
@@ -13,34 +72,283 @@ async def startup_playwright() -> Tuple[object, object]:
 
 async def shutdown_playwright(pw, browser) -> None:
     """
-    关闭 browser 和 playwright。
+    关闭页面池、browser 和 playwright。
     """
     try:
+        pool = _pools.pop(id(browser), None)
+        if pool:
+            await pool.close()
         if browser:
             await browser.close()
     finally:
         if pw:
             await pw.stop()
 
-async def scrape_article(browser, url: str, timeout: int = 60000) -> str:
+class PooledPage:
     """
-    使用传入的 browser 实例抓取页面纯文本。
-    每次用 new_context() 保持会话隔离，结束时关闭 context/page。
+    池中的一个预热 context/page 及其使用次数。
     """
-    context = await browser.new_context()
-    page = await context.new_page()
-    try:
-        await page.goto(url, timeout=timeout)
-        await page.wait_for_load_state("networkidle")
-        content = await page.inner_text("body")
-        return content
-    finally:
+    def __init__(self, context, page):
+        self.context = context
+        self.page = page
+        self.uses = 0
+
+    async def close(self) -> None:
         # 尽量确保资源释放，不抛出二次异常遮蔽原错误
         try:
-            await page.close()
+            await self.page.close()
         except Exception:
             pass
         try:
-            await context.close()
+            await self.context.close()
         except Exception:
             pass
+
+class PagePool:
+    """
+    预热的 browser context/page 池。
+    最多同时存在 max_size 个页面，超出的请求在等待队列中排队（超时抛出 TimeoutError）；
+    页面使用 max_uses 次或 JS 堆超过 max_heap_mb 后回收重建，归还时做健康检查并清理会话状态，
+    突发请求下 Chromium 的内存保持有界，抓取也省去了每次创建 context 的开销。
+    """
+    def __init__(self, browser, max_size: int = 4, max_uses: int = 50, max_heap_mb: int = 256, block_resources: bool = True):
+        self.browser = browser
+        self.block_resources = block_resources
+        self.max_size = max(1, max_size)
+        self.max_uses = max(1, max_uses)
+        self.max_heap_bytes = max_heap_mb * 1024 * 1024
+        self._idle: list[PooledPage] = []
+        self._slots = asyncio.Semaphore(self.max_size)
+        self._closed = False
+
+    async def _create(self) -> PooledPage:
+        context = await self.browser.new_context()
+        if self.block_resources:
+            await context.route("**/*", _block_route)
+        page = await context.new_page()
+        return PooledPage(context, page)
+
+    async def _healthy(self, item: PooledPage) -> bool:
+        if item.page.is_closed() or not self.browser.is_connected() or item.uses >= self.max_uses:
+            return False
+        try:
+            # performance.memory 为 Chromium 扩展，其他内核返回 0
+            heap = await item.page.evaluate("() => (performance.memory && performance.memory.usedJSHeapSize) || 0")
+        except Exception:
+            return False
+        return heap < self.max_heap_bytes
+
+    async def _acquire(self, timeout: Optional[float]) -> PooledPage:
+        if self._closed:
+            raise RuntimeError("页面池已关闭")
+        await asyncio.wait_for(self._slots.acquire(), timeout)
+        try:
+            while self._idle:
+                item = self._idle.pop()
+                if not item.page.is_closed():
+                    return item
+                await item.close()
+            return await self._create()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    async def _release(self, item: PooledPage) -> None:
+        try:
+            item.uses += 1
+            if not self._closed and await self._healthy(item):
+                try:
+                    # 清理会话状态，下一个使用者看不到上一个页面的 cookie 与内容
+                    await item.context.clear_cookies()
+                    await item.page.goto("about:blank")
+                    self._idle.append(item)
+                    return
+                except Exception:
+                    pass
+            await item.close()
+        finally:
+            self._slots.release()
+
+    @asynccontextmanager
+    async def page(self, timeout: Optional[float] = None):
+        """
+        借出一个页面，退出时归还（或回收）。timeout 为在等待队列中的最长等待秒数。
+        """
+        item = await self._acquire(timeout)
+        try:
+            yield item.page
+        except BaseException:
+            # 出错的页面状态不确定，直接回收
+            item.uses = self.max_uses
+            raise
+        finally:
+            await self._release(item)
+
+    async def close(self) -> None:
+        """
+        关闭池中所有空闲页面；借出中的页面在归还时关闭。
+        """
+        self._closed = True
+        idle, self._idle = self._idle, []
+        for item in idle:
+            await item.close()
+
+# 抓取用到的配置项：key -> (默认值, 类型)
+PLAYWRIGHT_SETTINGS = {
+    "playwright_pool_size": (4, int),
+    "playwright_page_max_uses": (50, int),
+    "playwright_page_max_heap_mb": (256, int),
+    "playwright_scrape_mode": ("fast", str),
+    "playwright_scrape_timeout_ms": (20000, int),
+}
+
+def load_playwright_settings(db) -> dict:
+    """
+    从 config 表读取抓取配置。进程外的抓取工作进程由父进程读取后传入，自身不访问数据库。
+    """
+    return {key: get_config_value(db, key, default, cast) for key, (default, cast) in PLAYWRIGHT_SETTINGS.items()}
+
+# 每个 browser 一个页面池
+_pools: dict[int, PagePool] = {}
+
+def get_page_pool(browser, settings: Optional[dict] = None) -> PagePool:
+    """
+    获取（必要时按配置创建）browser 对应的页面池。settings 为空时从 config 表读取。
+    """
+    pool = _pools.get(id(browser))
+    if pool is None or pool.browser is not browser:
+        settings = settings or load_playwright_settings(next(get_db()))
+        pool = _pools[id(browser)] = PagePool(
+            browser,
+            max_size=settings["playwright_pool_size"],
+            max_uses=settings["playwright_page_max_uses"],
+            max_heap_mb=settings["playwright_page_max_heap_mb"],
+            block_resources=settings["playwright_scrape_mode"] == "fast",
+        )
+    return pool
+
+async def _wait_for_text_stable(page, deadline: float) -> None:
+    """
+    轮询正文长度，连续两次不变（且非空）即返回；到达 deadline 时直接返回已加载的内容。
+    """
+    loop = asyncio.get_running_loop()
+    last = -1
+    while loop.time() < deadline:
+        length = await page.evaluate(_TEXT_LENGTH_JS)
+        if length and length == last:
+            return
+        last = length
+        await asyncio.sleep(min(_STABLE_POLL_INTERVAL, max(0.0, deadline - loop.time())))
+
+async def scrape_article(browser, url: str, timeout: Optional[int] = None, settings: Optional[dict] = None) -> str:
+    """
+    使用传入 browser 的页面池抓取页面正文文本（优先 article/main 区域，去掉样板节点）。
+    页面在池中复用，每次使用后清理 cookie 并回到 about:blank 以保持会话隔离。
+    fast 模式（默认）拦截非文档资源与跟踪域名，DOMContentLoaded 后等正文长度稳定即提取，
+    整个抓取（含排队）受 timeout 毫秒的硬截止时间约束；full 模式等待 networkidle。
+    settings 为空时从 config 表读取。
+    """
+    settings = settings or load_playwright_settings(next(get_db()))
+    if timeout is None:
+        timeout = settings["playwright_scrape_timeout_ms"]
+    fast = settings["playwright_scrape_mode"] == "fast"
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout / 1000
+
+    async with get_page_pool(browser, settings).page(timeout=timeout / 1000) as page:
+        remaining = max(1, int((deadline - loop.time()) * 1000))
+        if not fast:
+            await page.goto(url, timeout=remaining)
+            await page.wait_for_load_state("networkidle", timeout=remaining)
+        else:
+            await page.goto(url, wait_until="domcontentloaded", timeout=remaining)
+            await _wait_for_text_stable(page, deadline)
+        return await page.evaluate(_MAIN_CONTENT_JS)
+
+class PlaywrightManager:
+    """
+    按需启动的 Playwright 浏览器。
+    第一次使用时才启动 Chromium（加锁，避免并发的首次调用重复启动），
+    最后一个使用者离开 idle_timeout 秒后自动关闭，之后再次使用时重新启动。
+    从不抓取网页的实例因此启动更快、内存占用更小。
+    settings 为固定的抓取配置（见 load_playwright_settings），为空时每次抓取从 config 表读取。
+    """
+    def __init__(self, idle_timeout: float = 300, settings: Optional[dict] = None):
+        self.idle_timeout = idle_timeout
+        self.settings = settings
+        self._pw = None
+        self._browser = None
+        self._lock = asyncio.Lock()
+        self._active = 0
+        self._idle_handle: Optional[asyncio.TimerHandle] = None
+
+    @classmethod
+    def from_config(cls, db) -> "PlaywrightManager":
+        return cls(idle_timeout=get_config_value(db, "playwright_idle_timeout_seconds", 300, float))
+
+    @property
+    def running(self) -> bool:
+        return self._browser is not None
+
+    async def _ensure_started(self):
+        async with self._lock:
+            if self._browser is not None and not self._browser.is_connected():
+                # 浏览器进程意外退出，清理后重新启动
+                await self._close()
+            if self._browser is None:
+                self._pw, self._browser = await startup_playwright()
+                print("Playwright 浏览器已启动。")
+            return self._browser
+
+    @asynccontextmanager
+    async def browser(self):
+        """
+        借用浏览器（必要时启动），使用期间不会因空闲而被关闭。
+        """
+        self._active += 1
+        self._cancel_idle_timer()
+        try:
+            yield await self._ensure_started()
+        finally:
+            self._active -= 1
+            if self._active == 0:
+                self._schedule_idle_shutdown()
+
+    def _cancel_idle_timer(self) -> None:
+        if self._idle_handle:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+
+    def _schedule_idle_shutdown(self) -> None:
+        self._cancel_idle_timer()
+        if self.idle_timeout > 0:
+            loop = asyncio.get_running_loop()
+            self._idle_handle = loop.call_later(self.idle_timeout, lambda: asyncio.ensure_future(self._shutdown_if_idle()))
+
+    async def _shutdown_if_idle(self) -> None:
+        self._idle_handle = None
+        async with self._lock:
+            if self._active == 0 and self._browser is not None:
+                await self._close()
+                print(f"Playwright 浏览器空闲超过 {self.idle_timeout:g} 秒，已关闭。")
+
+    async def _close(self) -> None:
+        pw, browser = self._pw, self._browser
+        self._pw = self._browser = None
+        await shutdown_playwright(pw, browser)
+
+    async def scrape(self, url: str) -> str:
+        """
+        借用浏览器抓取页面正文。
+        """
+        async with self.browser() as browser:
+            return await scrape_article(browser, url, settings=self.settings)
+
+    async def shutdown(self) -> None:
+        """
+        关闭浏览器（如果已启动）。在 FastAPI 的 lifespan 结束时调用。
+        """
+        self._cancel_idle_timer()
+        async with self._lock:
+            if self._browser is not None:
+                await self._close()
@@ -1,7 +1,10 @@
-from datetime import datetime, timezone
+from datetime import datetime
 from sqlite3 import Connection
+from typing import Iterator, Optional
 from fastapi import HTTPException
-from models.rss.article import Article, ArticleResponse, ArticleState
+from models.rss.article import Article, ArticleState
+from services.database import open_readonly_connection
+from services.timestamps import epoch_to_iso, now_epoch, to_epoch
 
 def create_article(
     db: Connection,
@@ -26,7 +29,7 @@ def create_article(
             article.title,
             str(article.link),
             article.guid,
-            article.pub_date.isoformat(),
+            to_epoch(article.pub_date),
             article.author,
         )
         try:
@@ -45,7 +48,7 @@ def create_article(
             False,
             "",
             None,
-            datetime.now(timezone.utc),
+            now_epoch(),
         )
         cursor.execute(sql_state, data_state)
 
@@ -82,52 +85,104 @@ def delete_all_articles_and_related_data(db: Connection) -> dict:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"删除文章失败: {e}")
 
-def get_articles(db: Connection, feed_id: int = None, limit: int = 50) -> list[ArticleResponse]:
+# 文章列表的字段顺序，与 ArticleResponse 一致
+ARTICLE_COLUMNS = ("id", "feed_id", "title", "link", "guid", "pub_date", "author", "is_read", "tags", "ai_summary", "updated_at")
+
+def _query_articles(
+    db: Connection,
+    feed_id: int = None,
+    limit: int = 50,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
     """
-    获取文章及其状态，按发布时间最新排序。
-    如果提供 feed_id，则仅返回该 feed_id 的文章；否则返回最新的文章。
+    执行文章列表查询并返回游标，行的列顺序与 ARTICLE_COLUMNS 一致。
+    since / until 限定发布时间范围 [since, until)，由 pub_date 与 (feed_id, pub_date) 索引按范围扫描。
     """
-    try:
-        cursor = db.cursor()
-        sql = """
-        SELECT 
-            a.id, a.feed_id, a.title, a.link, a.guid, a.pub_date, a.author,
-            s.is_read, s.tags, s.ai_summary, s.updated_at
-        FROM articles a
-        LEFT JOIN article_states s ON a.id = s.article_id
-        """
-        if feed_id is not None:
-            sql += """
-            WHERE a.feed_id = ?
-            ORDER BY a.pub_date DESC
-            LIMIT ?
-            """
-            cursor.execute(sql, (feed_id, limit))
-        else:
-            sql += """
-            ORDER BY a.pub_date DESC
-            LIMIT ?
-            """
-            cursor.execute(sql, (limit,))
-        
-        rows = cursor.fetchall()
+    conditions = []
+    params: list = []
+    if feed_id is not None:
+        conditions.append("a.feed_id = ?")
+        params.append(feed_id)
+    if since is not None:
+        conditions.append("a.pub_date >= ?")
+        params.append(to_epoch(since))
+    if until is not None:
+        conditions.append("a.pub_date < ?")
+        params.append(to_epoch(until))
+    sql = """
+    SELECT 
+        a.id, a.feed_id, a.title, a.link, a.guid, a.pub_date, a.author,
+        s.is_read, s.tags, s.ai_summary, s.updated_at
+    FROM articles a
+    LEFT JOIN article_states s ON a.id = s.article_id
+    """
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += """
+    ORDER BY a.pub_date DESC
+    LIMIT ?
+    """
+    params.append(limit)
+    cursor = db.cursor()
+    cursor.execute(sql, params)
+    return cursor
+
+def article_row_to_record(row) -> dict:
+    """
+    把查询行直接转换为可 JSON 编码的 dict。
+    链接在入库时已经校验过，这里不再构建 Pydantic 模型；时间由 UTC 秒转换为 ISO 字符串。
+    """
+    return {
+        "id": row[0],
+        "feed_id": row[1],
+        "title": row[2],
+        "link": row[3],
+        "guid": row[4],
+        "pub_date": epoch_to_iso(row[5]),
+        "author": row[6],
+        "is_read": bool(row[7]),
+        "tags": row[8].split(",") if row[8] else [],
+        "ai_summary": row[9],
+        "updated_at": epoch_to_iso(row[10]),
+    }
 
-        articles = [
-            ArticleResponse(
-                id=row[0],
-                feed_id=row[1],
-                title=row[2],
-                link=row[3],
-                guid=row[4],
-                pub_date=row[5],
-                author=row[6],
-                is_read=row[7],
-                tags=row[8].split(",") if row[8] else [],
-                ai_summary=row[9],
-                updated_at=row[10],
-            )
-            for row in rows
-        ]
-        return articles
+def get_article_records(
+    db: Connection,
+    feed_id: int = None,
+    limit: int = 50,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> list[dict]:
+    """
+    获取文章及其状态，按发布时间最新排序；提供 feed_id 时仅返回该 feed 的文章。
+    返回与 ArticleResponse 字段相同的 dict 列表，供直接编码为 JSON。
+    """
+    try:
+        return [article_row_to_record(row) for row in _query_articles(db, feed_id, limit, since, until).fetchall()]
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"获取文章失败: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"获取文章失败: {e}")
+
+
+def iter_article_records(
+    feed_id: int = None,
+    limit: int = 50,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    batch_size: int = 200,
+) -> Iterator[dict]:
+    """
+    在独立的只读连接上按批从游标读取文章记录，供流式响应边读边写，峰值内存与 limit 无关。
+    连接在生成器读完、出错或被提前关闭时关闭，不占用全局连接。
+    """
+    conn = open_readonly_connection()
+    try:
+        cursor = _query_articles(conn, feed_id, limit, since, until)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            for row in rows:
+                yield article_row_to_record(row)
+    finally:
+        conn.close()
@@ -0,0 +1,106 @@
+import csv
+import io
+import zlib
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
+
+from services.database import open_readonly_connection
+from services.rss.article.article import ARTICLE_COLUMNS, article_row_to_record
+from services.serialization import dumps
+from services.timestamps import to_epoch
+
+# 每批从游标读取的行数
+EXPORT_BATCH_SIZE = 1000
+
+def iter_export_records(
+    feed_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    unread_only: bool = False,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> Iterator[dict]:
+    """
+    在独立的只读连接上按批读取文章（含状态、标签与摘要），按 id 顺序输出。
+    内存占用只与 batch_size 有关，与导出的总行数无关。
+    """
+    conditions = []
+    params: list = []
+    if feed_id is not None:
+        conditions.append("a.feed_id = ?")
+        params.append(feed_id)
+    if since is not None:
+        conditions.append("a.pub_date >= ?")
+        params.append(to_epoch(since))
+    if until is not None:
+        conditions.append("a.pub_date < ?")
+        params.append(to_epoch(until))
+    if unread_only:
+        conditions.append("COALESCE(s.is_read, 0) = 0")
+
+    sql = """
+    SELECT
+        a.id, a.feed_id, a.title, a.link, a.guid, a.pub_date, a.author,
+        s.is_read, s.tags, s.ai_summary, s.updated_at
+    FROM articles a
+    LEFT JOIN article_states s ON a.id = s.article_id
+    """
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY a.id"
+
+    conn = open_readonly_connection()
+    try:
+        cursor = conn.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            for row in rows:
+                yield article_row_to_record(row)
+    finally:
+        conn.close()
+
+def iter_ndjson_export(records: Iterable[dict], batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    """
+    以 NDJSON 输出，每 batch_size 行合并为一个块。
+    """
+    lines = []
+    for record in records:
+        lines.append(dumps(record))
+        if len(lines) >= batch_size:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+    if lines:
+        yield b"\n".join(lines) + b"\n"
+
+def iter_csv_export(records: Iterable[dict], batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    """
+    以 CSV 输出（带表头，UTF-8 BOM 便于 Excel 识别），标签以逗号连接。
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("\ufeff")
+    writer.writerow(ARTICLE_COLUMNS)
+    count = 0
+    for record in records:
+        writer.writerow([
+            ",".join(record["tags"]) if column == "tags" else record[column]
+            for column in ARTICLE_COLUMNS
+        ])
+        count += 1
+        if count % batch_size == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+def gzip_stream(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """
+    边生成边 gzip 压缩，输出完整的 .gz 文件内容。
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
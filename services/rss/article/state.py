@@ -1,8 +1,10 @@
-from datetime import datetime
 from typing import List
 from fastapi import HTTPException
 import sqlite3
 
+from models.rss.article import BulkArticleFilter, BulkReadRequest, BulkTagRequest
+from services.timestamps import now_epoch, to_epoch
+
 def get_all_tags(db: sqlite3.Connection) -> List[str]:
     """
     获取所有文章状态中的唯一标签。
@@ -21,16 +23,16 @@ def get_all_tags(db: sqlite3.Connection) -> List[str]:
     
 def get_today_update_count(db: sqlite3.Connection) -> int:
     """
-    获取今日更新的文章状态数量。
+    获取今日（UTC）入库的文章数量，从 stats_rollups 的按天汇总中读取。
     """
     try:
         cursor = db.cursor()
-        today = datetime.now().strftime("%Y-%m-%d")
+        today = now_epoch() // 86400 * 86400
         cursor.execute(
             """
-            SELECT COUNT(*) as count
-            FROM article_states
-            WHERE DATE(updated_at) = ?
+            SELECT COALESCE(SUM(ingested), 0) as count
+            FROM stats_rollups
+            WHERE granularity = 'day' AND bucket_start = ?
             """,
             (today,),
         )
@@ -51,7 +53,7 @@ def mark_article_as_read(db: sqlite3.Connection, article_id: int) -> None:
             SET is_read = 1, updated_at = ?
             WHERE id = ?
             """,
-            (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), article_id),
+            (now_epoch(), article_id),
         )
         db.commit()
         if cursor.rowcount == 0:
@@ -73,7 +75,7 @@ def save_ai_summary(db: sqlite3.Connection, article_id: int, ai_summary: str) ->
             SET ai_summary = ?, updated_at = ?
             WHERE id = ?
             """,
-            (ai_summary, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), article_id),
+            (ai_summary, now_epoch(), article_id),
         )
         db.commit()
         if cursor.rowcount == 0:
@@ -101,4 +103,105 @@ def get_ai_summary(db: sqlite3.Connection, article_id: int) -> str:
         else:
             return None
     except sqlite3.Error as e:
-        raise HTTPException(status_code=500, detail=f"数据库错误: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"数据库错误: {e}")
+
+def _bulk_filter_sql(selection: BulkArticleFilter) -> tuple[str, list]:
+    """
+    把批量操作的选择条件转换为 article_states 上的 WHERE 子句（不含 WHERE 关键字）。
+    没有任何条件且未设置 all 时抛出 400，避免误操作全部文章。
+    """
+    conditions = []
+    params: list = []
+    if selection.article_ids is not None:
+        if not selection.article_ids:
+            return "0", []
+        conditions.append(f"article_id IN ({','.join('?' * len(selection.article_ids))})")
+        params.extend(selection.article_ids)
+    article_conditions = []
+    if selection.feed_id is not None:
+        article_conditions.append("feed_id = ?")
+        params.append(selection.feed_id)
+    if selection.before is not None:
+        article_conditions.append("pub_date < ?")
+        params.append(to_epoch(selection.before))
+    if selection.query:
+        article_conditions.append("title LIKE ? ESCAPE '\\'")
+        escaped = selection.query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        params.append(f"%{escaped}%")
+    if article_conditions:
+        conditions.append(f"article_id IN (SELECT id FROM articles WHERE {' AND '.join(article_conditions)})")
+    if selection.tag:
+        conditions.append("instr(',' || COALESCE(tags, '') || ',', ',' || ? || ',') > 0")
+        params.append(selection.tag.strip())
+    if not conditions:
+        if not selection.all:
+            raise HTTPException(status_code=400, detail="请至少提供一个筛选条件，或设置 all 为 true")
+        return "1", []
+    return " AND ".join(conditions), params
+
+def bulk_mark_read(db: sqlite3.Connection, request: BulkReadRequest) -> int:
+    """
+    用一条 UPDATE 语句批量标记已读或未读，只更新状态实际发生变化的文章，返回更新的行数。
+    """
+    where, params = _bulk_filter_sql(request)
+    try:
+        cursor = db.execute(
+            f"UPDATE article_states SET is_read = ?, updated_at = ? WHERE is_read != ? AND {where}",
+            [int(request.is_read), now_epoch(), int(request.is_read), *params],
+        )
+        db.commit()
+        return cursor.rowcount
+    except sqlite3.Error as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"数据库错误: {e}")
+
+def _clean_tags(tags: list[str]) -> list[str]:
+    cleaned = []
+    for tag in tags:
+        tag = tag.strip()
+        if not tag or "," in tag:
+            raise HTTPException(status_code=400, detail=f"无效的标签: {tag!r}")
+        if tag not in cleaned:
+            cleaned.append(tag)
+    return cleaned
+
+def bulk_update_tags(db: sqlite3.Connection, request: BulkTagRequest) -> dict:
+    """
+    在一个事务中批量添加或移除标签，每个标签一条基于集合的 UPDATE 语句。
+    返回每个标签实际影响的文章数。
+    """
+    add, remove = _clean_tags(request.add), _clean_tags(request.remove)
+    if not add and not remove:
+        raise HTTPException(status_code=400, detail="请提供要添加或移除的标签")
+    where, params = _bulk_filter_sql(request)
+    # 标签以逗号连接存储，首尾补逗号后按整段匹配
+    contains = "instr(',' || COALESCE(tags, '') || ',', ',' || ? || ',') > 0"
+    result = {"added": {}, "removed": {}}
+    try:
+        for tag in add:
+            cursor = db.execute(
+                f"""
+                UPDATE article_states
+                SET tags = CASE WHEN tags IS NULL OR tags = '' THEN ? ELSE tags || ',' || ? END,
+                    updated_at = CAST(strftime('%s', 'now') AS INTEGER)
+                WHERE NOT {contains} AND {where}
+                """,
+                [tag, tag, tag, *params],
+            )
+            result["added"][tag] = cursor.rowcount
+        for tag in remove:
+            cursor = db.execute(
+                f"""
+                UPDATE article_states
+                SET tags = trim(replace(',' || tags || ',', ',' || ? || ',', ','), ','),
+                    updated_at = CAST(strftime('%s', 'now') AS INTEGER)
+                WHERE {contains} AND {where}
+                """,
+                [tag, tag, *params],
+            )
+            result["removed"][tag] = cursor.rowcount
+        db.commit()
+        return result
+    except sqlite3.Error as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"数据库错误: {e}")
@@ -4,7 +4,7 @@ from typing import List, Optional
 from fastapi import HTTPException
 from pydantic import HttpUrl
 
-from models.rss.feed import Feed
+from models.rss.feed import Feed, FeedCounters
 
 def get_all_feeds(db: sqlite3.Connection) -> List[Feed]:
     """
@@ -80,4 +80,51 @@ def delete_feed(db: sqlite3.Connection, feed_id: int) -> bool:
         return cursor.rowcount > 0
     except sqlite3.Error as e:
         db.rollback()
-        raise HTTPException(status_code=500, detail=f"删除 Feed 失败: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"删除 Feed 失败: {e}")
+
+def get_feed_counters(db: sqlite3.Connection, feed_id: Optional[int] = None) -> List[FeedCounters]:
+    """
+    读取由触发器维护的每个 Feed 的文章总数、未读数与最新发布时间，不需要聚合文章表。
+    """
+    try:
+        cursor = db.cursor()
+        if feed_id is None:
+            cursor.execute("SELECT feed_id, total, unread, newest_pub_date FROM feed_counters ORDER BY feed_id")
+        else:
+            cursor.execute("SELECT feed_id, total, unread, newest_pub_date FROM feed_counters WHERE feed_id = ?", (feed_id,))
+        return [FeedCounters(**row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"获取 Feed 计数失败: {e}")
+
+def reconcile_feed_counters(db: sqlite3.Connection) -> int:
+    """
+    按文章表重新计算所有 Feed 的计数，修正与触发器维护结果不一致的行，返回修正的 Feed 数量。
+    """
+    try:
+        cursor = db.cursor()
+        cursor.execute(
+            """
+            SELECT
+                f.id AS feed_id,
+                (SELECT COUNT(*) FROM articles a WHERE a.feed_id = f.id) AS total,
+                (SELECT COUNT(*) FROM articles a JOIN article_states s ON a.id = s.article_id
+                 WHERE a.feed_id = f.id AND NOT s.is_read) AS unread,
+                (SELECT MAX(pub_date) FROM articles a WHERE a.feed_id = f.id) AS newest_pub_date
+            FROM rss_feeds f
+            """
+        )
+        expected = {row["feed_id"]: tuple(row) for row in cursor.fetchall()}
+        cursor.execute("SELECT feed_id, total, unread, newest_pub_date FROM feed_counters")
+        actual = {row["feed_id"]: tuple(row) for row in cursor.fetchall()}
+
+        stale = [row for feed_id, row in expected.items() if actual.get(feed_id) != row]
+        orphaned = [(feed_id,) for feed_id in actual.keys() - expected.keys()]
+        if not stale and not orphaned:
+            return 0
+        cursor.executemany("INSERT OR REPLACE INTO feed_counters (feed_id, total, unread, newest_pub_date) VALUES (?, ?, ?, ?)", stale)
+        cursor.executemany("DELETE FROM feed_counters WHERE feed_id = ?", orphaned)
+        db.commit()
+        return len(stale) + len(orphaned)
+    except sqlite3.Error as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"校正 Feed 计数失败: {e}")
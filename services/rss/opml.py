@@ -0,0 +1,112 @@
+import sqlite3
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+from fastapi import HTTPException
+from pydantic import HttpUrl, ValidationError
+
+from models.rss.feed import Feed, OPMLImportResult
+from services.rss.request import get_rss_feed
+
+def parse_opml(data: bytes) -> list[tuple[str, str]]:
+    """
+    解析 OPML，返回去重后的 (名称, URL) 列表。嵌套的分组 outline 会被展开。
+    """
+    try:
+        root = ET.fromstring(data)
+    except ET.ParseError as e:
+        raise HTTPException(status_code=400, detail=f"OPML 解析失败: {e}")
+    feeds = []
+    seen = set()
+    for outline in root.iter("outline"):
+        url = (outline.get("xmlUrl") or outline.get("xmlurl") or "").strip()
+        if not url or url in seen:
+            continue
+        seen.add(url)
+        name = (outline.get("title") or outline.get("text") or "").strip()
+        feeds.append((name, url))
+    return feeds
+
+def build_opml(feeds: Iterable[Feed]) -> bytes:
+    """
+    把订阅源列表导出为 OPML 2.0。
+    """
+    root = ET.Element("opml", version="2.0")
+    head = ET.SubElement(root, "head")
+    ET.SubElement(head, "title").text = "Cronos subscriptions"
+    ET.SubElement(head, "dateCreated").text = datetime.now(timezone.utc).strftime("%a, %d %b %Y %H:%M:%S GMT")
+    body = ET.SubElement(root, "body")
+    for feed in feeds:
+        ET.SubElement(body, "outline", type="rss", text=feed.name, title=feed.name, xmlUrl=str(feed.url))
+    return ET.tostring(root, encoding="utf-8", xml_declaration=True)
+
+def normalize_feed_url(url: str) -> Optional[str]:
+    """
+    按 create_feed 存储 URL 的方式（pydantic HttpUrl）规范化订阅源 URL，
+    使主机大小写、末尾斜杠、默认端口等差异不会导入重复的订阅源。非 http(s) 或非法 URL 返回 None。
+    """
+    try:
+        return str(HttpUrl(url))
+    except ValidationError:
+        return None
+
+def _validate(url: str, timeout: int) -> Optional[str]:
+    # 在线程池中执行：能正常解析时返回订阅源标题（可能为空字符串），否则返回 None
+    feed = get_rss_feed(url, timeout=timeout)
+    if feed is None:
+        return None
+    return (feed.feed.get("title") or "").strip()
+
+def import_opml(db: sqlite3.Connection, data: bytes, validate: bool = True, concurrency: int = 16, timeout: int = 10) -> list[OPMLImportResult]:
+    """
+    导入 OPML：URL 先规范化，跳过已存在的 URL，用有界线程池并发校验其余订阅源，
+    然后在一个事务中批量插入通过校验的订阅源，返回每个订阅源的处理结果。
+    """
+    cursor = db.cursor()
+    cursor.execute("SELECT url FROM rss_feeds")
+    existing = {normalize_feed_url(row["url"]) or row["url"] for row in cursor.fetchall()}
+
+    # 规范化后再去重，结果按规范化后的 URL 记录并按 OPML 中的顺序返回
+    entries: list[tuple[str, str]] = []
+    results: dict[str, OPMLImportResult] = {}
+    candidates: list[tuple[str, str]] = []
+    seen = set()
+    for name, raw_url in parse_opml(data):
+        normalized = normalize_feed_url(raw_url)
+        url = normalized or raw_url
+        if url in seen:
+            continue
+        seen.add(url)
+        entries.append((name, url))
+        if normalized is None:
+            results[url] = OPMLImportResult(name=name or url, url=url, status="invalid", detail="URL 必须是合法的 http 或 https 地址")
+        elif url in existing:
+            results[url] = OPMLImportResult(name=name or url, url=url, status="exists")
+        else:
+            candidates.append((name, url))
+
+    titles: list[Optional[str]] = [""] * len(candidates)
+    if validate and candidates:
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(candidates)))) as executor:
+            titles = list(executor.map(lambda entry: _validate(entry[1], timeout), candidates))
+
+    rows = []
+    for (name, url), title in zip(candidates, titles):
+        name = name or title or url
+        if title is None:
+            results[url] = OPMLImportResult(name=name, url=url, status="invalid", detail="无法获取或解析订阅源")
+            continue
+        rows.append((name, url))
+        results[url] = OPMLImportResult(name=name, url=url, status="imported")
+
+    if rows:
+        try:
+            cursor.executemany("INSERT OR IGNORE INTO rss_feeds (name, url, is_active) VALUES (?, ?, 1)", rows)
+            db.commit()
+        except sqlite3.Error as e:
+            db.rollback()
+            raise HTTPException(status_code=500, detail=f"导入 Feed 失败: {e}")
+    # 按 OPML 中的顺序返回
+    return [results[url] for _, url in entries]
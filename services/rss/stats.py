@@ -0,0 +1,83 @@
+import sqlite3
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException
+
+from services.timestamps import epoch_to_iso, to_epoch
+
+# 每种粒度的桶长度（秒）
+GRANULARITY_SECONDS = {"hour": 3600, "day": 86400}
+# 统计指标，与 stats_rollups 的列一致
+STATS_METRICS = ("ingested", "read", "summarized")
+# 单次查询最多返回的桶数
+MAX_STATS_BUCKETS = 10000
+
+def get_stats_series(
+    db: sqlite3.Connection,
+    granularity: str,
+    since: datetime,
+    until: datetime,
+    feed_ids: Optional[list[int]] = None,
+    per_feed: bool = False,
+) -> dict:
+    """
+    从 stats_rollups 读取 [since, until) 范围内的统计，返回按列组织的稠密序列：
+    buckets 为每个桶的 UTC 起始时间，total 为所选 Feed 的合计，per_feed 为 true 时 feeds 中另附每个 Feed 的序列。
+    没有数据的桶补 0，前端可以直接绘制多 Feed 图表。
+    """
+    step = GRANULARITY_SECONDS.get(granularity)
+    if step is None:
+        raise HTTPException(status_code=400, detail=f"不支持的统计粒度: {granularity}")
+    start = to_epoch(since) // step * step
+    end = -(-to_epoch(until) // step) * step  # 向上取整到桶边界
+    count = (end - start) // step
+    if count <= 0:
+        raise HTTPException(status_code=400, detail="until 必须晚于 since")
+    if count > MAX_STATS_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"时间范围过大：最多 {MAX_STATS_BUCKETS} 个桶")
+
+    conditions = ["granularity = ?", "bucket_start >= ?", "bucket_start < ?"]
+    params: list = [granularity, start, end]
+    if feed_ids:
+        conditions.append(f"feed_id IN ({','.join('?' * len(feed_ids))})")
+        params.extend(feed_ids)
+    group_by = "bucket_start, feed_id" if per_feed else "bucket_start"
+    feed_column = "feed_id" if per_feed else "NULL"
+    sql = f"""
+    SELECT bucket_start, {feed_column} AS feed_id,
+           SUM(ingested) AS ingested, SUM(read) AS read, SUM(summarized) AS summarized
+    FROM stats_rollups
+    WHERE {' AND '.join(conditions)}
+    GROUP BY {group_by}
+    """
+    try:
+        rows = db.execute(sql, params).fetchall()
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"数据库错误: {e}")
+
+    total = {metric: [0] * count for metric in STATS_METRICS}
+    feeds: dict[int, dict[str, list[int]]] = {}
+    for row in rows:
+        index = (row["bucket_start"] - start) // step
+        series = None
+        if per_feed:
+            series = feeds.get(row["feed_id"])
+            if series is None:
+                series = feeds[row["feed_id"]] = {metric: [0] * count for metric in STATS_METRICS}
+        for metric in STATS_METRICS:
+            total[metric][index] += row[metric]
+            if series is not None:
+                series[metric][index] = row[metric]
+
+    result = {
+        "granularity": granularity,
+        "buckets": [
+            epoch_to_iso(start + i * step)
+            for i in range(count)
+        ],
+        "total": total,
+    }
+    if per_feed:
+        result["feeds"] = [{"feed_id": feed_id, **series} for feed_id, series in sorted(feeds.items())]
+    return result
@@ -1,21 +1,52 @@
+import calendar
 import time
 from datetime import datetime, timezone
 import schedule
 
 # 导入自定义模块
-from services.database import get_db
+from services.database import get_db, initialize_database
 from services.rss.article.article import create_article
 from services.rss.article.metadata import article_exists
 from services.rss.request import get_rss_feed
-from services.rss.feed import get_all_feeds
+from services.rss.feed import get_all_feeds, reconcile_feed_counters
 from models.rss.article import Article
-from services.config import get_config
+from services.config import get_config, get_config_value
+
+# 新文章监听器：每次处理完一个 RSS 源后，以新插入的文章 ID 列表调用
+# 注意：监听器在更新线程中被调用，需要自行保证线程安全
+_new_articles_listeners = []
+
+def add_new_articles_listener(callback):
+    """
+    注册新文章监听器。
+    """
+    _new_articles_listeners.append(callback)
+
+def remove_new_articles_listener(callback):
+    """
+    移除新文章监听器。
+    """
+    if callback in _new_articles_listeners:
+        _new_articles_listeners.remove(callback)
+
+def notify_new_articles(article_ids):
+    """
+    通知所有监听器，单个监听器出错不影响其他监听器。
+    """
+    if not article_ids:
+        return
+    for callback in list(_new_articles_listeners):
+        try:
+            callback(article_ids)
+        except Exception as e:
+            print(f" - 警告: 新文章监听器执行失败: {e}")
 
 class RSSUpdater:
     def __init__(self):
         self.interval = 30  # 默认间隔时间（分钟）
         self.running = True  # 控制任务运行状态
         self.auto_refresh = True  # 默认启用自动刷新
+        self.last_reconcile = 0  # 上次校正 Feed 计数的时间
 
     def safely_close_generator(self, generator):
         """
@@ -29,18 +60,20 @@ class RSSUpdater:
     def process_feed_entry(self, conn, feed, entry):
         """
         处理单个 RSS 源条目。
+        返回新插入文章的 ID，未插入时返回 None。
         """
         guid = entry.get('guid', entry.get('link'))
         if not guid:
             print(f" - 警告: 文章缺少 'guid' 和 'link'，跳过此文章。标题: {entry.get('title', '未知')}")
-            return 0
+            return None
 
         if article_exists(conn, guid):
-            return 0
+            return None
 
         try:
+            # published_parsed 是 UTC 的 struct_time，用 timegm 而不是按本地时间解释的 mktime
             pub_date = datetime.fromtimestamp(
-                time.mktime(entry.published_parsed), tz=timezone.utc
+                calendar.timegm(entry.published_parsed), tz=timezone.utc
             ) if hasattr(entry, 'published_parsed') and entry.published_parsed else datetime.now(tz=timezone.utc)
         except (ValueError, TypeError):
             pub_date = datetime.now(tz=timezone.utc)
@@ -54,11 +87,11 @@ class RSSUpdater:
                 pub_date=pub_date,
                 author=entry.get('author', None),
             )
-            create_article(conn, article)
-            return 1
+            result = create_article(conn, article)
+            return result["article_id"]
         except Exception as e:
             print(f" - 警告: 无法创建或添加文章模型，跳过。错误: {e}")
-            return 0
+            return None
 
     def process_feed(self, conn, feed):
         """
@@ -74,9 +107,14 @@ class RSSUpdater:
             print(f" - 警告: 无法获取或解析此RSS源，跳过。")
             return 0
 
-        new_articles_count = sum(self.process_feed_entry(conn, feed, entry) for entry in feed_data.entries)
-        print(f" - 成功添加了 {new_articles_count} 篇新文章。")
-        return new_articles_count
+        new_article_ids = [
+            article_id
+            for article_id in (self.process_feed_entry(conn, feed, entry) for entry in feed_data.entries)
+            if article_id is not None
+        ]
+        print(f" - 成功添加了 {len(new_article_ids)} 篇新文章。")
+        notify_new_articles(new_article_ids)
+        return len(new_article_ids)
 
     def check_and_update_feeds(self):
         """
@@ -96,6 +134,7 @@ class RSSUpdater:
                 return
             
             total_new_articles = sum(self.process_feed(conn, feed) for feed in rss_feeds)
+            self.reconcile_counters(conn)
         except StopIteration:
             print("错误: get_db 生成器已耗尽。")
         except Exception as e:
@@ -105,6 +144,18 @@ class RSSUpdater:
 
         print(f"RSS源检查任务完成。共添加 {total_new_articles} 篇新文章。")
 
+    def reconcile_counters(self, conn):
+        """
+        距离上次校正超过 feed_counters_reconcile_interval_minutes 时，校正一次 Feed 计数。
+        """
+        interval = get_config_value(conn, "feed_counters_reconcile_interval_minutes", 360, int)
+        if time.time() - self.last_reconcile < interval * 60:
+            return
+        self.last_reconcile = time.time()
+        corrected = reconcile_feed_counters(conn)
+        if corrected:
+            print(f" - Feed 计数校正：修正了 {corrected} 个 RSS 源。")
+
     def refresh_now(self):
         """
         外部调用：立即刷新 RSS 源。
@@ -154,5 +205,6 @@ class RSSUpdater:
             time.sleep(1)
 
 if __name__ == "__main__":
+    initialize_database()
     updater = RSSUpdater()
     updater.start()
\ No newline at end of file
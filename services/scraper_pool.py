@@ -0,0 +1,182 @@
+import asyncio
+import itertools
+import multiprocessing
+from typing import Optional
+
+import services.playwright as pw_service
+from services.config import get_config_value
+
+# 结果分块回传的大小（字符），避免单条消息过大阻塞管道
+RESULT_CHUNK_CHARS = 64 * 1024
+# 关闭时等待工作进程退出的秒数
+WORKER_STOP_TIMEOUT = 5
+
+class ScrapeJobError(Exception):
+    """
+    工作进程报告的抓取失败（工作进程本身仍然健康）。
+    """
+
+def _worker_main(worker_id: int, conn, settings: dict) -> None:
+    """
+    工作进程入口：拥有独立的 Playwright 浏览器，逐个处理父进程发来的抓取任务，
+    结果分块回传。收到 None 时退出。
+    抓取配置由父进程传入，工作进程不访问数据库。
+    """
+    asyncio.run(_worker_loop(worker_id, conn, settings))
+
+async def _worker_loop(worker_id: int, conn, settings: dict) -> None:
+    # 工作进程常驻，浏览器不做空闲关闭
+    manager = pw_service.PlaywrightManager(idle_timeout=0, settings=settings)
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            try:
+                job = await loop.run_in_executor(None, conn.recv)
+            except EOFError:
+                break  # 父进程已退出
+            if job is None:
+                break
+            job_id, url = job
+            try:
+                text = await manager.scrape(url)
+            except Exception as e:
+                conn.send((job_id, "error", f"{type(e).__name__}: {e}"))
+                continue
+            for i in range(0, len(text), RESULT_CHUNK_CHARS):
+                conn.send((job_id, "chunk", text[i:i + RESULT_CHUNK_CHARS]))
+            conn.send((job_id, "done", None))
+    finally:
+        await manager.shutdown()
+        conn.close()
+
+class _ScraperWorker:
+    """
+    父进程持有的工作进程句柄：进程对象与双向管道。
+    """
+    def __init__(self, ctx, worker_id: int, settings: dict):
+        self.worker_id = worker_id
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(worker_id, child_conn, settings), name=f"scraper-{worker_id}", daemon=True)
+        self.process.start()
+        # 关闭父进程中的子端，子进程退出时 recv 才会收到 EOFError
+        child_conn.close()
+
+    def kill(self) -> None:
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(WORKER_STOP_TIMEOUT)
+        self.conn.close()
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(WORKER_STOP_TIMEOUT)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join(WORKER_STOP_TIMEOUT)
+        self.conn.close()
+
+class ScraperProcessPool:
+    """
+    进程外的抓取工作池。
+    每个工作进程拥有自己的浏览器，通过本地管道接收任务并分块回传结果；
+    单个页面导致的渲染进程崩溃或内存暴涨只影响所在的工作进程，抓取也不再与 API 进程争用 CPU。
+    任务超时或工作进程崩溃时，该进程被杀掉并自动重启。
+    与 PlaywrightManager 提供相同的 scrape(url) 接口。
+    """
+    def __init__(self, size: int = 2, job_timeout: float = 45, settings: Optional[dict] = None):
+        self.size = max(1, size)
+        self.job_timeout = job_timeout
+        # 传给工作进程的抓取配置；为空时使用默认值
+        self.settings = settings or {key: default for key, (default, _) in pw_service.PLAYWRIGHT_SETTINGS.items()}
+        self._ctx = multiprocessing.get_context("spawn")  # 各平台行为一致，且不继承父进程的事件循环与浏览器
+        self._ids = itertools.count()
+        self._worker_ids = itertools.count()
+        self._idle: Optional[asyncio.Queue] = None
+        self._workers: list[_ScraperWorker] = []
+
+    @classmethod
+    def from_config(cls, db) -> "ScraperProcessPool":
+        return cls(
+            size=get_config_value(db, "scraper_workers", 2, int),
+            job_timeout=get_config_value(db, "scraper_job_timeout_seconds", 45, float),
+            settings=pw_service.load_playwright_settings(db),
+        )
+
+    def start(self) -> None:
+        """
+        启动工作进程。
+        """
+        self._idle = asyncio.Queue()
+        for _ in range(self.size):
+            worker = _ScraperWorker(self._ctx, next(self._worker_ids), self.settings)
+            self._workers.append(worker)
+            self._idle.put_nowait(worker)
+        print(f"抓取工作池已启动，{self.size} 个工作进程。")
+
+    def _restart(self, worker: _ScraperWorker) -> _ScraperWorker:
+        worker.kill()
+        replacement = _ScraperWorker(self._ctx, next(self._worker_ids), self.settings)
+        self._workers[self._workers.index(worker)] = replacement
+        print(f"抓取工作进程 {worker.worker_id} 已重启为 {replacement.worker_id}。")
+        return replacement
+
+    async def _run(self, worker: _ScraperWorker, url: str) -> str:
+        # 分块只用于管道传输：摘要流程在发出第一个 LLM 请求前需要完整正文
+        # （内容哈希查缓存、reduce_content 的尾部截断判断、token 计数与 map 切分），因此这里在父进程中拼接后整体返回
+        loop = asyncio.get_running_loop()
+        job_id = next(self._ids)
+        worker.conn.send((job_id, url))
+        parts = []
+        while True:
+            # 工作进程崩溃时管道关闭，recv 抛出 EOFError
+            result_id, kind, payload = await loop.run_in_executor(None, worker.conn.recv)
+            if result_id != job_id:
+                continue
+            if kind == "chunk":
+                parts.append(payload)
+            elif kind == "done":
+                return "".join(parts)
+            else:
+                raise ScrapeJobError(payload)
+
+    async def scrape(self, url: str) -> str:
+        """
+        把抓取任务交给一个空闲的工作进程（没有空闲进程时排队），返回正文文本。
+        """
+        if self._idle is None:
+            raise RuntimeError("抓取工作池未启动")
+        worker = await self._idle.get()
+        if not worker.process.is_alive():
+            # 空闲期间退出的工作进程先重启，不让本次任务失败
+            worker = await asyncio.to_thread(self._restart, worker)
+        try:
+            return await asyncio.wait_for(self._run(worker, url), self.job_timeout)
+        except ScrapeJobError:
+            raise
+        except BaseException as e:
+            # 超时、崩溃或调用方取消：工作进程状态未知，直接重启
+            timed_out = isinstance(e, asyncio.TimeoutError)
+            # TimeoutError 也是 OSError 的子类，需要先排除
+            crashed = isinstance(e, (EOFError, OSError)) and not timed_out
+            if timed_out:
+                print(f"抓取任务超时 ({url})，重启工作进程 {worker.worker_id}。")
+            elif crashed:
+                print(f"抓取工作进程 {worker.worker_id} 异常退出 ({url})。")
+            worker = await asyncio.to_thread(self._restart, worker)
+            if crashed:
+                raise ScrapeJobError(f"抓取工作进程异常退出: {e!r}") from e
+            raise
+        finally:
+            if self._idle is not None:
+                self._idle.put_nowait(worker)
+
+    async def shutdown(self) -> None:
+        """
+        通知所有工作进程退出，超时未退出的直接杀掉。
+        """
+        workers, self._workers = self._workers, []
+        self._idle = None
+        await asyncio.gather(*(asyncio.to_thread(worker.stop) for worker in workers))
@@ -0,0 +1,69 @@
+import json
+from typing import Any, Iterable, Iterator, Sequence
+
+from fastapi.responses import Response
+
+# orjson 为可选依赖，未安装时退回标准库 json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def dumps(obj: Any) -> bytes:
+    """
+    把由 dict/list/str/int/float/bool/None 组成的数据编码为紧凑的 UTF-8 JSON 字节串。
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+class FastJSONResponse(Response):
+    """
+    直接编码已校验数据的 JSON 响应，不经过 Pydantic 模型与 jsonable_encoder。
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def to_columns(records: Iterable[dict], columns: Sequence[str]) -> dict[str, list]:
+    """
+    把按行的记录转换为按列的形状 {列名: [值, ...]}，大页面时键名只出现一次。
+    """
+    result: dict[str, list] = {column: [] for column in columns}
+    for record in records:
+        for column in columns:
+            result[column].append(record[column])
+    return result
+
+# 流式输出时合并小块的目标大小（字节），减少 ASGI send 次数
+STREAM_CHUNK_BYTES = 16 * 1024
+
+def _buffered(parts: Iterable[bytes], size: int = STREAM_CHUNK_BYTES) -> Iterator[bytes]:
+    buffer = bytearray()
+    for part in parts:
+        buffer += part
+        if len(buffer) >= size:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+def iter_json_array(records: Iterable[Any], prefix: bytes = b"", suffix: bytes = b"") -> Iterator[bytes]:
+    """
+    逐条编码记录，输出 prefix + JSON 数组 + suffix，无需先在内存中构建整个列表。
+    """
+    def parts():
+        yield prefix + b"["
+        first = True
+        for record in records:
+            yield dumps(record) if first else b"," + dumps(record)
+            first = False
+        yield b"]" + suffix
+    return _buffered(parts())
+
+def iter_ndjson(records: Iterable[Any]) -> Iterator[bytes]:
+    """
+    以 NDJSON（每行一个 JSON 对象）逐条输出记录。
+    """
+    return _buffered(dumps(record) + b"\n" for record in records)
@@ -0,0 +1,27 @@
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+# 数据库中的时间统一存储为 UTC Unix 秒（INTEGER）
+
+def to_epoch(value: datetime) -> int:
+    """
+    把 datetime 转换为 UTC 秒。不带时区的时间按 UTC 处理。
+    """
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+def now_epoch() -> int:
+    """
+    当前 UTC 秒。
+    """
+    return int(time.time())
+
+def epoch_to_iso(value: Optional[int]) -> Optional[str]:
+    """
+    把数据库中的 UTC 秒转换为带时区的 ISO 8601 字符串，用于 API 输出。
+    """
+    if value is None:
+        return None
+    return datetime.fromtimestamp(value, tz=timezone.utc).isoformat()
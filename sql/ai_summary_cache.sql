@@ -0,0 +1,9 @@
+-- Creating table for AI summaries shared across duplicate articles
+-- cache_key = sha256(kind | canonical URL or normalized text hash | model | prompt version)
+CREATE TABLE IF NOT EXISTS ai_summary_cache (
+    cache_key TEXT PRIMARY KEY CHECK(cache_key <> ''),
+    summary TEXT NOT NULL,
+    model TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    created_at TEXT NOT NULL DEFAULT (datetime('now'))
+);
@@ -0,0 +1,25 @@
+-- Creating tables for durable AI summary streaming sessions
+-- One row per article being summarized; owner is the worker currently generating it
+CREATE TABLE IF NOT EXISTS ai_summary_sessions (
+    article_id INTEGER PRIMARY KEY,
+    owner TEXT NOT NULL,
+    claim_token TEXT NOT NULL,
+    status TEXT NOT NULL CHECK(status IN ('running', 'paused', 'done', 'failed')),
+    messages TEXT NOT NULL,
+    cache_keys TEXT NOT NULL DEFAULT '[]',
+    heartbeat_at REAL NOT NULL,
+    watcher_heartbeat_at REAL NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,  -- consecutive failed generations
+    last_error TEXT,
+    created_at TEXT NOT NULL DEFAULT (datetime('now'))
+);
+
+-- Append-only chunk log of each session, read by offset
+CREATE TABLE IF NOT EXISTS ai_summary_chunks (
+    article_id INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    PRIMARY KEY (article_id, seq)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_ai_summary_sessions_heartbeat ON ai_summary_sessions(heartbeat_at);
@@ -1,11 +1,12 @@
 -- Creating table for ArticleState with optimized constraints
+-- updated_at is UTC Unix epoch seconds
 CREATE TABLE IF NOT EXISTS article_states (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     article_id INTEGER NOT NULL,
     is_read BOOLEAN NOT NULL DEFAULT 0,
     tags TEXT,
     ai_summary TEXT,
-    updated_at TEXT NOT NULL DEFAULT (datetime('now')),
+    updated_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
     FOREIGN KEY (article_id) REFERENCES articles(id) ON DELETE CASCADE
 );
 
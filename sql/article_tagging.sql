@@ -0,0 +1,9 @@
+-- Creating table tracking background auto-tagging progress per article
+-- status: 'done' (tags written), 'empty' (model returned no usable tags) or 'failed' (retried up to a limit)
+CREATE TABLE IF NOT EXISTS article_tagging (
+    article_id INTEGER PRIMARY KEY,
+    status TEXT NOT NULL CHECK(status IN ('done', 'empty', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT NOT NULL DEFAULT (datetime('now')),
+    FOREIGN KEY (article_id) REFERENCES articles(id) ON DELETE CASCADE
+);
@@ -1,17 +1,19 @@
 -- Creating table for Articles with optimized constraints and indexes
+-- pub_date and created_at are UTC Unix epoch seconds
 CREATE TABLE IF NOT EXISTS articles (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     feed_id INTEGER NOT NULL,
     title TEXT NOT NULL CHECK(title <> ''),
     link TEXT NOT NULL CHECK(link <> ''),
     guid TEXT NOT NULL CHECK(guid <> '') UNIQUE,
-    pub_date TEXT NOT NULL CHECK(pub_date <> ''),
+    pub_date INTEGER NOT NULL CHECK(typeof(pub_date) = 'integer'),
     author TEXT,
-    created_at TEXT NOT NULL DEFAULT (datetime('now')),
+    created_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
     FOREIGN KEY (feed_id) REFERENCES rss_feeds(id) ON DELETE CASCADE
 );
 
 -- Creating indexes for articles queries
-CREATE INDEX IF NOT EXISTS idx_articles_feed_id ON articles(feed_id);
-CREATE INDEX IF NOT EXISTS idx_articles_guid ON articles(guid);
+-- guid is already indexed by its UNIQUE constraint;
+-- (feed_id, pub_date) serves per-feed lookups, per-feed ordering and time-range scans
+CREATE INDEX IF NOT EXISTS idx_articles_feed_id_pub_date ON articles(feed_id, pub_date);
 CREATE INDEX IF NOT EXISTS idx_articles_pub_date ON articles(pub_date);
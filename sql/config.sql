@@ -4,8 +4,8 @@ CREATE TABLE IF NOT EXISTS config (
     value TEXT
 );
 
--- Creating index for config queries
-CREATE INDEX IF NOT EXISTS idx_config_key ON config(key);
+-- key is already indexed as the primary key
+DROP INDEX IF EXISTS idx_config_key;
 
 -- Adding entry for RSS read interval (default 60 minutes)
 INSERT OR IGNORE INTO config (key, value) VALUES ('rss_read_interval', '60');
@@ -14,4 +14,130 @@ INSERT OR IGNORE INTO config (key, value) VALUES ('rss_auto_refresh', 'true');
 
 -- LLM configuration
 -- Adding entry for LLM configuration ID (default NULL)
-INSERT OR IGNORE INTO config (key, value) VALUES ('llm_config_id', NULL);
\ No newline at end of file
+INSERT OR IGNORE INTO config (key, value) VALUES ('llm_config_id', NULL);
+
+-- AI pre-summarization pipeline
+-- Enable background summarization of newly ingested articles (default 'false')
+INSERT OR IGNORE INTO config (key, value) VALUES ('ai_presummary_enabled', 'false');
+-- Maximum concurrent scrape + summarize jobs
+INSERT OR IGNORE INTO config (key, value) VALUES ('ai_presummary_concurrency', '2');
+-- Token budget per hour for background summaries
+INSERT OR IGNORE INTO config (key, value) VALUES ('ai_presummary_token_budget', '200000');
+-- Comma-separated feed IDs summarized first (e.g. '1,3')
+INSERT OR IGNORE INTO config (key, value) VALUES ('ai_presummary_priority_feeds', '');
+
+-- AI summary content reduction
+-- Maximum input tokens per summary request (also capped at half the model context window)
+INSERT OR IGNORE INTO config (key, value) VALUES ('ai_summary_max_input_tokens', '6000');
+-- Maximum chunks summarized for very long articles (map-reduce)
+INSERT OR IGNORE INTO config (key, value) VALUES ('ai_summary_max_chunks', '8');
+-- Concurrent chunk summaries during the map step
+INSERT OR IGNORE INTO config (key, value) VALUES ('ai_summary_map_concurrency', '4');
+
+-- AI summary generation when every subscriber disconnects
+-- Seconds to wait with zero subscribers before cancelling the generation
+INSERT OR IGNORE INTO config (key, value) VALUES ('ai_summary_idle_grace_seconds', '15');
+-- Keep generating in the background after every subscriber disconnects (default 'false')
+INSERT OR IGNORE INTO config (key, value) VALUES ('ai_summary_finish_in_background', 'false');
+-- Seconds to keep durable summary sessions and their chunk logs for resumption
+INSERT OR IGNORE INTO config (key, value) VALUES ('ai_summary_session_ttl_seconds', '86400');
+-- Failed generations of a session before requests stop resuming it and return the last error
+INSERT OR IGNORE INTO config (key, value) VALUES ('ai_summary_max_attempts', '3');
+
+-- LLM stream fan-out
+-- Slow consumer policy: 'coalesce', 'drop' or 'disconnect'
+INSERT OR IGNORE INTO config (key, value) VALUES ('llm_stream_slow_consumer_policy', 'coalesce');
+-- Maximum chunks a subscriber may lag behind before the policy applies
+INSERT OR IGNORE INTO config (key, value) VALUES ('llm_stream_max_lag_chunks', '256');
+-- Window in milliseconds for coalescing token deltas into one SSE event
+INSERT OR IGNORE INTO config (key, value) VALUES ('llm_stream_flush_ms', '30');
+-- Flush a coalesced SSE event early once it reaches this many bytes
+INSERT OR IGNORE INTO config (key, value) VALUES ('llm_stream_flush_bytes', '512');
+
+-- LLM admission control (per llm_config)
+-- Maximum concurrent upstream LLM requests (shrinks automatically on upstream 429)
+INSERT OR IGNORE INTO config (key, value) VALUES ('llm_max_in_flight', '4');
+-- Maximum requests waiting for a slot before returning 429
+INSERT OR IGNORE INTO config (key, value) VALUES ('llm_max_queue', '16');
+-- Seconds a request may wait for a slot before returning 429
+INSERT OR IGNORE INTO config (key, value) VALUES ('llm_queue_timeout_seconds', '30');
+
+-- Multi-provider LLM routing
+-- Comma separated llm_config ids to route across; empty uses llm_config_id only
+INSERT OR IGNORE INTO config (key, value) VALUES ('llm_config_ids', '');
+-- Start a hedged request on the next provider when the first token is slow (default 'false')
+INSERT OR IGNORE INTO config (key, value) VALUES ('llm_hedge_enabled', 'false');
+-- Milliseconds to wait for the first token before hedging
+INSERT OR IGNORE INTO config (key, value) VALUES ('llm_hedge_delay_ms', '1500');
+
+-- Deterministic chat response cache (requests opt in with "cache": true)
+-- Master switch for the response cache (default 'true')
+INSERT OR IGNORE INTO config (key, value) VALUES ('llm_response_cache_enabled', 'true');
+-- Maximum responses kept in the in-memory LRU tier
+INSERT OR IGNORE INTO config (key, value) VALUES ('llm_response_cache_max_entries', '256');
+-- Seconds a cached response stays valid
+INSERT OR IGNORE INTO config (key, value) VALUES ('llm_response_cache_ttl_seconds', '3600');
+-- Also keep cached responses in SQLite so they survive restarts and are shared across workers (default 'false')
+INSERT OR IGNORE INTO config (key, value) VALUES ('llm_response_cache_persist', 'false');
+
+-- Server-side chat conversations
+-- Compact older turns into a rolling summary once the un-summarized history exceeds this many tokens
+INSERT OR IGNORE INTO config (key, value) VALUES ('chat_compact_threshold_tokens', '6000');
+-- Number of most recent turns always sent verbatim
+INSERT OR IGNORE INTO config (key, value) VALUES ('chat_keep_recent_turns', '4');
+-- Hard cap on the history sent per turn (also capped at half the model context window); above it the oldest messages are compacted regardless of turn count
+INSERT OR IGNORE INTO config (key, value) VALUES ('chat_max_context_tokens', '16000');
+
+-- Background batched auto-tagging of untagged articles
+-- Enable auto-tagging (default 'false')
+INSERT OR IGNORE INTO config (key, value) VALUES ('ai_tagging_enabled', 'false');
+-- Number of article titles classified per LLM call
+INSERT OR IGNORE INTO config (key, value) VALUES ('ai_tagging_batch_size', '20');
+-- Number of batches tagged concurrently
+INSERT OR IGNORE INTO config (key, value) VALUES ('ai_tagging_concurrency', '1');
+-- Maximum tokens auto-tagging may spend per hour
+INSERT OR IGNORE INTO config (key, value) VALUES ('ai_tagging_token_budget', '50000');
+-- Maximum tags assigned to one article
+INSERT OR IGNORE INTO config (key, value) VALUES ('ai_tagging_max_tags', '3');
+
+-- Playwright page pool
+-- Maximum warm browser pages (and concurrent scrapes); further scrapes wait in a queue
+INSERT OR IGNORE INTO config (key, value) VALUES ('playwright_pool_size', '4');
+-- Recycle a page's context after this many scrapes
+INSERT OR IGNORE INTO config (key, value) VALUES ('playwright_page_max_uses', '50');
+-- Recycle a page's context when its JS heap exceeds this many MB
+INSERT OR IGNORE INTO config (key, value) VALUES ('playwright_page_max_heap_mb', '256');
+-- Scrape mode: 'fast' blocks non-document resources and trackers and stops once the text stabilizes; 'full' waits for networkidle
+INSERT OR IGNORE INTO config (key, value) VALUES ('playwright_scrape_mode', 'fast');
+-- Hard deadline in milliseconds for one scrape, including time spent waiting for a pooled page
+INSERT OR IGNORE INTO config (key, value) VALUES ('playwright_scrape_timeout_ms', '20000');
+-- Close the lazily started browser after this many idle seconds (0 keeps it running)
+INSERT OR IGNORE INTO config (key, value) VALUES ('playwright_idle_timeout_seconds', '300');
+
+-- Tiered article fetching
+-- Try a plain HTTP fetch with HTML extraction before launching the browser (default 'true')
+INSERT OR IGNORE INTO config (key, value) VALUES ('scrape_http_first', 'true');
+-- Timeout in seconds for the plain HTTP fetch
+INSERT OR IGNORE INTO config (key, value) VALUES ('scrape_http_timeout_seconds', '10');
+
+-- Browser scraping mode
+-- 'inprocess' shares one lazily started browser; 'process' runs scrapes in a pool of worker processes with their own browsers
+INSERT OR IGNORE INTO config (key, value) VALUES ('scraper_mode', 'inprocess');
+-- Number of scraper worker processes in 'process' mode
+INSERT OR IGNORE INTO config (key, value) VALUES ('scraper_workers', '2');
+-- Seconds before a scrape job is abandoned and its worker process restarted
+INSERT OR IGNORE INTO config (key, value) VALUES ('scraper_job_timeout_seconds', '45');
+
+-- HTTP response compression (gzip, or brotli when installed); applied at startup
+-- Responses smaller than this many bytes are sent uncompressed
+INSERT OR IGNORE INTO config (key, value) VALUES ('response_compression_min_bytes', '1024');
+
+-- OPML import
+-- Number of feeds validated concurrently during an OPML import
+INSERT OR IGNORE INTO config (key, value) VALUES ('feed_import_concurrency', '16');
+-- Timeout in seconds for fetching each feed during validation
+INSERT OR IGNORE INTO config (key, value) VALUES ('feed_import_timeout_seconds', '10');
+
+-- Feed counters
+-- Minimum minutes between full reconciliations of the trigger-maintained feed counters
+INSERT OR IGNORE INTO config (key, value) VALUES ('feed_counters_reconcile_interval_minutes', '360');
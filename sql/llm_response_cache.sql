@@ -0,0 +1,10 @@
+-- Creating table for the on-disk tier of the deterministic chat response cache
+-- cache_key = sha256(model | messages | parameters), chunks = JSON array of streamed deltas
+CREATE TABLE IF NOT EXISTS llm_response_cache (
+    cache_key TEXT PRIMARY KEY CHECK(cache_key <> ''),
+    model TEXT NOT NULL,
+    chunks TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_llm_response_cache_created_at ON llm_response_cache(created_at);
@@ -6,5 +6,5 @@ CREATE TABLE IF NOT EXISTS rss_feeds (
     is_active BOOLEAN NOT NULL DEFAULT 1
 );
 
--- Creating index for rss_feeds queries
-CREATE INDEX IF NOT EXISTS idx_rss_feeds_url ON rss_feeds(url);
+-- url is already indexed by its UNIQUE constraint
+DROP INDEX IF EXISTS idx_rss_feeds_url;
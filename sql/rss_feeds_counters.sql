@@ -0,0 +1,76 @@
+-- Materialized per-feed counters, maintained incrementally by triggers
+-- (this file sorts after articles.sql, article_states.sql and rss_feeds.sql, whose tables the triggers attach to)
+CREATE TABLE IF NOT EXISTS feed_counters (
+    feed_id INTEGER PRIMARY KEY,
+    total INTEGER NOT NULL DEFAULT 0,
+    unread INTEGER NOT NULL DEFAULT 0,
+    newest_pub_date INTEGER,
+    FOREIGN KEY (feed_id) REFERENCES rss_feeds(id) ON DELETE CASCADE
+);
+
+-- Feed lifecycle
+CREATE TRIGGER IF NOT EXISTS trg_feed_counters_feed_insert AFTER INSERT ON rss_feeds
+BEGIN
+    INSERT OR IGNORE INTO feed_counters (feed_id) VALUES (NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_feed_counters_feed_delete AFTER DELETE ON rss_feeds
+BEGIN
+    DELETE FROM feed_counters WHERE feed_id = OLD.id;
+END;
+
+-- Article ingest and removal: total and newest pub_date
+CREATE TRIGGER IF NOT EXISTS trg_feed_counters_article_insert AFTER INSERT ON articles
+BEGIN
+    INSERT INTO feed_counters (feed_id, total, newest_pub_date) VALUES (NEW.feed_id, 1, NEW.pub_date)
+    ON CONFLICT(feed_id) DO UPDATE SET
+        total = total + 1,
+        newest_pub_date = CASE
+            WHEN newest_pub_date IS NULL OR excluded.newest_pub_date > newest_pub_date THEN excluded.newest_pub_date
+            ELSE newest_pub_date
+        END;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_feed_counters_article_delete AFTER DELETE ON articles
+BEGIN
+    UPDATE feed_counters SET
+        total = MAX(total - 1, 0),
+        -- only rescan when the newest article was the one removed
+        newest_pub_date = CASE
+            WHEN OLD.pub_date >= newest_pub_date THEN (SELECT MAX(pub_date) FROM articles WHERE feed_id = OLD.feed_id)
+            ELSE newest_pub_date
+        END
+    WHERE feed_id = OLD.feed_id;
+END;
+
+-- Read state: unread
+CREATE TRIGGER IF NOT EXISTS trg_feed_counters_state_insert AFTER INSERT ON article_states
+WHEN NOT NEW.is_read
+BEGIN
+    UPDATE feed_counters SET unread = unread + 1
+    WHERE feed_id = (SELECT feed_id FROM articles WHERE id = NEW.article_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_feed_counters_state_update AFTER UPDATE OF is_read ON article_states
+WHEN (NOT NEW.is_read) != (NOT OLD.is_read)
+BEGIN
+    UPDATE feed_counters SET unread = MAX(unread + CASE WHEN NEW.is_read THEN -1 ELSE 1 END, 0)
+    WHERE feed_id = (SELECT feed_id FROM articles WHERE id = NEW.article_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_feed_counters_state_delete AFTER DELETE ON article_states
+WHEN NOT OLD.is_read
+BEGIN
+    UPDATE feed_counters SET unread = MAX(unread - 1, 0)
+    WHERE feed_id = (SELECT feed_id FROM articles WHERE id = OLD.article_id);
+END;
+
+-- Backfill once for databases created before this table existed
+INSERT INTO feed_counters (feed_id, total, unread, newest_pub_date)
+SELECT
+    f.id,
+    (SELECT COUNT(*) FROM articles a WHERE a.feed_id = f.id),
+    (SELECT COUNT(*) FROM articles a JOIN article_states s ON a.id = s.article_id WHERE a.feed_id = f.id AND NOT s.is_read),
+    (SELECT MAX(pub_date) FROM articles a WHERE a.feed_id = f.id)
+FROM rss_feeds f
+WHERE NOT EXISTS (SELECT 1 FROM feed_counters);
@@ -0,0 +1,64 @@
+-- Hourly and daily activity counts per feed, maintained incrementally by triggers
+-- granularity: 'hour' or 'day'; bucket_start: UTC epoch seconds at the start of the bucket
+CREATE TABLE IF NOT EXISTS stats_rollups (
+    granularity TEXT NOT NULL CHECK(granularity IN ('hour', 'day')),
+    bucket_start INTEGER NOT NULL,
+    feed_id INTEGER NOT NULL,
+    ingested INTEGER NOT NULL DEFAULT 0,
+    read INTEGER NOT NULL DEFAULT 0,
+    summarized INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (granularity, bucket_start, feed_id)
+) WITHOUT ROWID;
+
+-- Articles ingested
+CREATE TRIGGER IF NOT EXISTS trg_stats_rollups_article_insert AFTER INSERT ON articles
+BEGIN
+    INSERT INTO stats_rollups (granularity, bucket_start, feed_id, ingested)
+    VALUES ('hour', CAST(strftime('%s', 'now') AS INTEGER) / 3600 * 3600, NEW.feed_id, 1)
+    ON CONFLICT(granularity, bucket_start, feed_id) DO UPDATE SET ingested = ingested + 1;
+    INSERT INTO stats_rollups (granularity, bucket_start, feed_id, ingested)
+    VALUES ('day', CAST(strftime('%s', 'now') AS INTEGER) / 86400 * 86400, NEW.feed_id, 1)
+    ON CONFLICT(granularity, bucket_start, feed_id) DO UPDATE SET ingested = ingested + 1;
+END;
+
+-- Articles marked as read
+CREATE TRIGGER IF NOT EXISTS trg_stats_rollups_state_read AFTER UPDATE OF is_read ON article_states
+WHEN NEW.is_read AND NOT OLD.is_read
+BEGIN
+    INSERT INTO stats_rollups (granularity, bucket_start, feed_id, read)
+    SELECT 'hour', CAST(strftime('%s', 'now') AS INTEGER) / 3600 * 3600, feed_id, 1 FROM articles WHERE id = NEW.article_id
+    ON CONFLICT(granularity, bucket_start, feed_id) DO UPDATE SET read = read + 1;
+    INSERT INTO stats_rollups (granularity, bucket_start, feed_id, read)
+    SELECT 'day', CAST(strftime('%s', 'now') AS INTEGER) / 86400 * 86400, feed_id, 1 FROM articles WHERE id = NEW.article_id
+    ON CONFLICT(granularity, bucket_start, feed_id) DO UPDATE SET read = read + 1;
+END;
+
+-- Articles that received their first AI summary
+CREATE TRIGGER IF NOT EXISTS trg_stats_rollups_state_summarized AFTER UPDATE OF ai_summary ON article_states
+WHEN COALESCE(NEW.ai_summary, '') <> '' AND COALESCE(OLD.ai_summary, '') = ''
+BEGIN
+    INSERT INTO stats_rollups (granularity, bucket_start, feed_id, summarized)
+    SELECT 'hour', CAST(strftime('%s', 'now') AS INTEGER) / 3600 * 3600, feed_id, 1 FROM articles WHERE id = NEW.article_id
+    ON CONFLICT(granularity, bucket_start, feed_id) DO UPDATE SET summarized = summarized + 1;
+    INSERT INTO stats_rollups (granularity, bucket_start, feed_id, summarized)
+    SELECT 'day', CAST(strftime('%s', 'now') AS INTEGER) / 86400 * 86400, feed_id, 1 FROM articles WHERE id = NEW.article_id
+    ON CONFLICT(granularity, bucket_start, feed_id) DO UPDATE SET summarized = summarized + 1;
+END;
+
+-- Backfill once for databases created before this table existed.
+-- Ingests use articles.created_at; reads and summaries use article_states.updated_at as the best available time.
+INSERT INTO stats_rollups (granularity, bucket_start, feed_id, ingested, read, summarized)
+SELECT g.granularity, e.ts / g.seconds * g.seconds, e.feed_id, SUM(e.ingested), SUM(e.read), SUM(e.summarized)
+FROM (
+    SELECT created_at AS ts, feed_id, 1 AS ingested, 0 AS read, 0 AS summarized
+    FROM articles
+    UNION ALL
+    SELECT s.updated_at, a.feed_id, 0, 1, 0
+    FROM article_states s JOIN articles a ON a.id = s.article_id WHERE s.is_read
+    UNION ALL
+    SELECT s.updated_at, a.feed_id, 0, 0, 1
+    FROM article_states s JOIN articles a ON a.id = s.article_id WHERE COALESCE(s.ai_summary, '') <> ''
+) e
+JOIN (SELECT 'hour' AS granularity, 3600 AS seconds UNION ALL SELECT 'day', 86400) g
+WHERE e.ts IS NOT NULL AND NOT EXISTS (SELECT 1 FROM stats_rollups)
+GROUP BY g.granularity, e.ts / g.seconds * g.seconds, e.feed_id;
@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from services.llm.admission import AdmissionController, AdmissionRejected
+
+
+class RateLimited(Exception):
+    status_code = 429
+    response = None
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_acquire_and_release_returns_slot():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=2, max_queue=4, queue_timeout=1)
+        first = await controller.acquire()
+        second = await controller.acquire()
+        assert controller.in_flight == 2
+        first.release()
+        first.release()  # 重复释放无效
+        second.release()
+        assert controller.in_flight == 0
+
+    run(scenario())
+
+
+def test_waiter_receives_handed_off_slot():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1, max_queue=4, queue_timeout=1)
+        ticket = await controller.acquire()
+        waiter = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+        ticket.release()
+        handed = await waiter
+        assert controller.in_flight == 1
+        handed.release()
+        assert controller.in_flight == 0
+
+    run(scenario())
+
+
+def test_cancelled_woken_waiter_returns_slot():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1, max_queue=4, queue_timeout=5)
+        ticket = await controller.acquire()
+        waiter = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+        # 释放后名额转交给等待者，但在它恢复运行之前取消（模拟客户端在交接时断开）
+        ticket.release()
+        assert controller.in_flight == 1
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert controller.in_flight == 0
+        # 名额没有丢失，后续请求可以立即获得
+        again = await asyncio.wait_for(controller.acquire(), 1)
+        again.release()
+        assert controller.in_flight == 0
+
+    run(scenario())
+
+
+def test_cancelled_woken_waiter_hands_slot_to_next_waiter():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1, max_queue=4, queue_timeout=5)
+        ticket = await controller.acquire()
+        first = asyncio.create_task(controller.acquire())
+        second = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+        ticket.release()
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        handed = await asyncio.wait_for(second, 1)
+        assert controller.in_flight == 1
+        handed.release()
+        assert controller.in_flight == 0
+
+    run(scenario())
+
+
+def test_queue_timeout_and_full_queue_reject():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=0.05)
+        ticket = await controller.acquire()
+        waiter = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected):
+            await controller.acquire()  # 队列已满
+        with pytest.raises(AdmissionRejected):
+            await waiter  # 排队超时
+        assert controller.in_flight == 1
+        ticket.release()
+        assert controller.in_flight == 0
+
+    run(scenario())
+
+
+def test_rate_limit_halves_limit_and_success_recovers():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=4, max_queue=4, queue_timeout=1)
+        ticket = await controller.acquire()
+        ticket.release(RateLimited())
+        assert controller.limit == 2
+        assert controller.in_flight == 0
+        controller._cooldown_until = 0
+        for _ in range(10):
+            (await controller.acquire()).release()
+        assert controller.limit == 4
+
+    run(scenario())
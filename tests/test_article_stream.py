@@ -0,0 +1,58 @@
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+import services.database as database
+import services.rss.article.article as article_service
+from services.rss.article.article import iter_article_records
+
+SQL_DIR = Path(__file__).resolve().parents[1] / "sql"
+
+
+@pytest.fixture
+def opened(tmp_path, monkeypatch):
+    # 初始化带几篇文章的数据库，并记录流式读取打开的每个只读连接
+    monkeypatch.setattr(database, "DATABASE_URL", str(tmp_path / "cronos.db"))
+    monkeypatch.setattr(database, "SQL_DIR", str(SQL_DIR))
+    database.initialize_database()
+    conn = sqlite3.connect(database.DATABASE_URL)
+    conn.execute("INSERT INTO rss_feeds (id, name, url) VALUES (1, 'feed', 'https://example.com/feed')")
+    conn.executemany(
+        "INSERT INTO articles (feed_id, title, link, guid, pub_date) VALUES (1, ?, 'https://example.com/a', ?, ?)",
+        [(f"title {i}", f"g{i}", 1704067200 + i) for i in range(5)],
+    )
+    conn.commit()
+    conn.close()
+
+    connections = []
+
+    def tracking_connection():
+        conn = database.open_readonly_connection()
+        connections.append(conn)
+        return conn
+
+    monkeypatch.setattr(article_service, "open_readonly_connection", tracking_connection)
+    return connections
+
+
+def is_closed(conn):
+    try:
+        conn.execute("SELECT 1")
+    except sqlite3.ProgrammingError:
+        return True
+    return False
+
+
+def test_stream_reads_on_readonly_connection_and_closes_it(opened):
+    records = list(iter_article_records(None, 10, batch_size=2))
+    assert [record["guid"] for record in records] == ["g4", "g3", "g2", "g1", "g0"]
+    assert len(opened) == 1 and is_closed(opened[0])
+
+
+def test_abandoned_stream_closes_connection(opened):
+    stream = iter_article_records(None, 10, batch_size=2)
+    assert next(stream)["guid"] == "g4"
+    assert not is_closed(opened[0])
+    stream.close()
+    assert is_closed(opened[0])
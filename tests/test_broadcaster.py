@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+
+from services.llm.broadcaster import (
+    POLICY_COALESCE,
+    POLICY_DISCONNECT,
+    POLICY_DROP,
+    SlowConsumerError,
+    StreamBroadcaster,
+)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def read_all(broadcaster, offset=0):
+    return [chunk async for chunk in broadcaster.subscribe(offset)]
+
+
+def late_joiner(policy, chunks=10, max_lag=3):
+    # 订阅者接入前日志中已有 chunks 个 chunk，超过 max_lag
+    broadcaster = StreamBroadcaster(max_lag=max_lag, policy=policy)
+    for i in range(chunks):
+        broadcaster.publish(str(i))
+    broadcaster.close()
+    return broadcaster
+
+
+async def lagging(policy, chunks=10, max_lag=3):
+    # 订阅者追上日志后停止读取，期间又发布了 chunks 个 chunk
+    broadcaster = StreamBroadcaster(max_lag=max_lag, policy=policy)
+    stream = broadcaster.subscribe()
+    reader = asyncio.create_task(stream.__anext__())
+    await asyncio.sleep(0)
+    for i in range(chunks):
+        broadcaster.publish(str(i))
+    broadcaster.close()
+    return [await reader] + [chunk async for chunk in stream]
+
+
+def test_fast_subscriber_receives_every_chunk():
+    async def scenario():
+        broadcaster = StreamBroadcaster(max_lag=3)
+        reader = asyncio.create_task(read_all(broadcaster))
+        for chunk in "abcdef":
+            await asyncio.sleep(0)
+            broadcaster.publish(chunk)
+        await asyncio.sleep(0)
+        broadcaster.close()
+        return await reader
+
+    assert run(scenario()) == list("abcdef")
+
+
+@pytest.mark.parametrize("policy", [POLICY_COALESCE, POLICY_DROP, POLICY_DISCONNECT])
+def test_late_joiner_replays_whole_log(policy):
+    # 回放已有日志不算积压：无论策略如何都能从头读到每个 chunk
+    assert run(read_all(late_joiner(policy))) == [str(i) for i in range(10)]
+
+
+def test_resume_after_max_lag_keeps_beginning():
+    assert run(read_all(late_joiner(POLICY_DROP, chunks=300, max_lag=256), offset=5)) == [str(i) for i in range(5, 300)]
+
+
+def test_coalesce_merges_backlog_into_one_chunk():
+    assert run(lagging(POLICY_COALESCE)) == ["0123456789"]
+
+
+def test_drop_skips_to_latest_chunk():
+    assert run(lagging(POLICY_DROP)) == ["9"]
+
+
+def test_disconnect_raises_for_slow_subscriber():
+    with pytest.raises(SlowConsumerError):
+        run(lagging(POLICY_DISCONNECT))
+
+
+def test_backlog_within_limit_is_delivered_unchanged():
+    for policy in (POLICY_COALESCE, POLICY_DROP, POLICY_DISCONNECT):
+        assert run(lagging(policy, chunks=3)) == ["0", "1", "2"]
+
+
+def test_offset_resumes_from_shared_log():
+    broadcaster = StreamBroadcaster(max_lag=10, initial=["a", "b"])
+    broadcaster.publish("c")
+    broadcaster.close()
+    assert run(read_all(broadcaster, offset=1)) == ["b", "c"]
+
+
+def test_error_is_raised_after_log_is_drained():
+    broadcaster = StreamBroadcaster(max_lag=10)
+    broadcaster.publish("partial")
+    broadcaster.close(error=RuntimeError("upstream failed"))
+
+    async def scenario():
+        received = []
+        with pytest.raises(RuntimeError, match="upstream failed"):
+            async for chunk in broadcaster.subscribe():
+                received.append(chunk)
+        return received
+
+    assert run(scenario()) == ["partial"]
+
+
+def test_on_idle_called_when_last_subscriber_leaves():
+    idle = []
+
+    async def scenario():
+        broadcaster = StreamBroadcaster(on_idle=lambda: idle.append(True))
+        broadcaster.publish("x")
+        stream = broadcaster.subscribe()
+        assert await stream.__anext__() == "x"
+        assert broadcaster.subscriber_count == 1
+        await stream.aclose()
+        assert broadcaster.subscriber_count == 0
+
+    run(scenario())
+    assert idle == [True]
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        StreamBroadcaster(policy="block")
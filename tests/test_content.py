@@ -0,0 +1,62 @@
+import pytest
+
+from services.llm.content import reduce_content
+
+# 真实新闻正文中常见的句子：包含“注册”“广告”“订阅”“分享”等词，必须原样保留
+ARTICLE_PARAGRAPHS = [
+    "该公司注册资本为1亿元，主要从事新能源汽车零部件的研发与生产。",
+    "受宏观经济影响，公司宣布将削减广告预算，并把更多资源投入线下渠道。",
+    "截至今年6月，该平台的付费订阅用户已突破3000万，同比增长25%。",
+    "用户登录后即可在个人中心查看历史订单，无需再次输入验证码。",
+    "多家网站因未经同意写入cookie被监管部门约谈，相关整改将在年底前完成。",
+    "法院认定被告侵犯了原告的copyright，判令其赔偿经济损失50万元。",
+    "他在发布会上分享到，团队花了三年时间才解决电池低温衰减的问题。",
+]
+
+
+def test_cjk_paragraphs_with_boilerplate_words_survive():
+    text = "\n".join(ARTICLE_PARAGRAPHS)
+    assert reduce_content(text).splitlines() == ARTICLE_PARAGRAPHS
+
+
+@pytest.mark.parametrize("line", [
+    "分享到：",
+    "登录后评论",
+    "登录 | 注册",
+    "返回顶部",
+    "下一篇",
+    "责任编辑：张三",
+    "© 2024 Example Inc. All rights reserved.",
+    "Copyright 2010-2024 示例网 版权所有",
+    "Skip to main content",
+    "Accept all cookies",
+])
+def test_whole_line_boilerplate_is_removed(line):
+    assert reduce_content(f"正文第一段。\n{line}\n正文第二段。") == "正文第一段。\n正文第二段。"
+
+
+def test_short_headings_and_repeated_list_items_survive():
+    text = "\n".join([
+        "一、背景",
+        "价格",
+        "优点：",
+        "- 是",
+        "- 否",
+        "缺点：",
+        "- 是",
+        "- 否",
+        "结论",
+    ])
+    assert reduce_content(text) == text
+
+
+def test_repeated_long_paragraph_is_deduplicated():
+    lead = "据新华社报道，国务院常务会议今日审议通过了关于促进民营经济发展壮大的若干措施，涉及市场准入与融资支持等方面。"
+    text = "\n".join([lead, "正文。", lead])
+    assert reduce_content(text) == f"{lead}\n正文。"
+
+
+def test_trailing_comments_are_truncated():
+    body = [f"第{i}段正文内容，描述事件的进展。" for i in range(5)]
+    text = "\n".join(body + ["相关阅读", "另一篇文章的标题"])
+    assert reduce_content(text) == "\n".join(body)
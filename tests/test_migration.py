@@ -0,0 +1,132 @@
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+import services.database as database
+
+SQL_DIR = Path(__file__).resolve().parents[1] / "sql"
+
+# 版本 0 的结构：时间列为 ISO 文本（article_tagging 在该版本已存在，外键指向 articles）
+BASELINE_SCHEMA = """
+CREATE TABLE rss_feeds (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL CHECK(name <> ''),
+    url TEXT NOT NULL CHECK(url <> '') UNIQUE,
+    is_active BOOLEAN NOT NULL DEFAULT 1
+);
+CREATE INDEX idx_rss_feeds_url ON rss_feeds(url);
+CREATE TABLE articles (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    feed_id INTEGER NOT NULL,
+    title TEXT NOT NULL CHECK(title <> ''),
+    link TEXT NOT NULL CHECK(link <> ''),
+    guid TEXT NOT NULL CHECK(guid <> '') UNIQUE,
+    pub_date TEXT NOT NULL CHECK(pub_date <> ''),
+    author TEXT,
+    created_at TEXT NOT NULL DEFAULT (datetime('now')),
+    FOREIGN KEY (feed_id) REFERENCES rss_feeds(id) ON DELETE CASCADE
+);
+CREATE INDEX idx_articles_feed_id ON articles(feed_id);
+CREATE INDEX idx_articles_guid ON articles(guid);
+CREATE INDEX idx_articles_pub_date ON articles(pub_date);
+CREATE TABLE article_states (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    article_id INTEGER NOT NULL,
+    is_read BOOLEAN NOT NULL DEFAULT 0,
+    tags TEXT,
+    ai_summary TEXT,
+    updated_at TEXT NOT NULL DEFAULT (datetime('now')),
+    FOREIGN KEY (article_id) REFERENCES articles(id) ON DELETE CASCADE
+);
+CREATE INDEX idx_article_states_article_id ON article_states(article_id);
+CREATE INDEX idx_article_states_is_read ON article_states(is_read);
+CREATE TABLE article_tagging (
+    article_id INTEGER PRIMARY KEY,
+    status TEXT NOT NULL CHECK(status IN ('done', 'empty', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT NOT NULL DEFAULT (datetime('now')),
+    FOREIGN KEY (article_id) REFERENCES articles(id) ON DELETE CASCADE
+);
+"""
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    path = tmp_path / "cronos.db"
+    monkeypatch.setattr(database, "DATABASE_URL", str(path))
+    monkeypatch.setattr(database, "SQL_DIR", str(SQL_DIR))
+    return path
+
+
+def connect(path):
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def create_baseline(path):
+    conn = connect(path)
+    conn.executescript(BASELINE_SCHEMA)
+    conn.execute("INSERT INTO rss_feeds (id, name, url) VALUES (1, 'feed', 'https://example.com/feed')")
+    conn.executemany(
+        "INSERT INTO articles (id, feed_id, title, link, guid, pub_date, created_at) VALUES (?, 1, ?, 'https://example.com/a', ?, ?, ?)",
+        [
+            (1, "space", "g1", "2024-01-02 03:04:05", "2024-01-03 00:00:00"),
+            (2, "iso", "g2", "2024-01-02T03:04:05+08:00", "2024-01-03 00:00:00"),
+            # 无法解析的发布时间回退到入库时间
+            (3, "rfc822", "g3", "Tue, 02 Jan 2024 03:04:05 GMT", "2024-01-03 00:00:00"),
+        ],
+    )
+    conn.executemany(
+        "INSERT INTO article_states (article_id, is_read, tags, updated_at) VALUES (?, ?, ?, '2024-01-04 00:00:00')",
+        [(1, 1, "a,b"), (2, 0, None), (3, 0, None)],
+    )
+    conn.execute("INSERT INTO article_tagging (article_id, status, attempts) VALUES (1, 'done', 1)")
+    conn.commit()
+    conn.close()
+
+
+def test_migrates_baseline_timestamps_to_epoch(db_path):
+    create_baseline(db_path)
+    database.initialize_database()
+
+    conn = connect(db_path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == database.SCHEMA_VERSION
+    rows = conn.execute("SELECT id, pub_date, typeof(pub_date) AS kind, created_at FROM articles ORDER BY id").fetchall()
+    assert [row["kind"] for row in rows] == ["integer"] * 3
+    assert [row["pub_date"] for row in rows] == [1704164645, 1704135845, 1704240000]
+    assert [row["created_at"] for row in rows] == [1704240000] * 3
+
+    states = conn.execute("SELECT article_id, is_read, tags, updated_at FROM article_states ORDER BY article_id").fetchall()
+    assert [tuple(row) for row in states] == [(1, 1, "a,b", 1704326400), (2, 0, None, 1704326400), (3, 0, None, 1704326400)]
+
+    # 旧表已删除，其他表的外键仍指向 articles，计数器按迁移后的数据回填
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert "articles_v0" not in tables and "article_states_v0" not in tables
+    assert "REFERENCES articles(id)" in conn.execute("SELECT sql FROM sqlite_master WHERE name = 'article_tagging'").fetchone()[0]
+    assert conn.execute("PRAGMA foreign_key_check").fetchall() == []
+    assert conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+    counters = conn.execute("SELECT total, unread, newest_pub_date FROM feed_counters WHERE feed_id = 1").fetchone()
+    assert tuple(counters) == (3, 2, 1704240000)
+    conn.close()
+
+
+def test_migration_is_idempotent(db_path):
+    create_baseline(db_path)
+    database.initialize_database()
+    database.initialize_database()
+
+    conn = connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0] == 3
+    assert conn.execute("SELECT total FROM feed_counters WHERE feed_id = 1").fetchone()[0] == 3
+    conn.close()
+
+
+def test_fresh_database_is_marked_current(db_path):
+    database.initialize_database()
+
+    conn = connect(db_path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == database.SCHEMA_VERSION
+    assert conn.execute("SELECT type FROM pragma_table_info('articles') WHERE name = 'pub_date'").fetchone()[0] == "INTEGER"
+    conn.close()
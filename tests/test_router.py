@@ -0,0 +1,166 @@
+import asyncio
+
+import pytest
+
+import services.llm.router as router_module
+from services.llm.admission import AdmissionController, AdmissionRejected
+from services.llm.router import LLMRouter
+
+
+class FakeProvider:
+    """
+    假的 OpenAIStreamClient：按 delay 延迟首 token，fail 为真时在首 token 前失败。
+    """
+    def __init__(self, config_id, model, chunks=("a", "b"), delay=0.0, fail=False):
+        self.config_id = config_id
+        self.model = model
+        self.models = [model]
+        self.chunks = chunks
+        self.delay = delay
+        self.fail = fail
+        self.requested_models = []
+
+    async def stream_chat_completion(self, messages, model=None, served=None):
+        self.requested_models.append(model)
+        if served is not None:
+            served.update(config_id=self.config_id, model=model or self.model)
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f"provider {self.config_id} down")
+        for chunk in self.chunks:
+            yield chunk
+
+    async def chat_completion(self, messages, model=None, served=None):
+        return "".join([chunk async for chunk in self.stream_chat_completion(messages, model, served)])
+
+
+@pytest.fixture
+def controllers(monkeypatch):
+    # 每个测试独立的 provider 统计与准入控制器
+    monkeypatch.setattr(router_module, "_stats", {})
+    table = {}
+    monkeypatch.setattr(router_module, "get_db", lambda: iter([None]))
+    monkeypatch.setattr(
+        router_module,
+        "get_admission_controller",
+        lambda db, key: table.setdefault(key, AdmissionController(max_in_flight=1, max_queue=0, queue_timeout=1)),
+    )
+    return table
+
+
+def collect(router, model=None):
+    async def scenario():
+        served = {}
+        chunks = [chunk async for chunk in router.stream_chat_completion([], model=model, served=served)]
+        return chunks, served
+
+    return asyncio.run(scenario())
+
+
+def test_failover_reports_serving_provider(controllers):
+    down = FakeProvider(1, "model-a", fail=True)
+    up = FakeProvider(2, "model-b")
+    chunks, served = collect(LLMRouter([down, up]))
+    assert chunks == ["a", "b"]
+    assert served == {"config_id": 2, "model": "model-b"}
+    assert router_module.provider_stats(1).error_rate > 0
+    # 每个 provider 的名额都已归还
+    assert controllers[1].in_flight == 0 and controllers[2].in_flight == 0
+
+
+def test_hedge_uses_first_provider_to_answer(controllers):
+    slow = FakeProvider(1, "model-a", chunks=("slow",), delay=0.5)
+    fast = FakeProvider(2, "model-b", chunks=("fast",))
+    chunks, served = collect(LLMRouter([slow, fast], hedge=True, hedge_delay=0.05))
+    assert chunks == ["fast"]
+    assert served["config_id"] == 2
+    assert controllers[1].in_flight == 0 and controllers[2].in_flight == 0
+
+
+def test_saturated_provider_is_skipped(controllers):
+    first = FakeProvider(1, "model-a")
+    second = FakeProvider(2, "model-b")
+    router = LLMRouter([first, second])
+
+    async def scenario():
+        # provider 1 的名额已被占满：请求直接交给 provider 2，不受 provider 1 的限制
+        held = router_module.get_admission_controller(None, 1).try_acquire()
+        served = {}
+        chunks = [chunk async for chunk in router.stream_chat_completion([], served=served)]
+        held.release()
+        return chunks, served
+
+    chunks, served = asyncio.run(scenario())
+    assert chunks == ["a", "b"]
+    assert served["config_id"] == 2
+    assert first.requested_models == []
+
+
+def test_unknown_model_override_is_dropped_on_failover(controllers):
+    down = FakeProvider(1, "model-a", fail=True)
+    up = FakeProvider(2, "model-b")
+    _, served = collect(LLMRouter([down, up]), model="custom-model")
+    assert down.requested_models == ["custom-model"]
+    assert up.requested_models == [None]
+    assert served["model"] == "model-b"
+
+
+def test_configured_model_prefers_its_provider(controllers):
+    other = FakeProvider(1, "model-a")
+    match = FakeProvider(2, "model-b")
+    _, served = collect(LLMRouter([other, match]), model="model-b")
+    assert served == {"config_id": 2, "model": "model-b"}
+    assert other.requested_models == []
+
+
+def test_chat_completion_fails_over_and_releases_slots(controllers):
+    down = FakeProvider(1, "model-a", fail=True)
+    up = FakeProvider(2, "model-b")
+    served = {}
+    result = asyncio.run(LLMRouter([down, up]).chat_completion([], served=served))
+    assert result == "ab"
+    assert served["config_id"] == 2
+    assert controllers[1].in_flight == 0 and controllers[2].in_flight == 0
+
+
+def test_reserve_rejects_before_streaming_and_is_used_by_stream(controllers):
+    busy = FakeProvider(1, "model-a")
+    idle = FakeProvider(2, "model-b")
+    router = LLMRouter([busy, idle])
+    controllers[1] = AdmissionController(max_in_flight=1, max_queue=0, queue_timeout=1)
+    controllers[2] = AdmissionController(max_in_flight=1, max_queue=0, queue_timeout=1)
+    held = controllers[1].try_acquire()
+
+    async def scenario():
+        ticket = await router.reserve()
+        assert controllers[2].in_flight == 1
+        # 另一个请求已无空闲名额：在返回流式响应之前就被拒绝
+        with pytest.raises(AdmissionRejected):
+            await LLMRouter([busy, idle]).reserve()
+        served = {}
+        chunks = [chunk async for chunk in router.stream_chat_completion([], served=served)]
+        ticket.release()
+        return chunks, served
+
+    chunks, served = asyncio.run(scenario())
+    assert chunks == ["a", "b"]
+    assert served["config_id"] == 2
+    held.release()
+    assert controllers[1].in_flight == 0 and controllers[2].in_flight == 0
+
+
+def test_chat_completion_borrows_reserved_slot(controllers):
+    provider = FakeProvider(1, "model-a")
+    router = LLMRouter([provider])
+
+    async def scenario():
+        ticket = await router.reserve()
+        # 同一请求内的非流式调用（如会话压缩）借用名额，不会在自己的队列中等待
+        assert await router.chat_completion([]) == "ab"
+        assert controllers[1].in_flight == 1
+        chunks = [chunk async for chunk in router.stream_chat_completion([])]
+        ticket.release()
+        return chunks
+
+    assert asyncio.run(scenario()) == ["a", "b"]
+    assert controllers[1].in_flight == 0
@@ -0,0 +1,76 @@
+import asyncio
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from routes.llm.ai_summary import AISummaryRequest, stream_stored_summary
+from services.llm.summary_session import (
+    append_chunks,
+    attempts_exhausted,
+    claim_session,
+    get_session,
+    record_session_failure,
+    set_session_status,
+)
+
+SQL_DIR = Path(__file__).resolve().parents[1] / "sql"
+
+
+@pytest.fixture
+def db():
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.executescript((SQL_DIR / "ai_summary_sessions.sql").read_text(encoding="utf-8"))
+    yield conn
+    conn.close()
+
+
+def test_failed_session_stops_being_claimable_after_max_attempts(db):
+    messages = [{"role": "user", "content": "hi"}]
+    for attempt in range(1, 4):
+        assert claim_session(db, 1, messages, [], max_attempts=3)
+        record_session_failure(db, 1, RuntimeError("upstream 500"))
+        session = get_session(db, 1)
+        assert session["attempts"] == attempt
+        assert session["last_error"] == "upstream 500"
+
+    assert attempts_exhausted(get_session(db, 1), 3)
+    assert not claim_session(db, 1, messages, [], max_attempts=3)
+    # 调高上限后可以继续重试
+    assert claim_session(db, 1, messages, [], max_attempts=4)
+
+
+def test_regenerating_done_session_resets_attempts(db):
+    claim_session(db, 1, [], [], max_attempts=3)
+    record_session_failure(db, 1, RuntimeError("boom"))
+    claim_session(db, 1, [], [], max_attempts=3)
+    set_session_status(db, 1, "done")
+    assert claim_session(db, 1, [], [], max_attempts=3)
+    assert get_session(db, 1)["attempts"] == 0
+
+
+def read_response(response):
+    async def collect():
+        parts = []
+        async for chunk in response.body_iterator:
+            parts.append(chunk.decode("utf-8") if isinstance(chunk, bytes) else chunk)
+        return "".join(parts)
+    return asyncio.run(collect())
+
+
+def test_resume_of_stored_summary_uses_chunk_log(db):
+    append_chunks(db, 1, 0, ["摘要", "第二段", "结尾"])
+    payload = AISummaryRequest(article_id=1, url="https://example.com/a", offset=1, byte_offset=3)
+    assert read_response(stream_stored_summary(db, 1, "摘要第二段结尾", payload)) == "二段结尾"
+
+
+def test_resume_after_chunk_log_cleanup_returns_full_summary(db):
+    # chunk 日志已被过期清理：offset 无法换算，返回完整摘要而不是空响应
+    payload = AISummaryRequest(article_id=1, url="https://example.com/a", offset=2, byte_offset=3)
+    assert read_response(stream_stored_summary(db, 1, "摘要第二段结尾", payload)) == "摘要第二段结尾"
+
+
+def test_byte_offset_without_chunk_offset_applies_to_stored_summary(db):
+    payload = AISummaryRequest(article_id=1, url="https://example.com/a", byte_offset=6)
+    assert read_response(stream_stored_summary(db, 1, "摘要第二段结尾", payload)) == "第二段结尾"